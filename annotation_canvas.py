@@ -0,0 +1,127 @@
+"""
+Incremental rendering and background snapshot writes for map_annotator.
+
+AnnotationCanvas keeps the full-resolution annotated map together with a
+cached display-resolution copy. Drawing a node only re-samples the small
+dirty rectangle around it into the display buffer instead of resizing the
+whole map. SnapshotWriter saves the full-resolution image on a background
+thread and coalesces bursts of clicks into a single write.
+"""
+
+import math
+import threading
+import time
+
+import cv2
+import numpy as np
+
+NODE_RADIUS = 5
+LABEL_FONT = cv2.FONT_HERSHEY_SIMPLEX
+LABEL_SCALE = 0.5
+SNAPSHOT_DELAY = 0.5  # Seconds to wait for more clicks before writing a snapshot
+
+
+def node_color(node_type):
+    if node_type in ('stairs', 'elevator'):
+        return (255, 0, 255) # Magenta for floor connectors
+    return (0, 0, 255) if node_type == 'room' else (255, 0, 0) # Red for rooms, blue for path
+
+
+class AnnotationCanvas:
+    """Full-resolution annotation image plus a cached display buffer."""
+
+    def __init__(self, full_img, disp_w, disp_h):
+        self.full = full_img
+        self.disp_w = disp_w
+        self.disp_h = disp_h
+        h, w = full_img.shape[:2]
+        self.sx = disp_w / w
+        self.sy = disp_h / h
+        self.lock = threading.Lock()
+        self.display = cv2.resize(full_img, (disp_w, disp_h))
+        self.redraw_pixels = 0
+
+    def draw_node(self, x, y, node_id, color):
+        """Draw a node marker and its id label, then refresh only that region."""
+        label = f"{node_id}"
+        (text_w, text_h), baseline = cv2.getTextSize(label, LABEL_FONT, LABEL_SCALE, 1)
+        with self.lock:
+            cv2.circle(self.full, (x, y), NODE_RADIUS, color, -1)
+            cv2.putText(self.full, label, (x + 5, y - 5), LABEL_FONT, LABEL_SCALE, (255, 255, 255), 1)
+            self.refresh(min(x - NODE_RADIUS, x + 5), min(y - NODE_RADIUS, y - 5 - text_h),
+                         max(x + NODE_RADIUS, x + 5 + text_w) + 1, max(y + NODE_RADIUS, y - 5 + baseline) + 1)
+
+    def refresh(self, x0, y0, x1, y1):
+        """Re-sample the full-resolution rect [x0, x1) x [y0, y1) into the display buffer.
+
+        Uses the same pixel-centre mapping as cv2.resize, so the patched
+        region lines up with the rest of the cached display image and matches
+        a full resize to within interpolation rounding (warpAffine and resize
+        quantize their bilinear weights differently, which can leave a few
+        grey levels of difference along the patch edges).
+        """
+        h, w = self.full.shape[:2]
+        # Display pixels whose bilinear footprint touches the dirty rect
+        dx0 = max(0, math.floor((x0 + 0.5) * self.sx - 0.5) - 1)
+        dy0 = max(0, math.floor((y0 + 0.5) * self.sy - 0.5) - 1)
+        dx1 = min(self.disp_w, math.ceil((x1 + 0.5) * self.sx - 0.5) + 2)
+        dy1 = min(self.disp_h, math.ceil((y1 + 0.5) * self.sy - 0.5) + 2)
+        if dx0 >= dx1 or dy0 >= dy1:
+            return
+
+        # Source rect feeding those display pixels, with a one-pixel margin
+        fx0 = max(0, math.floor((dx0 + 0.5) / self.sx - 0.5) - 1)
+        fy0 = max(0, math.floor((dy0 + 0.5) / self.sy - 0.5) - 1)
+        fx1 = min(w, math.ceil((dx1 + 0.5) / self.sx - 0.5) + 2)
+        fy1 = min(h, math.ceil((dy1 + 0.5) / self.sy - 0.5) + 2)
+
+        # d = s * (f + 0.5) - 0.5, shifted into the local source/destination rects
+        matrix = np.array([
+            [self.sx, 0, self.sx * (fx0 + 0.5) - 0.5 - dx0],
+            [0, self.sy, self.sy * (fy0 + 0.5) - 0.5 - dy0],
+        ], dtype=np.float64)
+        patch = cv2.warpAffine(self.full[fy0:fy1, fx0:fx1], matrix, (dx1 - dx0, dy1 - dy0),
+                               flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+        self.display[dy0:dy1, dx0:dx1] = patch
+        self.redraw_pixels += (dx1 - dx0) * (dy1 - dy0)
+
+
+class SnapshotWriter:
+    """Writes the canvas to disk on a background thread, coalescing bursts."""
+
+    def __init__(self, canvas, path, delay=SNAPSHOT_DELAY):
+        self.canvas = canvas
+        self.path = path
+        self.delay = delay
+        self.writes = 0
+        self._dirty = False
+        self._stop = False
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def request(self):
+        """Ask for a snapshot. Returns immediately."""
+        self._dirty = True
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            if not self._stop:
+                time.sleep(self.delay) # Let a burst of clicks settle, then write once
+            self._wake.clear()
+            if self._dirty:
+                self._dirty = False
+                with self.canvas.lock:
+                    snapshot = self.canvas.full.copy()
+                cv2.imwrite(self.path, snapshot)
+                self.writes += 1
+            if self._stop and not self._dirty: # A request that arrived during the write is flushed first
+                break
+
+    def close(self):
+        """Flush any pending snapshot and stop the thread."""
+        self._stop = True
+        self._wake.set()
+        self._thread.join()
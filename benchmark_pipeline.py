@@ -0,0 +1,221 @@
+"""
+Scaling benchmarks for the map annotation pipeline.
+
+Generates synthetic floor plans (a lattice of corridors with rooms along
+them) from hundreds up to millions of nodes, then times the pipeline
+stages on each: auto-linking, JSON save/load, binary save/load, routing
+graph construction and shortest-path queries. Results are written as
+machine-readable JSON so scaling regressions can be tracked across
+releases.
+
+Usage:
+    python benchmark_pipeline.py
+    python benchmark_pipeline.py --sizes 1000 100000 1000000 --queries 50
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from graph_binary import BinaryGraph, write_binary_graph
+from route_engine import SEARCH_METHODS, RouteEngine
+from spatial_index import auto_link_path_nodes
+
+# --- CONFIGURATION ---
+DEFAULT_SIZES = [200, 2000, 20000, 200000]
+DEFAULT_QUERIES = 100
+RESULTS_DIR = 'benchmark_results'
+NODE_SPACING = 25          # Pixels between neighbouring corridor nodes
+BLOCK_SIZE = 8             # Lattice steps between parallel corridors
+ROOM_FRACTION = 0.15       # Share of nodes that are rooms
+LINK_DISTANCE = 40.0       # Same role as MAX_AUTO_LINK_DISTANCE in map_annotator.py
+LEGACY_LIMIT = 3000        # Largest size the original O(n^2) auto-link loop is timed on
+
+
+def generate_floor_plan(num_nodes, seed=0):
+    """Synthetic graph in the gdn_ground_floor_graph.json schema.
+
+    Corridors run along every BLOCK_SIZE-th lattice row and column, path
+    nodes sit on the corridors with a little jitter, and rooms sit one step
+    inside a block next to a corridor node, linked to it.
+    """
+    rng = np.random.default_rng(seed)
+    # About 2/BLOCK_SIZE of the lattice lies on a corridor
+    corridor_share = 2 / BLOCK_SIZE - 1 / BLOCK_SIZE ** 2
+    side = max(BLOCK_SIZE + 1, math.ceil(math.sqrt(num_nodes * (1 - ROOM_FRACTION) / corridor_share)))
+
+    ii, jj = np.meshgrid(np.arange(side), np.arange(side), indexing='ij')
+    on_corridor = (ii % BLOCK_SIZE == 0) | (jj % BLOCK_SIZE == 0)
+    pi, pj = ii[on_corridor], jj[on_corridor]
+    num_path = len(pi)
+
+    # Rooms: lattice points just below a horizontal corridor, away from crossings
+    room_slots = (ii % BLOCK_SIZE == 1) & (jj % BLOCK_SIZE != 0)
+    ri, rj = ii[room_slots], jj[room_slots]
+    num_rooms = min(len(ri), max(1, num_nodes - num_path))
+    pick = np.sort(rng.choice(len(ri), size=num_rooms, replace=False))
+    ri, rj = ri[pick], rj[pick]
+
+    jitter = rng.integers(-2, 3, size=(num_path, 2))
+    px = pj * NODE_SPACING + jitter[:, 0]
+    py = pi * NODE_SPACING + jitter[:, 1]
+    rx = rj * NODE_SPACING
+    ry = ri * NODE_SPACING
+
+    nodes = [{"id": k, "x": int(x), "y": int(y), "type": "path", "name": None}
+             for k, (x, y) in enumerate(zip(px.tolist(), py.tolist()))]
+    nodes += [{"id": num_path + k, "x": int(x), "y": int(y), "type": "room", "name": f"R{k:05d}"}
+              for k, (x, y) in enumerate(zip(rx.tolist(), ry.tolist()))]
+
+    # Lattice neighbours along corridors, plus each room to the corridor node above it
+    lookup = -np.ones((side, side), dtype=np.int64)
+    lookup[pi, pj] = np.arange(num_path)
+    sources, targets = [], []
+    for di, dj in ((0, 1), (1, 0)):
+        ni, nj = pi + di, pj + dj
+        ok = (ni < side) & (nj < side)
+        ok[ok] &= lookup[ni[ok], nj[ok]] >= 0
+        sources.append(lookup[pi[ok], pj[ok]])
+        targets.append(lookup[ni[ok], nj[ok]])
+    sources.append(num_path + np.arange(num_rooms))
+    targets.append(lookup[ri - 1, rj])
+    src = np.concatenate(sources)
+    dst = np.concatenate(targets)
+
+    xs = np.concatenate([px, rx]).astype(np.float64)
+    ys = np.concatenate([py, ry]).astype(np.float64)
+    weights = np.hypot(xs[src] - xs[dst], ys[src] - ys[dst])
+    edges = [{"source": a, "target": b, "weight": w}
+             for a, b, w in zip(src.tolist(), dst.tolist(), weights.tolist())]
+    return {"nodes": nodes, "edges": edges}
+
+
+def legacy_auto_link(nodes, added_edges, max_distance):
+    """The original Step 2 nested loop, kept as the baseline."""
+    new_edges = []
+    for node_a in nodes:
+        if node_a['type'] != 'path':
+            continue
+        closest_neighbor = None
+        min_dist = float('inf')
+        for node_b in nodes:
+            if node_a['id'] == node_b['id'] or node_b['type'] != 'path':
+                continue
+            if tuple(sorted((node_a['id'], node_b['id']))) in added_edges:
+                continue
+            dist = math.dist((node_a['x'], node_a['y']), (node_b['x'], node_b['y']))
+            if dist < min_dist:
+                min_dist = dist
+                closest_neighbor = node_b
+        if closest_neighbor and min_dist <= max_distance:
+            new_edges.append({"source": node_a['id'], "target": closest_neighbor['id'], "weight": min_dist})
+            added_edges.add(tuple(sorted((node_a['id'], closest_neighbor['id']))))
+    return new_edges
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def run_size(num_nodes, num_queries, seed=0):
+    """Run every stage on one synthetic floor plan. Returns a result dict."""
+    graph, gen_time = timed(generate_floor_plan, num_nodes, seed)
+    nodes, edges = graph["nodes"], graph["edges"]
+    result = {
+        "requested_nodes": num_nodes,
+        "nodes": len(nodes),
+        "edges": len(edges),
+        "stages": {"generate": gen_time},
+    }
+    stages = result["stages"]
+    print(f"\n[{len(nodes)} nodes, {len(edges)} edges] generated in {gen_time:.3f}s")
+
+    new_edges, stages["auto_link"] = timed(auto_link_path_nodes, nodes, set(), LINK_DISTANCE)
+    result["auto_link_edges"] = len(new_edges)
+    if len(nodes) <= LEGACY_LIMIT:
+        legacy_edges, stages["auto_link_legacy"] = timed(legacy_auto_link, nodes, set(), LINK_DISTANCE)
+        result["auto_link_matches_legacy"] = legacy_edges == new_edges
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, 'graph.json')
+        bin_path = os.path.join(tmp, 'graph.pfgraph')
+
+        def save_json():
+            with open(json_path, 'w') as f:
+                json.dump(graph, f, indent=4)
+
+        def load_json():
+            with open(json_path, 'r') as f:
+                return json.load(f)
+
+        _, stages["json_save"] = timed(save_json)
+        _, stages["json_load"] = timed(load_json)
+        result["json_bytes"] = os.path.getsize(json_path)
+        _, stages["binary_save"] = timed(write_binary_graph, graph, bin_path)
+        _, stages["binary_open"] = timed(BinaryGraph, bin_path)
+        result["binary_bytes"] = os.path.getsize(bin_path)
+
+    engine, stages["graph_build"] = timed(RouteEngine, nodes, edges)
+
+    rng = random.Random(seed)
+    pairs = [(rng.randrange(len(nodes)), rng.randrange(len(nodes))) for _ in range(num_queries)]
+    result["queries"] = {}
+    for method in SEARCH_METHODS:
+        expanded = 0
+        start = time.perf_counter()
+        for a, b in pairs:
+            expanded += engine.search(a, b, method).expanded
+        elapsed = time.perf_counter() - start
+        result["queries"][method] = {
+            "count": len(pairs),
+            "mean_ms": elapsed / max(1, len(pairs)) * 1000,
+            "mean_expanded": expanded / max(1, len(pairs)),
+        }
+
+    for name, seconds in stages.items():
+        print(f"  {name:<18} {seconds * 1000:10.2f} ms")
+    for method, stats in result["queries"].items():
+        print(f"  query/{method:<12} {stats['mean_ms']:10.3f} ms  ({stats['mean_expanded']:.0f} expanded)")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the map annotation pipeline at scale.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Node counts to test")
+    parser.add_argument('--queries', type=int, default=DEFAULT_QUERIES, help="Shortest-path queries per size")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help="Results file (default: benchmark_results/<timestamp>.json)")
+    args = parser.parse_args()
+
+    report = {
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "results": [run_size(size, args.queries, args.seed) for size in args.sizes],
+    }
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"bench_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=4)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    os.chdir(script_dir)
+    main()
@@ -0,0 +1,297 @@
+"""
+Automatic corridor graph extraction from a binary walkable mask.
+
+The mask (white = walkable) is thinned to a one-pixel skeleton with a
+vectorized Zhang-Suen pass, junction and endpoint pixels are classified
+from their 8-neighbourhood, and the branches between them are traced and
+simplified into 'path' nodes and weighted edges. The output uses the same
+schema as gdn_ground_floor_graph.json, so it can be loaded straight into
+map_annotator.py for the room-linking steps.
+
+Usage:
+    python corridor_extractor.py
+    python corridor_extractor.py --mask assets/binary_paint_cleaned_gdn.png \
+        --reference assets/maps/gdn_ground_floor.png --merge assets/maps/gdn_ground_floor_graph.json
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+
+import cv2
+import numpy as np
+
+# --- CONFIGURATION ---
+MASK_IMAGE_PATH = os.path.join('assets', 'binary_paint_cleaned_gdn.png')
+REFERENCE_IMAGE_PATH = os.path.join('assets', 'maps', 'gdn_ground_floor.png')
+OUTPUT_JSON_FILE = os.path.join('assets', 'maps', 'gdn_ground_floor_corridors.json')
+MIN_SPUR_LENGTH = 15        # Junction-to-endpoint branches shorter than this are skeleton noise
+SIMPLIFY_TOLERANCE = 3.0    # Max pixel deviation of an edge from the traced centreline
+MAX_SEGMENT_LENGTH = 60.0   # Long straight runs are split so rooms have a nearby node
+
+# Neighbour offsets (dy, dx) in Zhang-Suen order P2..P9: N, NE, E, SE, S, SW, W, NW
+_RING = [(-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1)]
+# 4-neighbours first so staircase pixels are walked instead of skipped
+_TRACE_ORDER = [(-1, 0), (0, 1), (1, 0), (0, -1), (-1, 1), (1, 1), (1, -1), (-1, -1)]
+
+
+def load_walkable_mask(mask_path, shape=None):
+    """Load a binary mask as a bool array, resized to `shape` (h, w) if given."""
+    mask = cv2.imread(mask_path, cv2.IMREAD_GRAYSCALE)
+    if mask is None:
+        raise FileNotFoundError(f"Could not load mask image at {mask_path}")
+    if shape is not None and mask.shape[:2] != tuple(shape[:2]):
+        mask = cv2.resize(mask, (shape[1], shape[0]), interpolation=cv2.INTER_NEAREST)
+    return mask > 127
+
+
+def _neighbours(img):
+    """The eight shifted neighbour planes P2..P9 of a 0/1 uint8 image."""
+    padded = np.pad(img, 1)
+    h, w = img.shape
+    return [padded[1 + dy:1 + dy + h, 1 + dx:1 + dx + w] for dy, dx in _RING]
+
+
+def _ring_stats(img):
+    """Neighbour count B and 0->1 transition count A for every pixel."""
+    p = _neighbours(img)
+    count = sum(plane.astype(np.uint8) for plane in p)
+    transitions = sum(((p[k] == 0) & (p[(k + 1) % 8] == 1)).astype(np.uint8) for k in range(8))
+    return count, transitions, p
+
+
+def clean_mask(mask):
+    """Close pinholes and open away single-pixel specks before thinning."""
+    kernel = np.ones((3, 3), np.uint8)
+    clean = cv2.morphologyEx(mask.astype(np.uint8), cv2.MORPH_CLOSE, kernel)
+    return cv2.morphologyEx(clean, cv2.MORPH_OPEN, kernel) > 0
+
+
+def skeletonize(mask):
+    """Zhang-Suen thinning, every sub-iteration vectorized over the whole image."""
+    img = mask.astype(np.uint8)
+    while True:
+        changed = False
+        for step in (0, 1):
+            count, transitions, p = _ring_stats(img)
+            p2, p4, p6, p8 = p[0], p[2], p[4], p[6]
+            if step == 0:
+                cond = (p2 * p4 * p6 == 0) & (p4 * p6 * p8 == 0)
+            else:
+                cond = (p2 * p4 * p8 == 0) & (p2 * p6 * p8 == 0)
+            remove = (img == 1) & (count >= 2) & (count <= 6) & (transitions == 1) & cond
+            if remove.any():
+                img[remove] = 0
+                changed = True
+        if not changed:
+            return img.astype(bool)
+
+
+def classify_pixels(skeleton):
+    """Return (endpoints, junctions) bool masks from the crossing number."""
+    img = skeleton.astype(np.uint8)
+    _, transitions, _ = _ring_stats(img)
+    endpoints = skeleton & (transitions == 1)
+    junctions = skeleton & (transitions >= 3)
+    return endpoints, junctions
+
+
+def _trace_branches(skeleton, labels):
+    """Walk every branch between labelled key-pixel clusters.
+
+    Returns a list of (start_label, end_label, [(x, y), ...]) with the
+    branch pixels in walking order.
+    """
+    h, w = skeleton.shape
+    visited = np.zeros_like(skeleton)
+    branches = []
+
+    def walk(start_label, y, x):
+        points = [(x, y)]
+        visited[y, x] = True
+        while True:
+            end_label = 0
+            step = None
+            for dy, dx in _TRACE_ORDER:
+                ny, nx_ = y + dy, x + dx
+                if ny < 0 or nx_ < 0 or ny >= h or nx_ >= w or not skeleton[ny, nx_]:
+                    continue
+                label = labels[ny, nx_]
+                if label:
+                    # Branches that loop back to their own cluster are dropped anyway
+                    if label != start_label:
+                        end_label = label
+                elif step is None and not visited[ny, nx_]:
+                    step = (ny, nx_)
+            if end_label:
+                return end_label, points
+            if step is None:
+                return 0, points
+            y, x = step
+            visited[y, x] = True
+            points.append((x, y))
+
+    key_ys, key_xs = np.nonzero(labels)
+    for ky, kx in zip(key_ys.tolist(), key_xs.tolist()):
+        start_label = labels[ky, kx]
+        for dy, dx in _TRACE_ORDER:
+            ny, nx_ = ky + dy, kx + dx
+            if ny < 0 or nx_ < 0 or ny >= h or nx_ >= w:
+                continue
+            if skeleton[ny, nx_] and not labels[ny, nx_] and not visited[ny, nx_]:
+                end_label, points = walk(start_label, ny, nx_)
+                if end_label:
+                    branches.append((start_label, end_label, points))
+    return branches, visited
+
+
+def _simplify(points, tolerance, max_segment):
+    """Douglas-Peucker simplification, then split segments longer than max_segment."""
+    curve = np.asarray(points, dtype=np.int32).reshape(-1, 1, 2)
+    simplified = cv2.approxPolyDP(curve, tolerance, False).reshape(-1, 2).tolist()
+    result = [tuple(simplified[0])]
+    for (x1, y1), (x2, y2) in zip(simplified, simplified[1:]):
+        pieces = max(1, math.ceil(math.dist((x1, y1), (x2, y2)) / max_segment))
+        for k in range(1, pieces + 1):
+            t = k / pieces
+            result.append((int(round(x1 + (x2 - x1) * t)), int(round(y1 + (y2 - y1) * t))))
+    return result
+
+
+def extract_corridor_graph(mask, first_id=0, min_spur_length=MIN_SPUR_LENGTH,
+                           tolerance=SIMPLIFY_TOLERANCE, max_segment=MAX_SEGMENT_LENGTH):
+    """Build a {'nodes': [...], 'edges': [...]} corridor graph from a walkable mask."""
+    skeleton = skeletonize(clean_mask(mask))
+
+    endpoints, junctions = classify_pixels(skeleton)
+    num_labels, labels = cv2.connectedComponents((endpoints | junctions).astype(np.uint8), connectivity=8)
+    is_junction = np.zeros(num_labels, dtype=bool)
+    is_junction[np.unique(labels[junctions])] = True
+
+    branches, visited = _trace_branches(skeleton, labels)
+
+    # Closed corridor loops have no key pixels: seed nodes on each loop and trace again
+    leftover = skeleton & ~visited & (labels == 0)
+    num_loops, loop_labels = cv2.connectedComponents(leftover.astype(np.uint8), connectivity=8)
+    if num_loops > 1:
+        sizes = np.bincount(loop_labels.ravel(), minlength=num_loops)
+        seeded = labels.copy()
+        next_label = num_labels
+        for loop in np.nonzero(sizes[1:] >= min_spur_length)[0] + 1:
+            # Two seeds on opposite sides, so the loop becomes two branches
+            ys, xs = np.nonzero(loop_labels == loop)
+            for k in (0, len(ys) // 2):
+                seeded[ys[k], xs[k]] = next_label
+                next_label += 1
+        if next_label > num_labels:
+            is_junction = np.concatenate([is_junction, np.ones(next_label - num_labels, dtype=bool)])
+            loop_skeleton = skeleton & ((seeded >= num_labels) | leftover)
+            loop_labels_only = np.where(seeded >= num_labels, seeded, 0)
+            branches += _trace_branches(loop_skeleton, loop_labels_only)[0]
+            labels = seeded
+            num_labels = next_label
+
+    # Key-pixel cluster centroids become the anchor nodes
+    counts = np.bincount(labels.ravel(), minlength=num_labels).astype(np.float64)
+    ys, xs = np.indices(labels.shape)
+    sum_x = np.bincount(labels.ravel(), weights=xs.ravel(), minlength=num_labels)
+    sum_y = np.bincount(labels.ravel(), weights=ys.ravel(), minlength=num_labels)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        centroids = np.stack([sum_x / counts, sum_y / counts], axis=1)
+
+    # Drop short spurs hanging off junctions, and self-loops
+    kept = []
+    for a, b, points in branches:
+        if a == b:
+            continue
+        spur = is_junction[a] != is_junction[b]
+        if spur and len(points) < min_spur_length:
+            continue
+        kept.append((a, b, points))
+
+    nodes = []
+    edges = []
+    node_for_label = {}
+
+    def add_node(x, y):
+        node_id = first_id + len(nodes)
+        nodes.append({"id": node_id, "x": int(x), "y": int(y), "type": "path", "name": None})
+        return node_id
+
+    def anchor(label):
+        if label not in node_for_label:
+            cx, cy = centroids[label]
+            node_for_label[label] = add_node(round(cx), round(cy))
+        return node_for_label[label]
+
+    seen = set()
+    for a, b, points in kept:
+        start = anchor(a)
+        end = anchor(b)
+        line = [tuple(nodes[start - first_id][k] for k in ('x', 'y'))] + points
+        line.append(tuple(nodes[end - first_id][k] for k in ('x', 'y')))
+        vertices = _simplify(line, tolerance, max_segment)
+
+        chain = [start] + [add_node(x, y) for x, y in vertices[1:-1]] + [end]
+        for u, v in zip(chain, chain[1:]):
+            pair = tuple(sorted((u, v)))
+            if u == v or pair in seen:
+                continue
+            seen.add(pair)
+            nu, nv = nodes[u - first_id], nodes[v - first_id]
+            weight = math.dist((nu['x'], nu['y']), (nv['x'], nv['y']))
+            edges.append({"source": u, "target": v, "weight": weight})
+
+    return {"nodes": nodes, "edges": edges}
+
+
+def merge_into(base_graph, corridor_graph):
+    """Append a corridor graph (built with first_id=len(base nodes)) to a base graph."""
+    return {
+        "nodes": base_graph.get("nodes", []) + corridor_graph["nodes"],
+        "edges": base_graph.get("edges", []) + corridor_graph["edges"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract a corridor graph from a walkable mask.")
+    parser.add_argument('--mask', default=MASK_IMAGE_PATH, help="Binary walkable mask (white = walkable)")
+    parser.add_argument('--reference', default=REFERENCE_IMAGE_PATH,
+                        help="Map image whose pixel grid the graph coordinates should use")
+    parser.add_argument('--output', default=OUTPUT_JSON_FILE, help="Where to write the graph JSON")
+    parser.add_argument('--merge', default=None,
+                        help="Existing graph JSON to append the corridor nodes to")
+    args = parser.parse_args()
+
+    shape = None
+    if args.reference and os.path.exists(args.reference):
+        reference = cv2.imread(args.reference)
+        if reference is not None:
+            shape = reference.shape[:2]
+    else:
+        print(f"Reference image {args.reference} not found. Using mask coordinates.")
+
+    start = time.perf_counter()
+    mask = load_walkable_mask(args.mask, shape)
+
+    base = {"nodes": [], "edges": []}
+    if args.merge:
+        with open(args.merge, 'r') as f:
+            base = json.load(f)
+    graph = extract_corridor_graph(mask, first_id=len(base.get("nodes", [])))
+    if args.merge:
+        graph = merge_into(base, graph)
+    elapsed = time.perf_counter() - start
+
+    with open(args.output, 'w') as f:
+        json.dump(graph, f, indent=4)
+    print(f"Extracted {len(graph['nodes'])} nodes and {len(graph['edges'])} edges "
+          f"in {elapsed:.2f}s -> {args.output}")
+
+
+if __name__ == "__main__":
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    os.chdir(script_dir)
+    main()
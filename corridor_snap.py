@@ -0,0 +1,92 @@
+"""
+Snap clicked points to the corridor centreline.
+
+The walkable mask is cleaned and thinned to its medial axis exactly as
+corridor_extractor.py does it, so clicks snap to the same centreline the
+extracted path graph follows. A distance transform with per-pixel labels
+is then computed over the skeleton. Every mask pixel knows its nearest
+centreline pixel, so snapping a click is a couple of array lookups.
+
+Thinning gets expensive quickly as the mask grows, since both the pixel
+count and the number of passes (about half the corridor width) increase.
+Large masks are therefore thinned at a reduced scale and clicks are mapped
+into it and back. Snapped positions are then accurate to about half a
+pixel at that scale.
+"""
+
+import math
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from corridor_extractor import clean_mask, load_walkable_mask, skeletonize
+
+SNAP_MAX_DISTANCE = 20  # Clicks further than this (map pixels) from a centreline are left alone
+SNAP_MAX_DIM = 1024  # Masks with a longer side are thinned at a scale that brings it down to this
+
+
+class CorridorSnapper:
+    """Nearest-centreline lookup table for one walkable mask."""
+
+    def __init__(self, walkable, max_distance=SNAP_MAX_DISTANCE, scale=1.0):
+        """walkable is the mask at `scale` times map resolution; lookups take map coordinates."""
+        self.max_distance = max_distance
+        self.scale = scale
+        skeleton = skeletonize(clean_mask(walkable))
+        self.shape = skeleton.shape
+        # Zero pixels are the sources; with DIST_LABEL_PIXEL each gets its own label, numbered in row-major order
+        src = np.where(skeleton, 0, 255).astype(np.uint8)
+        _, labels = cv2.distanceTransformWithLabels(src, cv2.DIST_L2, cv2.DIST_MASK_5,
+                                                                labelType=cv2.DIST_LABEL_PIXEL)
+        ys, xs = np.nonzero(skeleton)
+        self._xs = np.concatenate([[-1], xs]).astype(np.int32)
+        self._ys = np.concatenate([[-1], ys]).astype(np.int32)
+        self.labels = labels
+        self.centreline_pixels = len(xs)
+
+    @classmethod
+    def from_mask_file(cls, mask_path, shape=None, max_distance=SNAP_MAX_DISTANCE, max_dim=SNAP_MAX_DIM):
+        """Snapper for a map of `shape` (h, w), thinned with the longer side at most max_dim pixels."""
+        if shape is None:
+            shape = load_walkable_mask(mask_path).shape
+        scale = min(1.0, max_dim / max(shape[:2])) if max_dim else 1.0
+        scaled = (max(1, round(shape[0] * scale)), max(1, round(shape[1] * scale)))
+        return cls(load_walkable_mask(mask_path, scaled), max_distance, scale)
+
+    def nearest(self, x, y):
+        """(cx, cy, distance) in map coordinates of the centreline pixel nearest to map (x, y), or None."""
+        h, w = self.shape
+        sx, sy = int(x * self.scale), int(y * self.scale)
+        if not (0 <= sx < w and 0 <= sy < h) or not self.centreline_pixels:
+            return None
+        label = self.labels[sy, sx]
+        # Centre of the centreline pixel, back in map coordinates
+        cx = int((self._xs[label] + 0.5) / self.scale)
+        cy = int((self._ys[label] + 0.5) / self.scale)
+        return cx, cy, math.hypot(cx - x, cy - y)
+
+    def snap(self, x, y):
+        """Snapped (x, y), or the input unchanged if no centreline is within reach."""
+        hit = self.nearest(x, y)
+        if hit is None or hit[2] > self.max_distance:
+            return x, y
+        return hit[0], hit[1]
+
+
+def main():
+    if len(sys.argv) < 4:
+        print("Usage: python corridor_snap.py <mask> <x> <y> [width height]")
+        return
+    shape = (int(sys.argv[5]), int(sys.argv[4])) if len(sys.argv) > 5 else None
+    start = time.perf_counter()
+    snapper = CorridorSnapper.from_mask_file(sys.argv[1], shape)
+    print(f"Lookup table for {snapper.shape[1]}x{snapper.shape[0]} mask (scale {snapper.scale:.2f}, "
+          f"{snapper.centreline_pixels} centreline pixels) built in {time.perf_counter() - start:.2f}s")
+    x, y = int(sys.argv[2]), int(sys.argv[3])
+    print(f"({x}, {y}) -> nearest centreline {snapper.nearest(x, y)}, snapped {snapper.snap(x, y)}")
+
+
+if __name__ == "__main__":
+    main()
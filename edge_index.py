@@ -0,0 +1,249 @@
+"""
+Nearest-edge projection index for snapping arbitrary positions to the graph.
+
+Every edge segment is registered in the uniform grid cells its bounding box
+covers (a CSR table: cell -> segment indices). A batch of query points is
+answered with a few NumPy passes. Each point gathers the segments in the
+(2r + 1) x (2r + 1) block of cells around it, projects onto all of them at
+once, and keeps the closest. A result is final once its distance is at most
+r cells, because any closer segment would have to touch the block. Points
+that are still unresolved retry with a doubled r, and once a block would
+span more cells than there are segments the rest are scanned exhaustively.
+
+Usage:
+    python edge_index.py assets/maps/gdn_ground_floor_graph.json 420 310
+    python edge_index.py assets/maps/gdn_ground_floor_graph.json --benchmark 100000
+"""
+
+from collections import namedtuple
+import json
+import sys
+import time
+
+import numpy as np
+
+MIN_CELL_SIZE = 8.0  # Pixels; the default cell size is the median edge length, but never less than this
+MAX_PAIRS_PER_PASS = 1 << 22  # Point-segment pairs projected at once when falling back to a full scan
+FIX_NOISE = 10.0  # Pixels of noise on the simulated position fixes of --benchmark
+
+Projection = namedtuple('Projection', ['edge', 'x', 'y', 't', 'offset', 'distance'])
+Projection.__doc__ = """Batched nearest-edge result; every field is an array with one entry per query point.
+
+edge is the index into the edge list (-1 if the graph has no edges), (x, y)
+the projected point, t the fraction along source -> target, offset the
+distance from the source along the edge, and distance the distance from the
+query point to the projected point.
+"""
+
+
+class EdgeIndex:
+    """Uniform-grid index over the edge segments of one floor graph."""
+
+    def __init__(self, nodes, edges, cell_size=None):
+        position = {node['id']: k for k, node in enumerate(nodes)}
+        xs = np.array([node['x'] for node in nodes], dtype=np.float64)
+        ys = np.array([node['y'] for node in nodes], dtype=np.float64)
+        usable = [k for k, e in enumerate(edges) if e["source"] in position and e["target"] in position]
+        self.edges = edges
+        self.edge_ids = np.array(usable, dtype=np.int64)
+        a = np.array([position[edges[k]["source"]] for k in usable], dtype=np.int64)
+        b = np.array([position[edges[k]["target"]] for k in usable], dtype=np.int64)
+        self.ax, self.ay = xs[a], ys[a]
+        self.dx, self.dy = xs[b] - self.ax, ys[b] - self.ay
+        self.length = np.hypot(self.dx, self.dy)
+        self.len2 = np.maximum(self.length ** 2, 1e-12)
+
+        if cell_size is None:
+            cell_size = max(float(np.median(self.length)) if len(usable) else 0.0, MIN_CELL_SIZE)
+        self.cell_size = cell_size
+        if not len(usable):
+            self.nx = self.ny = 1
+            self.indptr = np.zeros(2, dtype=np.int64)
+            self.indices = np.empty(0, dtype=np.int64)
+            return
+
+        bx = self.ax + np.minimum(self.dx, 0)
+        by = self.ay + np.minimum(self.dy, 0)
+        self.origin = (float(bx.min()), float(by.min()))
+        cx0 = self._cell(bx, 0)
+        cy0 = self._cell(by, 1)
+        cx1 = self._cell(bx + np.abs(self.dx), 0)
+        cy1 = self._cell(by + np.abs(self.dy), 1)
+        self.nx, self.ny = int(cx1.max()) + 1, int(cy1.max()) + 1
+
+        # Expand every segment into the cells of its bounding box
+        wx, wy = cx1 - cx0 + 1, cy1 - cy0 + 1
+        counts = wx * wy
+        seg = np.repeat(np.arange(len(usable)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        gx = cx0[seg] + local % wx[seg]
+        gy = cy0[seg] + local // wx[seg]
+        keys = gy * self.nx + gx
+        order = np.argsort(keys, kind='stable')
+        self.indices = seg[order]
+        self.indptr = np.zeros(self.nx * self.ny + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys, minlength=self.nx * self.ny), out=self.indptr[1:])
+
+    def _cell(self, values, axis):
+        return np.floor((values - self.origin[axis]) / self.cell_size).astype(np.int64)
+
+    def _candidates(self, gx, gy, r):
+        """(point, segment) pairs for the block of radius r around each point's cell."""
+        offsets = np.arange(-r, r + 1)
+        ox, oy = np.meshgrid(offsets, offsets)
+        cx = gx[:, None] + ox.ravel()
+        cy = gy[:, None] + oy.ravel()
+        inside = (cx >= 0) & (cx < self.nx) & (cy >= 0) & (cy < self.ny)
+        point = np.broadcast_to(np.arange(len(gx))[:, None], cx.shape)[inside]
+        cell = (cy * self.nx + cx)[inside]
+        starts, counts = self.indptr[cell], self.indptr[cell + 1] - self.indptr[cell]
+        point = np.repeat(point, counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return point, self.indices[np.repeat(starts, counts) + local]
+
+    def _project(self, px, py, seg):
+        """Fraction t along seg and distance for points (px, py); all arrays broadcast."""
+        t = np.clip(((px - self.ax[seg]) * self.dx[seg] + (py - self.ay[seg]) * self.dy[seg]) / self.len2[seg], 0, 1)
+        return t, np.hypot(self.ax[seg] + t * self.dx[seg] - px, self.ay[seg] + t * self.dy[seg] - py)
+
+    def _keep_closest(self, queries, point, seg, qx, qy, best, best_t, best_d):
+        """Project queries[point] onto seg and record the closest segment per query.
+
+        point must be non-decreasing, as _candidates produces it, so each query's
+        candidates form one contiguous run.
+        """
+        if not len(point):
+            return
+        t, d = self._project(qx[queries][point], qy[queries][point], seg)
+        starts = np.flatnonzero(np.r_[True, point[1:] != point[:-1]])
+        lows = np.minimum.reduceat(d, starts)
+        at_min = np.flatnonzero(d == np.repeat(lows, np.diff(np.r_[starts, len(d)])))
+        first = at_min[np.r_[True, point[at_min[1:]] != point[at_min[:-1]]]]
+        hit = queries[point[first]]
+        best[hit], best_t[hit], best_d[hit] = seg[first], t[first], d[first]
+
+    def project(self, xs, ys):
+        """Nearest edge for every query point. Returns a Projection of arrays."""
+        qx = np.atleast_1d(np.asarray(xs, dtype=np.float64))
+        qy = np.atleast_1d(np.asarray(ys, dtype=np.float64))
+        n = len(qx)
+        best = np.full(n, -1, dtype=np.int64)
+        best_t = np.zeros(n)
+        best_d = np.full(n, np.inf)
+        if not len(self.indices):
+            return Projection(best, qx.copy(), qy.copy(), best_t, best_t.copy(), best_d)
+
+        # Points outside the grid start from the nearest border cell, which is `outside` cells short of their own
+        rx, ry = self._cell(qx, 0), self._cell(qy, 1)
+        gx, gy = np.clip(rx, 0, self.nx - 1), np.clip(ry, 0, self.ny - 1)
+        outside = np.maximum(np.abs(rx - gx), np.abs(ry - gy))
+        pending = np.arange(n)
+        r = 1
+        while len(pending):
+            if (2 * r + 1) ** 2 >= len(self.ax):
+                # The block would hold more cells than there are segments: scan them all instead
+                every = np.arange(len(self.ax))
+                step = max(1, MAX_PAIRS_PER_PASS // len(every))
+                for first in range(0, len(pending), step):
+                    chunk = pending[first:first + step]
+                    t, d = self._project(qx[chunk, None], qy[chunk, None], every)
+                    closest = np.argmin(d, axis=1)
+                    rows = np.arange(len(chunk))
+                    best[chunk], best_t[chunk], best_d[chunk] = closest, t[rows, closest], d[rows, closest]
+                break
+            point, seg = self._candidates(gx[pending], gy[pending], r)
+            self._keep_closest(pending, point, seg, qx, qy, best, best_t, best_d)
+            done = best_d[pending] <= (r - outside[pending]) * self.cell_size
+            pending = pending[~done]
+            r *= 2
+
+        x = self.ax[best] + best_t * self.dx[best]
+        y = self.ay[best] + best_t * self.dy[best]
+        return Projection(self.edge_ids[best], x, y, best_t, best_t * self.length[best], best_d)
+
+    def within(self, xs, ys, radius):
+        """Every edge within radius of each query point. Returns (point, Projection).
+
+        point[k] is the query index of row k; rows are grouped by point and
+        sorted by distance within each group.
+        """
+        qx = np.atleast_1d(np.asarray(xs, dtype=np.float64))
+        qy = np.atleast_1d(np.asarray(ys, dtype=np.float64))
+        if not len(self.indices):
+            empty = np.empty(0, dtype=np.int64)
+            return empty, Projection(empty, *(np.empty(0) for _ in range(5)))
+        r = max(1, int(np.ceil(radius / self.cell_size)))
+        point, seg = self._candidates(self._cell(qx, 0), self._cell(qy, 1), r)
+        # A segment spanning several cells of the block is gathered more than once
+        keys = np.unique(point * len(self.ax) + seg)
+        point, seg = keys // len(self.ax), keys % len(self.ax)
+        t, d = self._project(qx[point], qy[point], seg)
+        keep = d <= radius
+        point, seg, t, d = point[keep], seg[keep], t[keep], d[keep]
+        order = np.lexsort((d, point))
+        point, seg, t, d = point[order], seg[order], t[order], d[order]
+        return point, Projection(self.edge_ids[seg], self.ax[seg] + t * self.dx[seg], self.ay[seg] + t * self.dy[seg],
+                                 t, t * self.length[seg], d)
+
+    def nearest(self, x, y):
+        """Nearest edge to one point as a dict, or None if the graph has no edges."""
+        p = self.project([x], [y])
+        if p.edge[0] < 0:
+            return None
+        edge = self.edges[int(p.edge[0])]
+        return {"edge": int(p.edge[0]), "source": edge["source"], "target": edge["target"],
+                "x": float(p.x[0]), "y": float(p.y[0]), "t": float(p.t[0]),
+                "offset": float(p.offset[0]), "distance": float(p.distance[0])}
+
+
+def route_from_point(index, engine, x, y, end_id):
+    """Route from an arbitrary (x, y) to a node, entering the graph mid-edge.
+
+    Returns {"point", "edge", "path", "distance"} where path is the node path
+    after leaving the snapped point, or None if no route exists.
+    """
+    hit = index.nearest(x, y)
+    if hit is None:
+        return None
+    weight = index.edges[hit["edge"]]["weight"]
+    best = None
+    # Leave the edge through either end; its weight is split in proportion to t
+    for node_id, cost in ((hit["source"], hit["t"] * weight), (hit["target"], (1 - hit["t"]) * weight)):
+        result = engine.search(node_id, end_id)
+        if result.path is not None and (best is None or cost + result.distance < best["distance"]):
+            best = {"point": (hit["x"], hit["y"]), "edge": hit["edge"], "path": result.path,
+                    "distance": cost + result.distance}
+    return best
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: python edge_index.py <graph.json> <x> <y> | --benchmark N")
+        return
+    with open(sys.argv[1], 'r') as f:
+        graph = json.load(f)
+    start = time.perf_counter()
+    index = EdgeIndex(graph["nodes"], graph["edges"])
+    print(f"Indexed {len(index.edge_ids)} edges in a {index.nx}x{index.ny} grid "
+          f"(cell {index.cell_size:.1f}px) in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    if sys.argv[2] == '--benchmark':
+        count = int(sys.argv[3]) if len(sys.argv) > 3 else 100000
+        # Simulated position fixes: random points along the corridors with a few pixels of noise
+        rng = np.random.default_rng(0)
+        seg = rng.integers(0, len(index.ax), count)
+        t = rng.random(count)
+        xs = index.ax[seg] + t * index.dx[seg] + rng.normal(0, FIX_NOISE, count)
+        ys = index.ay[seg] + t * index.dy[seg] + rng.normal(0, FIX_NOISE, count)
+        start = time.perf_counter()
+        index.project(xs, ys)
+        elapsed = time.perf_counter() - start
+        print(f"Projected {count} points in {elapsed:.3f}s ({count / elapsed:,.0f} fixes/s)")
+        return
+
+    hit = index.nearest(float(sys.argv[2]), float(sys.argv[3]))
+    print(hit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Append-only edit journal for annotation sessions.
+
+Every node or edge added while annotating is appended as one JSON line to
+a journal file next to the graph JSON, so a save costs one small write per
+edit instead of re-serializing the whole graph. Every COMPACT_EVERY edits
+(and when the session ends) the journal is compacted: the full graph is
+written atomically to the JSON snapshot and the journal is truncated.
+
+On startup the journal is replayed on top of the snapshot, and a torn
+last line from a crash mid-write is ignored. Every compaction bumps the
+"generation" stored in the snapshot, and a journal starts with a "base"
+record naming the generation its edits apply to. A crash between writing
+the snapshot and truncating the journal leaves a journal older than the
+snapshot, which is discarded instead of replayed. Within a generation,
+replay skips node ids and edge pairs that are already present.
+
+A near-duplicate merge (see graph_dedup.py) is journaled as one
+"merge_nodes" record with its radius and re-run on replay. Re-running it
+is only safe on the snapshot it was first applied to, which the
+generation check guarantees: edits made after it, under the new ids,
+then replay onto the same graph.
+
+Usage:
+    python edit_journal.py assets/maps/gdn_ground_floor_graph.json           # show pending edits
+    python edit_journal.py assets/maps/gdn_ground_floor_graph.json --compact
+"""
+
+import json
+import os
+import sys
+
+JOURNAL_EXTENSION = '.journal'
+COMPACT_EVERY = 200   # Edits between automatic compactions
+JOURNAL_FSYNC = True  # Force each edit to disk (survives power loss, not just crashes)
+
+
+def journal_path_for(json_path):
+    """Default journal file next to a graph JSON file."""
+    return os.path.splitext(json_path)[0] + JOURNAL_EXTENSION
+
+
+def graph_keys(graph):
+    """(node ids, unordered edge pairs) already present, used to make replay idempotent."""
+    node_ids = {node['id'] for node in graph["nodes"]}
+    edge_keys = {tuple(sorted((edge["source"], edge["target"]))) for edge in graph["edges"]}
+    return node_ids, edge_keys
+
+
+def snapshot_generation(graph):
+    """Compactions that produced this snapshot (0 for graphs never written by a journal)."""
+    return graph.get("generation", 0)
+
+
+def apply_edit(graph, record, keys=None):
+    """Apply one journal record to a {'nodes', 'edges'} dict. Returns True if it changed the graph."""
+    node_ids, edge_keys = keys if keys is not None else graph_keys(graph)
+    if record["op"] == "base":
+        return False
+    if record["op"] == "add_node":
+        node = record["node"]
+        if node['id'] in node_ids:
+            return False
+        graph["nodes"].append(node)
+        node_ids.add(node['id'])
+        return True
+    if record["op"] == "add_edge":
+        edge = record["edge"]
+        key = tuple(sorted((edge["source"], edge["target"])))
+        if key in edge_keys:
+            return False
+        graph["edges"].append(edge)
+        edge_keys.add(key)
+        return True
+    if record["op"] == "merge_nodes":
+        from graph_dedup import merge_close_nodes  # graph_dedup imports this module
+        merged, stats = merge_close_nodes(graph, record["radius"])
+        if not stats["merged_nodes"]:
+            return False
+        graph["nodes"][:] = merged["nodes"]
+        graph["edges"][:] = merged["edges"]
+        new_ids, new_edges = graph_keys(graph)
+        node_ids.clear()
+        node_ids.update(new_ids)
+        edge_keys.clear()
+        edge_keys.update(new_edges)
+        return True
+    raise ValueError(f"Unknown journal op '{record['op']}'")
+
+
+def save_snapshot(graph, json_path):
+    """Write the full graph atomically (temp file + rename)."""
+    tmp_path = json_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(graph, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, json_path)
+
+
+class EditJournal:
+    """Journal of edits to one graph JSON file."""
+
+    def __init__(self, json_path, compact_every=COMPACT_EVERY, fsync=JOURNAL_FSYNC):
+        self.json_path = json_path
+        self.path = journal_path_for(json_path)
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.pending = 0  # Edits appended since the last compaction
+        self.generation = 0  # Generation of the snapshot the journal applies to
+        self._file = None
+
+    def read(self):
+        """Complete records in the journal and the byte length they occupy.
+
+        A torn trailing line (crash mid-write) is not included in either.
+        """
+        if not os.path.exists(self.path):
+            return [], 0
+        records = []
+        valid_bytes = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    break  # Partial write from a crash; nothing valid can follow it
+                valid_bytes += len(line)
+        return records, valid_bytes
+
+    def replay(self, graph):
+        """Apply the journal to a freshly loaded snapshot. Returns the number of edits recovered."""
+        self.generation = snapshot_generation(graph)
+        keys = graph_keys(graph)
+        records, valid_bytes = self.read()
+        if records and records[0]["op"] == "base" and records[0]["generation"] < self.generation:
+            # Compacted into the snapshot already; the crash came before the truncation
+            records, valid_bytes = [], 0
+        if os.path.exists(self.path) and os.path.getsize(self.path) > valid_bytes:
+            # Cut off a torn tail (or a stale journal) so new edits are not appended after it
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_bytes)
+        applied = sum(1 for record in records if apply_edit(graph, record, keys))
+        self.pending = sum(1 for record in records if record["op"] != "base")
+        return applied
+
+    def _append(self, records, graph=None):
+        if self._file is None:
+            self._file = open(self.path, 'a')
+        lines = [json.dumps(record) + '\n' for record in records]
+        if self._file.tell() == 0:
+            lines.insert(0, json.dumps({"op": "base", "generation": self.generation}) + '\n')
+        self._file.write(''.join(lines))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.pending += len(records)
+        if graph is not None and self.pending >= self.compact_every:
+            self.compact(graph)
+
+    def add_node(self, node, graph=None):
+        """Record a new node. Passing the graph allows automatic compaction."""
+        self._append([{"op": "add_node", "node": node}], graph)
+
+    def add_edges(self, edges, graph=None):
+        """Record one or more new edges with a single write."""
+        if edges:
+            self._append([{"op": "add_edge", "edge": edge} for edge in edges], graph)
+
+    def merge_nodes(self, radius):
+        """Record a near-duplicate merge already applied to the in-memory graph."""
+        self._append([{"op": "merge_nodes", "radius": radius}])
+
+    def compact(self, graph):
+        """Write the snapshot under the next generation, then truncate the journal."""
+        self.generation = max(self.generation, snapshot_generation(graph)) + 1
+        graph["generation"] = self.generation
+        save_snapshot(graph, self.json_path)
+        self.close()
+        with open(self.path, 'w'):
+            pass
+        self.pending = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python edit_journal.py <graph.json> [--compact]")
+        return
+    json_path = sys.argv[1]
+    graph = {"nodes": [], "edges": []}
+    if os.path.exists(json_path):
+        with open(json_path, 'r') as f:
+            graph = json.load(f)
+    journal = EditJournal(json_path)
+    recovered = journal.replay(graph)
+    print(f"{journal.path}: {journal.pending} records, {recovered} not yet in the snapshot.")
+    if '--compact' in sys.argv[2:]:
+        journal.compact(graph)
+        print(f"Compacted into {json_path} ({len(graph['nodes'])} nodes, {len(graph['edges'])} edges).")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,22 @@
 Patent Diagram Generator for Pathfinder Indoor Navigation System
 Generates professional technical diagrams suitable for patent applications
 Classic patent-style black and white line drawings
+
+Unchanged figures are reused from .figure_cache/ (keyed on the figure
+function source, the rest of this module outside the figure functions,
+styling rcParams and matplotlib version); --force re-renders.
 """
 
+import argparse
+import glob
+import hashlib
+import inspect
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 from matplotlib.patches import Rectangle, FancyBboxPatch
@@ -1107,36 +1121,182 @@ def create_outdoor_navigation_module():
     plt.close()
     print("✅ Generated: figure8_outdoor_navigation_module.png")
 
+# Figure number -> (output file, function), in the order main() renders them
+FIGURES = {
+    1: ('figure1_system_architecture.png', create_system_architecture),
+    2: ('figure2_pathfinder_flow.png', create_pathfinder_flow),
+    3: ('figure3_data_processing.png', create_graph_generation),
+    4: ('figure4_system_integration.png', create_mode_transition),
+    5: ('figure5_indoor_navigation.png', create_indoor_navigation),
+    6: ('figure6_map_annotation_system.png', create_map_annotation_system),
+    7: ('figure7_user_flow.png', create_user_flow),
+    8: ('figure8_outdoor_navigation_module.png', create_outdoor_navigation_module),
+    9: ('figure9_user_interface_design.png', create_user_interface_design),
+}
+
+# Build cache: <stem>-<key>.png, where key hashes everything that affects the rendered pixels
+CACHE_DIR = '.figure_cache'
+CACHE_KEEP_PER_FIGURE = 3  # Older renders kept per figure, so reverting an edit is also instant
+CACHE_RC_PREFIXES = ('font.', 'text.', 'lines.', 'patch.', 'axes.', 'figure.', 'savefig.', 'hatch.', 'mathtext.')
+
+_shared_source = None
+
+def shared_source():
+    """This module's source minus the figure functions: the imports, constants and helpers any figure may use."""
+    global _shared_source
+    if _shared_source is None:
+        with open(os.path.abspath(__file__), 'r', encoding='utf-8') as f:
+            source = f.read()
+        for _, func in FIGURES.values():
+            source = source.replace(inspect.getsource(func), '')
+        _shared_source = source
+    return _shared_source
+
+def figure_cache_key(number):
+    """Hash of the figure function's source, the shared module source, the styling rcParams and the matplotlib version.
+
+    Editing one figure function only invalidates that figure; editing anything
+    else in the module invalidates them all.
+    """
+    filename, func = FIGURES[number]
+    digest = hashlib.sha256()
+    digest.update(matplotlib.__version__.encode())
+    digest.update(filename.encode())
+    digest.update(inspect.getsource(func).encode())
+    digest.update(shared_source().encode())
+    for key in sorted(plt.rcParams):
+        if key.startswith(CACHE_RC_PREFIXES):
+            digest.update(f"{key}={plt.rcParams[key]!r};".encode())
+    return digest.hexdigest()[:20]
+
+def cached_path(number, key):
+    stem = os.path.splitext(FIGURES[number][0])[0]
+    return os.path.join(CACHE_DIR, f"{stem}-{key}.png")
+
+def _same_file(a, b):
+    if not (os.path.exists(a) and os.path.exists(b)) or os.path.getsize(a) != os.path.getsize(b):
+        return False
+    with open(a, 'rb') as fa, open(b, 'rb') as fb:
+        return hashlib.sha256(fa.read()).digest() == hashlib.sha256(fb.read()).digest()
+
+def reuse_cached(number, key):
+    """'cached' if the output is already current, 'restored' if copied from the cache, else None."""
+    cached = cached_path(number, key)
+    if not os.path.exists(cached):
+        return None
+    output = FIGURES[number][0]
+    if _same_file(cached, output):
+        return 'cached'
+    shutil.copyfile(cached, output)
+    os.utime(cached) # Mark as recently used for pruning
+    return 'restored'
+
+def store_cached(number, key):
+    """Copy a fresh render into the cache and drop the oldest renders of the same figure."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    shutil.copyfile(FIGURES[number][0], cached_path(number, key))
+    stem = os.path.splitext(FIGURES[number][0])[0]
+    renders = sorted(glob.glob(os.path.join(CACHE_DIR, f"{stem}-*.png")), key=os.path.getmtime, reverse=True)
+    for old in renders[CACHE_KEEP_PER_FIGURE:]:
+        os.remove(old)
+
+def render_figure(number):
+    """Render one figure. Returns (number, seconds, error or None). Runs in a worker process in parallel mode."""
+    plt.switch_backend('Agg')
+    start = time.perf_counter()
+    try:
+        FIGURES[number][1]()
+    except Exception as e:
+        plt.close('all')
+        return number, time.perf_counter() - start, f"{type(e).__name__}: {e}"
+    return number, time.perf_counter() - start, None
+
+def select_figures(names):
+    """Figure numbers for CLI selections like '3', 'figure3' or 'user_flow' (all if none given)."""
+    if not names:
+        return list(FIGURES)
+    selected = []
+    for name in names:
+        matches = [n for n, (filename, _) in FIGURES.items()
+                   if name == str(n) or name.lower() in filename]
+        if not matches:
+            raise SystemExit(f"Unknown figure '{name}'. Use 1-{len(FIGURES)} or part of a file name (see --list).")
+        selected += [n for n in matches if n not in selected]
+    return selected
+
 def main():
-    """Generate all patent diagrams"""
+    """Generate all (or the selected) patent diagrams, optionally in parallel"""
+    parser = argparse.ArgumentParser(description="Generate patent-style diagrams for Pathfinder.")
+    parser.add_argument('figures', nargs='*', help="Figures to render: numbers (1-9) or part of the file name. Default: all")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="Worker processes (default: one per figure, up to the CPU count; 1 = sequential)")
+    parser.add_argument('--list', action='store_true', help="List the available figures and exit")
+    parser.add_argument('--force', action='store_true', help="Re-render even if the cached figure is current")
+    args = parser.parse_args()
+
+    if args.list:
+        for number, (filename, func) in FIGURES.items():
+            print(f"{number}: {filename} ({func.__name__})")
+        return
+
+    selected = select_figures(args.figures)
+
     print("🎨 Generating Patent-Style Diagrams for Pathfinder Indoor Navigation...")
     print("=" * 60)
     
-    create_system_architecture()
-    create_pathfinder_flow()
-    create_graph_generation()
-    create_mode_transition()
-    create_indoor_navigation()
-    create_map_annotation_system()
-    create_user_flow()
-    create_outdoor_navigation_module()
-    create_user_interface_design()
-    
+    start = time.perf_counter()
+    keys = {number: figure_cache_key(number) for number in selected}
+    status = {}
+    if not args.force:
+        for number in selected:
+            reused = reuse_cached(number, keys[number])
+            if reused:
+                status[number] = reused
+                print(f"♻️  Unchanged: {FIGURES[number][0]} ({reused})")
+    to_render = [number for number in selected if number not in status]
+    jobs = args.jobs or max(1, min(len(to_render), os.cpu_count() or 1))
+
+    timings = {}
+    errors = {}
+    if jobs <= 1:
+        results = map(render_figure, to_render)
+    else:
+        # Each figure is independent, so the set takes about as long as the slowest one
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(render_figure, to_render))
+    for number, seconds, error in results:
+        if error:
+            errors[number] = error
+            status[number] = 'failed'
+            print(f"❌ Failed: {FIGURES[number][0]} ({error})")
+            continue
+        timings[number] = seconds
+        store_cached(number, keys[number])
+        status[number] = 'rendered'
+    wall = time.perf_counter() - start
+
+    rendered = len(timings)
+    cached = len(selected) - len(to_render)
     print("=" * 60)
-    print("🎉 All diagrams generated successfully!")
-    print("\nGenerated files:")
-    print("• figure1_system_architecture.png")
-    print("• figure2_pathfinder_flow.png")
-    print("• figure3_data_processing.png")
-    print("• figure4_system_integration.png")
-    print("• figure5_indoor_navigation.png")
-    print("• figure6_map_annotation_system.png")
-    print("• figure7_user_flow.png")
-    print("• figure8_outdoor_navigation_module.png")
-    print("• figure9_user_interface_design.png")
+    if errors:
+        print(f"⚠️  {rendered} rendered, {cached} from cache, {len(errors)} failed.")
+    elif len(selected) < len(FIGURES):
+        print(f"🎉 {len(selected)} of {len(FIGURES)} diagrams up to date ({rendered} rendered, {cached} from cache).")
+    else:
+        print(f"🎉 All diagrams up to date ({rendered} rendered, {cached} from cache).")
+    print("\nFiles:")
+    for number in sorted(selected):
+        timing = f"{timings[number]:6.2f}s" if number in timings else f"{status[number]:>7}"
+        print(f"• {FIGURES[number][0]:<40} {timing}")
+    total = sum(timings.values())
+    print(f"\n⏱️  {len(selected)} figures in {wall:.2f}s wall time: {rendered} rendered with {jobs} worker(s) "
+          f"(sum {total:.2f}s, slowest {max(timings.values(), default=0):.2f}s), {cached} from cache, "
+          f"{len(errors)} failed")
+    if errors:
+        raise SystemExit(1)
     print("\n📋 These high-resolution PNG files are ready for your patent application!")
     print("\n🎯 Style: Classic patent diagrams with black and white line drawings")
     print("📐 Format: Clean rectangular boxes, simple arrows, professional borders")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,227 @@
+"""
+Compact binary companion format for annotated graphs.
+
+The JSON graph written by map_annotator.py is convenient to edit but slow
+to parse at campus scale. This module writes the same graph as a single
+flat file that can be opened with numpy.memmap and used without parsing:
+
+    header      magic, version, counts and the byte offset of every section
+    node_ids    int32[n]       original node ids
+    coords      int32[n, 2]    (x, y) pixel coordinates
+    type_index  uint8[n]       index into the string table ('room', 'path', ...)
+    name_index  int32[n]       index into the string table, -1 for no name
+    indptr      int64[n + 1]   CSR row pointers (undirected, both directions)
+    indices     int32[m]       CSR neighbour node indices
+    weights     float32[m]     CSR edge weights
+    str_offsets int64[s + 1]   string table offsets into str_bytes
+    str_bytes   uint8[...]     UTF-8 interned strings
+
+Usage:
+    python graph_binary.py assets/maps/gdn_ground_floor_graph.json
+"""
+
+import json
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+MAGIC = b'PFGRAPH\x00'
+VERSION = 1
+BINARY_EXTENSION = '.pfgraph'
+
+_SECTIONS = [
+    ('node_ids', np.int32),
+    ('coords', np.int32),
+    ('type_index', np.uint8),
+    ('name_index', np.int32),
+    ('indptr', np.int64),
+    ('indices', np.int32),
+    ('weights', np.float32),
+    ('str_offsets', np.int64),
+    ('str_bytes', np.uint8),
+]
+# magic, version, n_nodes, n_adj, n_strings, then one (offset, length) pair per section
+_HEADER = struct.Struct('<8sI4xQQQ' + 'QQ' * len(_SECTIONS))
+_ALIGN = 8
+
+
+def binary_path_for(json_path):
+    """Companion binary path next to a graph JSON file."""
+    return os.path.splitext(json_path)[0] + BINARY_EXTENSION
+
+
+def _build_arrays(graph):
+    nodes = graph.get("nodes", [])
+    edges = graph.get("edges", [])
+    n = len(nodes)
+
+    strings = []
+    interned = {}
+
+    def intern(value):
+        if value not in interned:
+            interned[value] = len(strings)
+            strings.append(value)
+        return interned[value]
+
+    # Types go first so their indices fit in a uint8
+    type_index = np.array([intern(node['type']) for node in nodes], dtype=np.int64)
+    if n and type_index.max() > 255:
+        raise ValueError("More than 256 distinct node types.")
+    name_index = np.array([-1 if node.get('name') is None else intern(node['name']) for node in nodes],
+                          dtype=np.int32)
+
+    node_ids = np.array([node['id'] for node in nodes], dtype=np.int32)
+    coords = np.array([(node['x'], node['y']) for node in nodes], dtype=np.int32).reshape(n, 2)
+
+    position = {node['id']: k for k, node in enumerate(nodes)}
+    src = np.array([position[edge["source"]] for edge in edges], dtype=np.int64)
+    dst = np.array([position[edge["target"]] for edge in edges], dtype=np.int64)
+    weight = np.array([edge["weight"] for edge in edges], dtype=np.float32)
+
+    rows = np.concatenate([src, dst])
+    cols = np.concatenate([dst, src])
+    order = np.argsort(rows, kind='stable')
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+
+    encoded = [s.encode('utf-8') for s in strings]
+    str_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=str_offsets[1:])
+    str_bytes = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+    return {
+        'node_ids': node_ids,
+        'coords': coords,
+        'type_index': type_index.astype(np.uint8),
+        'name_index': name_index,
+        'indptr': indptr,
+        'indices': cols[order].astype(np.int32),
+        'weights': np.concatenate([weight, weight])[order],
+        'str_offsets': str_offsets,
+        'str_bytes': str_bytes,
+    }
+
+
+def write_binary_graph(graph, path):
+    """Write a {'nodes', 'edges'} graph dict in the binary format."""
+    arrays = _build_arrays(graph)
+
+    layout = []
+    offset = _HEADER.size
+    for name, dtype in _SECTIONS:
+        offset += -offset % _ALIGN
+        data = np.ascontiguousarray(arrays[name], dtype=dtype)
+        layout.append((offset, data.nbytes, data))
+        offset += data.nbytes
+
+    header = _HEADER.pack(
+        MAGIC, VERSION, len(arrays['node_ids']), len(arrays['indices']), len(arrays['str_offsets']) - 1,
+        *[value for off, nbytes, _ in layout for value in (off, nbytes)]
+    )
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        for off, _, data in layout:
+            f.write(b'\x00' * (off - f.tell()))
+            f.write(data.tobytes())
+    os.replace(tmp_path, path)
+
+
+class BinaryGraph:
+    """Memory-mapped view of a binary graph file. Nothing is parsed up front."""
+
+    def __init__(self, path):
+        self.path = path
+        self._mm = np.memmap(path, dtype=np.uint8, mode='r')
+        fields = _HEADER.unpack(bytes(self._mm[:_HEADER.size]))
+        magic, version = fields[0], fields[1]
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} binary graph file.")
+        self.num_nodes, self.num_adjacent, self.num_strings = fields[2:5]
+
+        pairs = fields[5:]
+        for k, (name, dtype) in enumerate(_SECTIONS):
+            off, nbytes = pairs[2 * k], pairs[2 * k + 1]
+            setattr(self, name, self._mm[off:off + nbytes].view(dtype))
+        self.coords = self.coords.reshape(-1, 2)
+        self._index_of = None
+
+    @property
+    def num_edges(self):
+        return self.num_adjacent // 2
+
+    def string(self, index):
+        start, end = self.str_offsets[index], self.str_offsets[index + 1]
+        return bytes(self.str_bytes[start:end]).decode('utf-8')
+
+    def node_type(self, i):
+        return self.string(self.type_index[i])
+
+    def name(self, i):
+        index = self.name_index[i]
+        return None if index < 0 else self.string(index)
+
+    def index_of(self, node_id):
+        """Node position for an original node id."""
+        if self._index_of is None:
+            ids = np.asarray(self.node_ids)
+            if np.array_equal(ids, np.arange(len(ids))):
+                self._index_of = range(len(ids))
+            else:
+                self._index_of = {int(v): k for k, v in enumerate(ids.tolist())}
+        return self._index_of[node_id]
+
+    def neighbors(self, i):
+        """(neighbour indices, weights) for node position i."""
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return self.indices[start:end], self.weights[start:end]
+
+    def to_graph_dict(self):
+        """Rebuild a JSON-style graph dict (each undirected edge once)."""
+        ids = self.node_ids.tolist()
+        coords = self.coords.tolist()
+        nodes = [
+            {"id": ids[i], "x": coords[i][0], "y": coords[i][1],
+             "type": self.node_type(i), "name": self.name(i)}
+            for i in range(self.num_nodes)
+        ]
+        rows = np.repeat(np.arange(self.num_nodes), np.diff(self.indptr))
+        cols = np.asarray(self.indices)
+        weights = np.asarray(self.weights)
+        keep = rows < cols
+        keep[np.nonzero(rows == cols)[0][::2]] = True # Self-loops are stored twice
+        edges = [
+            {"source": ids[a], "target": ids[b], "weight": float(w)}
+            for a, b, w in zip(rows[keep].tolist(), cols[keep].tolist(), weights[keep].tolist())
+        ]
+        return {"nodes": nodes, "edges": edges}
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python graph_binary.py <graph.json> [output.pfgraph]")
+        return
+    json_path = sys.argv[1]
+    out_path = sys.argv[2] if len(sys.argv) > 2 else binary_path_for(json_path)
+
+    start = time.perf_counter()
+    with open(json_path, 'r') as f:
+        graph = json.load(f)
+    json_time = time.perf_counter() - start
+
+    write_binary_graph(graph, out_path)
+
+    start = time.perf_counter()
+    loaded = BinaryGraph(out_path)
+    load_time = time.perf_counter() - start
+    print(f"Wrote {loaded.num_nodes} nodes / {loaded.num_edges} edges to {out_path} "
+          f"({os.path.getsize(out_path)} bytes, JSON {os.path.getsize(json_path)} bytes)")
+    print(f"JSON parse: {json_time * 1000:.2f} ms, binary open: {load_time * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
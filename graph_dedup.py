@@ -0,0 +1,151 @@
+"""
+Merge near-coincident nodes left behind by repeated annotation sessions.
+
+Nodes closer than MERGE_RADIUS pixels are found with the spatial grid from
+spatial_index.py, grouped with the array union-find from graph_validate.py
+and collapsed onto the earliest node of each group. Edges are rewritten to
+the surviving nodes, self-loops and duplicate edges are dropped (the last
+copy of a pair is kept, as the networkx loaders and graph_validate.py do),
+and the node ids are compacted back to 0..n-1 in their original order, so
+the entrance keeps id 0. Every step is a vectorized pass, so the merge
+stays near-linear in the size of the graph.
+
+Only nodes of the same type and name are merged: a room is never folded
+into a path node, and two different rooms are never merged.
+
+Usage:
+    python graph_dedup.py assets/maps/gdn_ground_floor_graph.json --dry-run
+    python graph_dedup.py assets/maps/gdn_ground_floor_graph.json --radius 4
+"""
+
+import argparse
+import json
+import math
+import time
+
+import numpy as np
+
+from edit_journal import EditJournal
+from graph_validate import connected_components
+from spatial_index import GridIndex
+
+MERGE_RADIUS = 4.0  # Pixels; nodes closer than this are treated as the same point
+
+
+def find_merge_groups(nodes, radius=MERGE_RADIUS):
+    """Representative position for every node (itself if it is not merged)."""
+    if not radius > 0:
+        raise ValueError(f"merge radius must be positive, got {radius}")
+    n = len(nodes)
+    if n < 2:
+        return np.arange(n, dtype=np.int64)
+    xs = np.array([node['x'] for node in nodes], dtype=np.float64)
+    ys = np.array([node['y'] for node in nodes], dtype=np.float64)
+    i, j, _ = GridIndex(xs, ys, radius).query_pairs(radius)
+    keep = i < j
+    i, j = i[keep], j[keep]
+
+    # Only identical (type, name) nodes may be merged
+    kinds = {}
+    kind = np.array([kinds.setdefault((node['type'], node.get('name')), len(kinds)) for node in nodes],
+                    dtype=np.int64)
+    same = kind[i] == kind[j]
+    return connected_components(n, i[same], j[same])
+
+
+def merge_close_nodes(graph, radius=MERGE_RADIUS):
+    """Collapse near-coincident nodes. Returns (new_graph, stats).
+
+    stats["id_map"] maps every old node id to its new id.
+    """
+    nodes, edges = graph["nodes"], graph["edges"]
+    n = len(nodes)
+    rep = find_merge_groups(nodes, radius)
+    survivors = np.flatnonzero(rep == np.arange(n))
+    new_position = np.full(n, -1, dtype=np.int64)
+    new_position[survivors] = np.arange(len(survivors))
+    target = new_position[rep]  # New id of every old position
+
+    position = {node['id']: k for k, node in enumerate(nodes)}
+    src = np.array([position.get(e["source"], -1) for e in edges], dtype=np.int64)
+    dst = np.array([position.get(e["target"], -1) for e in edges], dtype=np.int64)
+    known = (src >= 0) & (dst >= 0)
+    a = np.where(known, target[np.maximum(src, 0)], -1)
+    b = np.where(known, target[np.maximum(dst, 0)], -1)
+
+    # Keep the last edge of every new unordered pair, and no self-loops
+    lo, hi = np.minimum(a, b), np.maximum(a, b)
+    usable = known & (lo != hi)
+    keys = np.where(usable, lo * max(len(survivors), 1) + hi, -1)
+    _, last_reversed = np.unique(keys[::-1], return_index=True)
+    keep = np.zeros(len(edges), dtype=bool)
+    keep[len(edges) - 1 - last_reversed] = True
+    keep &= usable
+
+    new_nodes = []
+    for new_id, k in enumerate(survivors.tolist()):
+        node = dict(nodes[k])
+        node['id'] = new_id
+        new_nodes.append(node)
+
+    moved = (rep[np.maximum(src, 0)] != np.maximum(src, 0)) | (rep[np.maximum(dst, 0)] != np.maximum(dst, 0))
+    new_edges = []
+    for k in np.flatnonzero(keep).tolist():
+        edge = dict(edges[k])
+        edge["source"], edge["target"] = int(a[k]), int(b[k])
+        if moved[k]:
+            # An endpoint now sits on its group's representative, so the length changed
+            na, nb = new_nodes[edge["source"]], new_nodes[edge["target"]]
+            edge["weight"] = math.dist((na['x'], na['y']), (nb['x'], nb['y']))
+        new_edges.append(edge)
+
+    stats = {
+        "merged_nodes": n - len(survivors),
+        "groups": int(len(np.unique(rep[rep != np.arange(n)]))),
+        "dropped_edges": len(edges) - len(new_edges),
+        "id_map": {nodes[k]['id']: int(target[k]) for k in range(n)},
+    }
+    return {"nodes": new_nodes, "edges": new_edges}, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge near-coincident nodes in an annotated graph.")
+    parser.add_argument('graph', help="Graph JSON file")
+    parser.add_argument('--radius', type=float, default=MERGE_RADIUS, help="Merge distance in pixels")
+    parser.add_argument('--output', default=None, help="Where to write the result (default: in place)")
+    parser.add_argument('--dry-run', action='store_true', help="Only report what would be merged")
+    args = parser.parse_args()
+    if args.radius <= 0:
+        parser.error("--radius must be positive")
+
+    with open(args.graph, 'r') as f:
+        graph = json.load(f)
+    # Unsaved annotator edits must be folded in first: ids are about to change
+    journal = EditJournal(args.graph)
+    recovered = journal.replay(graph)
+    if recovered:
+        print(f"Applied {recovered} pending edits from {journal.path}.")
+
+    start = time.perf_counter()
+    merged, stats = merge_close_nodes(graph, args.radius)
+    elapsed = time.perf_counter() - start
+    print(f"{len(graph['nodes'])} -> {len(merged['nodes'])} nodes ({stats['merged_nodes']} merged in "
+          f"{stats['groups']} groups), {len(graph['edges'])} -> {len(merged['edges'])} edges "
+          f"in {elapsed * 1000:.1f} ms")
+    moved = [(old, new) for old, new in stats["id_map"].items() if old != new]
+    if moved:
+        print(f"Renumbered {len(moved)} nodes, e.g. " + ", ".join(f"{o}->{n}" for o, n in moved[:10]))
+
+    if args.dry_run or not stats["merged_nodes"]:
+        return
+    if args.output and args.output != args.graph:
+        with open(args.output, 'w') as f:
+            json.dump(merged, f, indent=4)
+        print(f"Written to {args.output}")
+    else:
+        journal.compact(merged)
+        print(f"Written to {args.graph}")
+
+
+if __name__ == "__main__":
+    main()
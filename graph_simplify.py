@@ -0,0 +1,174 @@
+"""
+Export-time simplification: collapse degree-2 corridor chains into single edges.
+
+A 'path' node with exactly two neighbours is only a waypoint along a
+corridor. Every maximal run of such waypoints between two junctions
+(rooms, connectors, or path nodes of any other degree) is replaced by one
+edge whose weight is the summed length of the run. The waypoints are kept
+on the edge so routes can still be drawn exactly:
+
+    {"source": 12, "target": 40, "weight": 96.3,
+     "via": [13, 14, 15], "polyline": [[310, 220], [330, 221], [352, 224]]}
+
+"via" and "polyline" run from source to target. Node ids are unchanged, so
+room ids mean the same thing in both graphs. When two chains join the same
+pair of junctions only the shorter one is kept, and a chain that leads back
+to its own junction is dropped. Neither can be part of a shortest route.
+Rings of waypoints with no junction at all are left as they are.
+
+Usage:
+    python graph_simplify.py assets/maps/gdn_ground_floor_graph.json
+"""
+
+import json
+import math
+import os
+import sys
+import time
+
+from route_engine import RouteEngine
+
+SIMPLIFIED_SUFFIX = '_simplified.json'
+
+
+def simplified_path_for(json_path):
+    """Simplified companion path next to a graph JSON file."""
+    return os.path.splitext(json_path)[0] + SIMPLIFIED_SUFFIX
+
+
+def simplify_graph(graph):
+    """Return a new graph with every degree-2 'path' chain collapsed into one edge."""
+    nodes, edges = graph["nodes"], graph["edges"]
+    by_id = {node['id']: node for node in nodes}
+    adjacency = {node['id']: {} for node in nodes}
+    for edge in edges:
+        s, t, w = edge["source"], edge["target"], edge["weight"]
+        if s == t or s not in adjacency or t not in adjacency:
+            continue
+        if w < adjacency[s].get(t, math.inf):
+            adjacency[s][t] = adjacency[t][s] = w
+
+    kept = {v for v in adjacency if by_id[v]['type'] != 'path' or len(adjacency[v]) != 2}
+    visited = set()
+
+    def walk(a, b):
+        """Follow waypoints from junction a through neighbour b to the next junction."""
+        prev, cur, via, weight = a, b, [], adjacency[a][b]
+        while cur not in kept:
+            visited.add(cur)
+            via.append(cur)
+            nxt = next(v for v in adjacency[cur] if v != prev)
+            weight += adjacency[cur][nxt]
+            prev, cur = cur, nxt
+        return cur, via, weight
+
+    chains = {}  # (lo, hi) -> (weight, via from lo to hi)
+    for a in adjacency:
+        if a not in kept:
+            continue
+        for b in adjacency[a]:
+            end, via, weight = walk(a, b)
+            if end == a:
+                continue
+            key = (a, end) if a < end else (end, a)
+            if key not in chains or weight < chains[key][0]:
+                chains[key] = (weight, via if key[0] == a else via[::-1])
+
+    # Rings with no junction: keep every node and the original edges
+    for v in adjacency:
+        if v in kept or v in visited:
+            continue
+        ring = [v]
+        prev, cur = v, next(iter(adjacency[v]))
+        while cur != v:
+            ring.append(cur)
+            prev, cur = cur, next(u for u in adjacency[cur] if u != prev)
+        kept.update(ring)
+        visited.update(ring)
+        for a, b in zip(ring, ring[1:] + ring[:1]):
+            key = (a, b) if a < b else (b, a)
+            chains[key] = (adjacency[a][b], [])
+
+    new_nodes = [dict(node) for node in nodes if node['id'] in kept]
+    new_edges = []
+    for (s, t), (weight, via) in chains.items():
+        edge = {"source": s, "target": t, "weight": weight}
+        if via:
+            edge["via"] = via
+            edge["polyline"] = [[by_id[v]['x'], by_id[v]['y']] for v in via]
+        new_edges.append(edge)
+    return {"nodes": new_nodes, "edges": new_edges}
+
+
+def _via_lookup(graph):
+    return {(e["source"], e["target"]): e.get("via", []) for e in graph["edges"]}
+
+
+def expand_path(path, simplified):
+    """Turn a route over the simplified graph back into full-graph node ids."""
+    if not path:
+        return path
+    lookup = _via_lookup(simplified)
+    full = [path[0]]
+    for a, b in zip(path, path[1:]):
+        via = lookup[(a, b)] if (a, b) in lookup else lookup[(b, a)][::-1]
+        full.extend(via)
+        full.append(b)
+    return full
+
+
+def path_polyline(path, simplified):
+    """Drawing points [(x, y), ...] for a route over the simplified graph."""
+    if not path:
+        return []
+    coords = {node['id']: (node['x'], node['y']) for node in simplified["nodes"]}
+    geometry = {(e["source"], e["target"]): [tuple(p) for p in e.get("polyline", [])] for e in simplified["edges"]}
+    points = [coords[path[0]]]
+    for a, b in zip(path, path[1:]):
+        points.extend(geometry[(a, b)] if (a, b) in geometry else geometry[(b, a)][::-1])
+        points.append(coords[b])
+    return points
+
+
+def write_simplified_graph(graph, path):
+    simplified = simplify_graph(graph)
+    with open(path, 'w') as f:
+        json.dump(simplified, f, indent=4)
+    return simplified
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python graph_simplify.py <graph.json> [output.json]")
+        return
+    json_path = sys.argv[1]
+    output = sys.argv[2] if len(sys.argv) > 2 else simplified_path_for(json_path)
+    with open(json_path, 'r') as f:
+        graph = json.load(f)
+
+    start = time.perf_counter()
+    simplified = write_simplified_graph(graph, output)
+    print(f"{len(graph['nodes'])} -> {len(simplified['nodes'])} nodes, "
+          f"{len(graph['edges'])} -> {len(simplified['edges'])} edges "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms -> {output}")
+
+    # Same room-to-room routes on both graphs, with less search work on the simplified one
+    full_engine = RouteEngine(graph["nodes"], graph["edges"], method='dijkstra')
+    small_engine = RouteEngine(simplified["nodes"], simplified["edges"], method='dijkstra')
+    pairs = full_engine.room_pairs()
+    expanded = {"full": 0, "simplified": 0}
+    mismatches = 0
+    for s, t in pairs:
+        full = full_engine.search(s, t)
+        small = small_engine.search(s, t)
+        expanded["full"] += full.expanded
+        expanded["simplified"] += small.expanded
+        if (full.path is None) != (small.path is None) or (
+                full.path and abs(full_engine.path_length(expand_path(small.path, simplified)) - full.distance) > 1e-6):
+            mismatches += 1
+    print(f"{len(pairs)} room pairs: {expanded['full']} -> {expanded['simplified']} nodes expanded, "
+          f"{mismatches} route mismatches")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Validation and repair for annotated graphs.
+
+Works on NumPy arrays built once from the node/edge lists, so every check
+is a handful of vectorized passes and scales to multi-million-edge graphs:
+
+    dangling edges      source or target is not a node id
+    self-loops          source == target
+    duplicate edges     the same unordered pair more than once (every copy but the last)
+    orphan rooms        'room' nodes with no edge at all
+    components          connected components (array-based union-find)
+    unreachable rooms   rooms outside the entrance's component
+
+With --fix, dangling edges, self-loops and duplicates are dropped. Given
+the floor's walkable mask (--mask), each orphan room is also linked to its
+nearest 'path' node reachable from the entrance that it can see without
+crossing a wall; without a mask orphan rooms are only reported.
+Disconnected components are only reported: bridging them automatically
+could link through walls.
+
+Usage:
+    python graph_validate.py assets/maps/gdn_ground_floor_graph.json
+    python graph_validate.py assets/maps/gdn_ground_floor_graph.json --fix --mask assets/binary_paint_cleaned_gdn.png
+"""
+
+import argparse
+import json
+import math
+import time
+
+import cv2
+import numpy as np
+
+from edit_journal import save_snapshot
+from line_of_sight import load_clearance_mask, segments_clear
+
+ENTRANCE_ID = 0        # Node every room must be reachable from ('Entrance' on GDN)
+MAX_LISTED = 20        # Ids printed per problem before truncating
+LINK_CANDIDATES = 8    # Nearest path nodes tried, in order, when linking an orphan room
+
+
+def graph_arrays(graph):
+    """Node ids/coords/types and edge endpoint positions (-1 for unknown ids)."""
+    nodes = graph["nodes"]
+    ids = np.array([node['id'] for node in nodes], dtype=np.int64)
+    xs = np.array([node['x'] for node in nodes], dtype=np.float64)
+    ys = np.array([node['y'] for node in nodes], dtype=np.float64)
+    is_room = np.array([node['type'] == 'room' for node in nodes], dtype=bool)
+    is_path = np.array([node['type'] == 'path' for node in nodes], dtype=bool)
+    src_ids = np.array([edge["source"] for edge in graph["edges"]], dtype=np.int64)
+    dst_ids = np.array([edge["target"] for edge in graph["edges"]], dtype=np.int64)
+
+    order = np.argsort(ids, kind='stable')
+    sorted_ids = ids[order]
+
+    def positions(edge_ids):
+        if not len(ids):
+            return np.full(len(edge_ids), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(sorted_ids, edge_ids), len(ids) - 1)
+        return np.where(sorted_ids[pos] == edge_ids, order[pos], -1)
+
+    return {
+        'ids': ids, 'xs': xs, 'ys': ys, 'is_room': is_room, 'is_path': is_path,
+        'src': positions(src_ids), 'dst': positions(dst_ids),
+    }
+
+
+def connected_components(n, src, dst):
+    """Component label (smallest member position) for every node.
+
+    Union-find on arrays: each round hooks every root onto the smallest root
+    it shares an edge with, then pointer jumping flattens the trees. Each
+    round is linear in the edge count and only a few rounds are needed.
+    """
+    parent = np.arange(n, dtype=np.int64)
+    while True:
+        ru, rv = parent[src], parent[dst]
+        cross = ru != rv
+        if not cross.any():
+            return parent
+        lo = np.minimum(ru[cross], rv[cross])
+        hi = np.maximum(ru[cross], rv[cross])
+        np.minimum.at(parent, hi, lo)
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+
+
+def validate_graph(graph, entrance_id=ENTRANCE_ID):
+    """Check a {'nodes', 'edges'} dict. Returns a report dict of problems."""
+    arr = graph_arrays(graph)
+    n = len(arr['ids'])
+    src, dst = arr['src'], arr['dst']
+
+    dangling = (src < 0) | (dst < 0)
+    self_loop = ~dangling & (src == dst)
+    valid = ~dangling & ~self_loop
+    edge_index = np.flatnonzero(valid)
+    lo = np.minimum(src[valid], dst[valid])
+    hi = np.maximum(src[valid], dst[valid])
+    # The last copy of a pair is kept: the networkx loaders overwrite earlier weights with later ones
+    _, last_reversed = np.unique((lo * max(n, 1) + hi)[::-1], return_index=True)
+    duplicate = np.ones(len(edge_index), dtype=bool)
+    duplicate[len(edge_index) - 1 - last_reversed] = False
+    duplicates = edge_index[duplicate]
+
+    # Structure is judged on the clean edges only
+    clean_src, clean_dst = lo[~duplicate], hi[~duplicate]
+    degree = np.bincount(np.concatenate([clean_src, clean_dst]), minlength=n)
+    labels = connected_components(n, clean_src, clean_dst)
+    component_ids, component_sizes = np.unique(labels, return_counts=True)
+
+    entrance = np.flatnonzero(arr['ids'] == entrance_id)
+    if len(entrance):
+        # Reachable from the entrance == in the entrance's component
+        reached = labels == labels[entrance[0]]
+        unreachable = arr['ids'][arr['is_room'] & ~reached]
+    else:
+        reached = None
+        unreachable = np.empty(0, dtype=np.int64)
+
+    ids = arr['ids']
+    return {
+        "nodes": n,
+        "edges": len(src),
+        "dangling_edges": np.flatnonzero(dangling).tolist(),
+        "self_loops": np.flatnonzero(self_loop).tolist(),
+        "duplicate_edges": duplicates.tolist(),
+        "orphan_rooms": ids[arr['is_room'] & (degree == 0)].tolist(),
+        "components": len(component_ids),
+        "component_sizes": sorted(component_sizes.tolist(), reverse=True),
+        "entrance_id": entrance_id,
+        "entrance_found": bool(len(entrance)),
+        "unreachable_rooms": unreachable.tolist(),
+        "_arrays": arr,
+        "_reached": reached,
+    }
+
+
+def is_clean(report):
+    return not (report["dangling_edges"] or report["self_loops"] or report["duplicate_edges"]
+                or report["orphan_rooms"] or report["unreachable_rooms"] or report["components"] > 1)
+
+
+def repair_graph(graph, report, walkable=None, mask_scale=1.0):
+    """Drop bad edges and link orphan rooms, in place. Returns a summary of fixes.
+
+    Orphan rooms are only linked when a walkable mask is given, and only to
+    a path node in line of sight; the rooms left orphaned are listed in
+    "unlinked_rooms".
+    """
+    drop = set(report["dangling_edges"]) | set(report["self_loops"]) | set(report["duplicate_edges"])
+    if drop:
+        graph["edges"] = [edge for k, edge in enumerate(graph["edges"]) if k not in drop]
+
+    arr = report["_arrays"]
+    # Prefer path nodes the entrance can already reach, so the new link actually helps
+    candidates = arr['is_path'] if report["_reached"] is None else arr['is_path'] & report["_reached"]
+    if not candidates.any():
+        candidates = arr['is_path']
+    cand = np.flatnonzero(candidates)
+
+    linked, unlinked = [], []
+    position = {node_id: k for k, node_id in enumerate(arr['ids'].tolist())}
+    for room_id in report["orphan_rooms"]:
+        if walkable is None or not len(cand):
+            unlinked.append(room_id)
+            continue
+        k = position[room_id]
+        d2 = (arr['xs'][cand] - arr['xs'][k]) ** 2 + (arr['ys'][cand] - arr['ys'][k]) ** 2
+        nearest = cand[np.argsort(d2, kind='stable')[:LINK_CANDIDATES]]
+        clear = segments_clear(walkable, np.full(len(nearest), arr['xs'][k]), np.full(len(nearest), arr['ys'][k]),
+                               arr['xs'][nearest], arr['ys'][nearest], scale=mask_scale)
+        if not clear.any():
+            unlinked.append(room_id)
+            continue
+        target = int(nearest[np.argmax(clear)])
+        target_id = int(arr['ids'][target])
+        weight = math.dist((arr['xs'][k], arr['ys'][k]), (arr['xs'][target], arr['ys'][target]))
+        graph["edges"].append({"source": room_id, "target": target_id, "weight": weight})
+        linked.append((room_id, target_id))
+    return {"dropped_edges": len(drop), "linked_rooms": linked, "unlinked_rooms": unlinked}
+
+
+def print_report(report, graph=None):
+    names = {}
+    if graph is not None:
+        names = {node['id']: node.get('name') for node in graph["nodes"]}
+
+    def listed(values, label):
+        shown = [f"{v} ({names[v]})" if names.get(v) else str(v) for v in values[:MAX_LISTED]]
+        more = f" ... +{len(values) - MAX_LISTED} more" if len(values) > MAX_LISTED else ""
+        print(f"  {label}: {len(values)}" + (f" -> {', '.join(shown)}{more}" if values else ""))
+
+    print(f"Graph: {report['nodes']} nodes, {report['edges']} edges")
+    listed(report["dangling_edges"], "Dangling edges (edge index)")
+    listed(report["self_loops"], "Self-loops (edge index)")
+    listed(report["duplicate_edges"], "Duplicate edges (edge index)")
+    listed(report["orphan_rooms"], "Orphan rooms")
+    sizes = report["component_sizes"]
+    print(f"  Connected components: {report['components']}"
+          + (f" (sizes {sizes[:MAX_LISTED]})" if report["components"] > 1 else ""))
+    if report["entrance_found"]:
+        listed(report["unreachable_rooms"], f"Rooms unreachable from node {report['entrance_id']}")
+    else:
+        print(f"  Entrance node {report['entrance_id']} not found; reachability not checked.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate (and optionally repair) an annotated graph.")
+    parser.add_argument('graph', help="Graph JSON file")
+    parser.add_argument('--fix', action='store_true', help="Drop bad edges and link orphan rooms")
+    parser.add_argument('--mask', default=None, help="Walkable mask of the floor; orphan rooms are only linked with one")
+    parser.add_argument('--reference', default=None,
+                        help="Map image whose pixel grid the graph coordinates use (default: the mask's)")
+    parser.add_argument('--output', default=None, help="Where to write the repaired graph (default: in place)")
+    parser.add_argument('--entrance', type=int, default=ENTRANCE_ID, help="Node id reachability is checked from")
+    args = parser.parse_args()
+
+    with open(args.graph, 'r') as f:
+        graph = json.load(f)
+
+    start = time.perf_counter()
+    report = validate_graph(graph, args.entrance)
+    elapsed = time.perf_counter() - start
+    print_report(report, graph)
+    print(f"Validated in {elapsed * 1000:.1f} ms.")
+
+    if not args.fix:
+        return
+    if is_clean(report):
+        print("Nothing to fix.")
+        return
+    walkable = None
+    if args.mask:
+        shape = None
+        if args.reference:
+            reference = cv2.imread(args.reference)
+            if reference is None:
+                print(f"Could not load reference image {args.reference}. Using mask coordinates.")
+            else:
+                shape = reference.shape[:2]
+        walkable = load_clearance_mask(args.mask, shape)
+    fixes = repair_graph(graph, report, walkable)
+    print(f"\nDropped {fixes['dropped_edges']} edges, linked {len(fixes['linked_rooms'])} orphan rooms:")
+    for room_id, target_id in fixes["linked_rooms"][:MAX_LISTED]:
+        print(f"  {room_id} -> {target_id}")
+    if fixes["unlinked_rooms"]:
+        reason = "no path node in line of sight" if walkable is not None else "no --mask given"
+        print(f"  Left {len(fixes['unlinked_rooms'])} orphan rooms to link by hand ({reason}): "
+              f"{fixes['unlinked_rooms'][:MAX_LISTED]}")
+    output = args.output or args.graph
+    save_snapshot(graph, output)
+    print(f"Repaired graph written to {output}\n")
+    print_report(validate_graph(graph, args.entrance), graph)
+
+
+if __name__ == "__main__":
+    main()
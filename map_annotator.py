@@ -1,3 +1,4 @@
+import argparse
 import cv2
 import numpy as np
 import networkx as nx
@@ -6,77 +7,289 @@ import json
 import os
 import sys
 
+from annotation_canvas import AnnotationCanvas, SnapshotWriter, node_color
+from corridor_snap import CorridorSnapper
+from edge_index import EdgeIndex, route_from_point
+from edit_journal import EditJournal
+from graph_binary import binary_path_for, write_binary_graph
+from graph_dedup import MERGE_RADIUS, merge_close_nodes
+from graph_simplify import simplified_path_for, write_simplified_graph
+from graph_validate import is_clean, print_report, validate_graph
+from line_of_sight import load_clearance_mask
+from map_pyramid import PYRAMID_MIN_FILE_BYTES, MapPyramid, PyramidViewport
+from multi_floor import CONNECTOR_TYPES, Building
+from pipeline_trace import PipelineTrace
+from room_index import RoomIndex, rooms_path_for
+from route_engine import RouteEngine
+from route_overlay import render_routes, write_outputs
+from spatial_index import auto_link_path_nodes
+
 # --- CONFIGURATION ---
 MAP_IMAGE_PATH = os.path.join('assets', 'maps', 'gdn_ground_floor_clean.png')
 OUTPUT_JSON_FILE = os.path.join('assets', 'maps', 'gdn_ground_floor_graph.json')
 TEMP_IMAGE_PATH = 'temp_annotated_map.png' # This is your reference map
 MAX_DISPLAY_HEIGHT = 800
 MAX_AUTO_LINK_DISTANCE = 40.0 
+WALL_MASK_PATH = os.path.join('assets', 'binary_paint_cleaned_gdn.png') # Walkable mask for line-of-sight checks; None skips them
+ROUTING_METHOD = 'astar' # 'dijkstra', 'astar' or 'bidirectional' (A*)
+BUILDING_FILE = os.path.join('assets', 'maps', 'gdn_building.json') # Floors of the building (see multi_floor.py)
+NODE_TYPES = ['room', 'path'] + list(CONNECTOR_TYPES)
+USE_PYRAMID = None # True/False forces the tiled viewport on/off; None picks it for very large map files
+REFERENCE_MAX_DIM = 4096 # Size of the reference/verification images in pyramid mode
+ROUTE_OVERLAY_DIR = 'route_overlays' # Contact sheets written by the Step 4 'sheet' command
+SNAP_TO_CORRIDOR = True # Move clicked 'path' nodes onto the corridor centreline of WALL_MASK_PATH
+DEDUP_RADIUS = 0 # Offer to merge nodes stacked closer than this by earlier sessions (renumbers ids; set by --dedup)
+TRACE_DIR = 'traces' # Stage timings of each run are written here (see pipeline_trace.py); None disables
+TRACE_MEMORY = False # Also record tracemalloc peaks per stage (slows the run down)
+MAX_LISTED_NODES = 40 # Nodes printed before Step 3; every id is also drawn on the reference map
 
 # --- SCRIPT ---
 
 nodes_data = {"nodes": []}
 edges_data = {"edges": []}
 temp_img = None
+canvas = None
+snapshot_writer = None
+journal = None
+session_graph = None # {"nodes", "edges"} view over nodes_data/edges_data, used by the journal
+FLOOR_ID = None # Set by --floor when annotating one floor of a building
+viewport = None # PyramidViewport when the map is opened through the tile pyramid
+view_dirty = False
+drag_start = None
+snapper = None # CorridorSnapper, built on the first 'path' click when SNAP_TO_CORRIDOR is on
+map_shape = None # (h, w) of the full-resolution map
 window_name = "Map Annotation - Click nodes, then press ESC"
 
+def prompt_node(orig_x, orig_y):
+    """Ask for the type/name of a node clicked at map (x, y), then store and journal it."""
+    node_id = len(nodes_data["nodes"])
+    node_type = input(f"  Enter type for node {node_id} ('room', 'path', 'stairs' or 'elevator'): ").strip().lower()
+    while node_type not in NODE_TYPES:
+        node_type = input(f"  Invalid type. Enter one of {NODE_TYPES}: ").strip().lower()
+
+    node_name = None
+    if node_type == 'room':
+        node_name = input(f"  Enter room name for node {node_id} (e.g., G01): ").strip()
+    elif node_type in CONNECTOR_TYPES:
+        # The same name on every floor is what stitches the floors together
+        node_name = input(f"  Enter {node_type} name, identical on every floor (e.g., Stair A): ").strip()
+    elif node_type == 'path' and SNAP_TO_CORRIDOR and WALL_MASK_PATH and os.path.exists(WALL_MASK_PATH):
+        snapped = corridor_snapper().snap(orig_x, orig_y)
+        if snapped != (orig_x, orig_y):
+            print(f"  Snapped to corridor centreline: ({orig_x},{orig_y}) -> {snapped}")
+            orig_x, orig_y = snapped
+
+    new_node = {
+        "id": node_id, "x": orig_x, "y": orig_y,
+        "type": node_type, "name": node_name
+    }
+    nodes_data["nodes"].append(new_node)
+    journal.add_node(new_node, session_graph) # One appended line, not a full save
+    return new_node
+
+def corridor_snapper():
+    """Nearest-centreline table for snapping clicks, built on first use so startup stays instant."""
+    global snapper
+    if snapper is None:
+        snapper = CorridorSnapper.from_mask_file(WALL_MASK_PATH, map_shape)
+        print(f"  Snapping 'path' clicks within {snapper.max_distance}px to the corridor centreline of {WALL_MASK_PATH} "
+              f"(thinned at scale {snapper.scale:.2f}).")
+    return snapper
+
 def click_event(event, x, y, flags, param):
-    global nodes_data, temp_img
     
     scale_factor = param[0]
-    disp_w = param[1]
-    disp_h = param[2]
 
     if event == cv2.EVENT_LBUTTONDOWN:
         orig_x = int(x / scale_factor)
         orig_y = int(y / scale_factor)
-        node_id = len(nodes_data["nodes"])
         
         print(f"\nClicked at window(x,y): ({x},{y}) -> map(x,y): ({orig_x},{orig_y}).")
-        node_type = input(f"  Enter type for node {node_id} ('room' or 'path'): ").strip().lower()
-        while node_type not in ['room', 'path']:
-            node_type = input("  Invalid type. Enter 'room' or 'path': ").strip().lower()
-
-        node_name = None
-        if node_type == 'room':
-            node_name = input(f"  Enter room name for node {node_id} (e.g., G01): ").strip()
-            color = (0, 0, 255) # Red for rooms
+        new_node = prompt_node(orig_x, orig_y)
+
+        # Draw at ORIGINAL (possibly snapped) coordinates; only the dirty region of the display buffer is redrawn
+        canvas.draw_node(new_node['x'], new_node['y'], new_node['id'], node_color(new_node['type']))
+        
+        # The FULL resolution temp image is saved in the background
+        snapshot_writer.request()
+        cv2.imshow(window_name, canvas.display)
+
+def viewport_event(event, x, y, flags, param):
+    """Step 1 in pyramid mode: wheel zooms, right-drag pans, left click adds a node."""
+    global view_dirty, drag_start
+
+    if event == cv2.EVENT_MOUSEWHEEL:
+        viewport.zoom_at(1.25 if flags > 0 else 0.8, x, y)
+        view_dirty = True
+    elif event == cv2.EVENT_RBUTTONDOWN:
+        drag_start = (x, y)
+    elif event == cv2.EVENT_MOUSEMOVE and drag_start is not None:
+        viewport.pan(drag_start[0] - x, drag_start[1] - y)
+        drag_start = (x, y)
+        view_dirty = True
+    elif event == cv2.EVENT_RBUTTONUP:
+        drag_start = None
+    elif event == cv2.EVENT_LBUTTONDOWN:
+        orig_x, orig_y = viewport.to_map(x, y)
+        print(f"\nClicked at window(x,y): ({x},{y}) -> map(x,y): ({orig_x},{orig_y}) at zoom {viewport.zoom:.2f}.")
+        prompt_node(orig_x, orig_y)
+        view_dirty = True
+
+def load_graph():
+    """Load the saved graph, replay unsaved edits and offer the optional node merge."""
+    global nodes_data, edges_data, journal, session_graph
+    # Load existing JSON data
+    generation = 0
+    if os.path.exists(OUTPUT_JSON_FILE):
+        print(f"Loading existing graph data from {OUTPUT_JSON_FILE}...")
+        try:
+            with open(OUTPUT_JSON_FILE, 'r') as f:
+                data = json.load(f)
+                if "nodes" in data:
+                    nodes_data["nodes"] = data["nodes"]
+                    print(f"Loaded {len(nodes_data['nodes'])} existing nodes.")
+                if "edges" in data:
+                    edges_data["edges"] = data["edges"]
+                    print(f"Loaded {len(edges_data['edges'])} existing edges.")
+                generation = data.get("generation", 0)
+        except Exception as e:
+            print(f"Could not parse existing JSON: {e}. Starting fresh.")
+            nodes_data = {"nodes": []}
+            edges_data = {"edges": []}
+
+    # Recover edits from a session that ended before its final save
+    session_graph = {"nodes": nodes_data["nodes"], "edges": edges_data["edges"], "generation": generation}
+    journal = EditJournal(OUTPUT_JSON_FILE)
+    recovered = journal.replay(session_graph)
+    if recovered:
+        print(f"Recovered {recovered} unsaved edits from {journal.path}.")
+
+    # Merge nodes stacked on top of each other by earlier sessions, only if asked to:
+    # it renumbers ids that route tables and people may still hold
+    if DEDUP_RADIUS > 0:
+        merged, stats = merge_close_nodes(session_graph, DEDUP_RADIUS)
+        if stats["merged_nodes"]:
+            moved = [(old, new) for old, new in stats["id_map"].items() if old != new]
+            print(f"Found {stats['merged_nodes']} near-duplicate nodes within {DEDUP_RADIUS}px "
+                  f"({stats['groups']} groups); merging drops {stats['dropped_edges']} duplicate edges "
+                  f"and renumbers {len(moved)} node ids, e.g. " + ", ".join(f"{o}->{n}" for o, n in moved[:10]))
+            if input("Merge them? (y/n): ").strip().lower() == 'y':
+                nodes_data["nodes"][:] = merged["nodes"]
+                edges_data["edges"][:] = merged["edges"]
+                journal.merge_nodes(DEDUP_RADIUS) # Written to the graph file with the final save
+                print("Merged. The renumbered graph is written when the session is saved.")
         else:
-            color = (255, 0, 0) # Blue for path
+            print(f"No near-duplicate nodes within {DEDUP_RADIUS}px.")
 
-        new_node = {
-            "id": node_id, "x": orig_x, "y": orig_y,
-            "type": node_type, "name": node_name
-        }
-        nodes_data["nodes"].append(new_node)
+def scaled_pt(node, scale):
+    """Node position on a reference image drawn at `scale` times map coordinates."""
+    return (int(node['x'] * scale), int(node['y'] * scale))
 
-        # Draw on the FULL resolution temp_img using ORIGINAL coordinates
-        cv2.circle(temp_img, (orig_x, orig_y), 5, color, -1)
-        cv2.putText(temp_img, f"{node_id}", (orig_x + 5, orig_y - 5),
+def draw_graph(image, nodes, edges=(), scale=1.0):
+    """Draw edges in green, then every node with its id on top."""
+    for edge in edges:
+        if edge["source"] < len(nodes) and edge["target"] < len(nodes):
+            a_pos = scaled_pt(nodes[edge["source"]], scale)
+            b_pos = scaled_pt(nodes[edge["target"]], scale)
+            cv2.line(image, a_pos, b_pos, (0, 255, 0), 2) # Green for edges
+    for node in nodes:
+        color = node_color(node['type'])
+        x, y = scaled_pt(node, scale)
+        cv2.circle(image, (x, y), 5, color, -1)
+        cv2.putText(image, f"{node['id']}", (x + 5, y - 5),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-        
-        # Save the FULL resolution temp image
-        cv2.imwrite(TEMP_IMAGE_PATH, temp_img)
-        
-        # Resize the newly drawn full-res image for display
-        display_img = cv2.resize(temp_img, (disp_w, disp_h))
-        cv2.imshow(window_name, display_img)
 
-def main():
-    global temp_img, nodes_data, edges_data
+def auto_link(nodes, added_edges, image, map_size, scale, stats):
+    """Step 2: link each 'path' node to its nearest neighbour, then draw and journal the new edges."""
+    walkable = None
+    if WALL_MASK_PATH and os.path.exists(WALL_MASK_PATH):
+        # At the reference-image scale: a full-resolution mask of a pyramid-sized scan would not fit
+        walkable = load_clearance_mask(WALL_MASK_PATH, map_size, scale=scale)
+        print(f"Rejecting links that cross walls in {WALL_MASK_PATH}.")
+
+    auto_edges = auto_link_path_nodes(nodes, added_edges, MAX_AUTO_LINK_DISTANCE, walkable, stats, mask_scale=scale)
+    for new_edge in auto_edges:
+        edges_data["edges"].append(new_edge)
+        node_a = nodes[new_edge["source"]]
+        node_b = nodes[new_edge["target"]]
+        cv2.line(image, scaled_pt(node_a, scale), scaled_pt(node_b, scale), (0, 255, 0), 2)
+    journal.add_edges(auto_edges, session_graph) # Journaled only once they are in the graph
+    return auto_edges
+
+def save_outputs(graph, trace):
+    """Compact the journal into the JSON snapshot and write the companion files. Returns the room index."""
+    with trace.stage('json_save'):
+        try:
+            journal.compact(graph)
+            print(f"\nSuccessfully exported graph data to {OUTPUT_JSON_FILE}")
+        except Exception as e:
+            print(f"Error saving JSON file: {e}")
+
+    # Compact memory-mappable companion for routing tools
+    with trace.stage('binary_save'):
+        try:
+            write_binary_graph(graph, binary_path_for(OUTPUT_JSON_FILE))
+            print(f"Binary graph written to {binary_path_for(OUTPUT_JSON_FILE)}")
+        except Exception as e:
+            print(f"Error saving binary graph: {e}")
+
+    # Slimmer routing graph with corridor chains collapsed into polyline edges
+    with trace.stage('simplified_save'):
+        try:
+            simplified = write_simplified_graph(graph, simplified_path_for(OUTPUT_JSON_FILE))
+            print(f"Simplified graph ({len(simplified['nodes'])} nodes, {len(simplified['edges'])} edges) "
+                  f"written to {simplified_path_for(OUTPUT_JSON_FILE)}")
+        except Exception as e:
+            print(f"Error saving simplified graph: {e}")
+
+    # Room-name index for lookup and autocomplete
+    with trace.stage('room_index_save'):
+        rooms = RoomIndex.from_nodes(graph["nodes"])
+        try:
+            rooms.save(rooms_path_for(OUTPUT_JSON_FILE))
+            print(f"Room index ({len(rooms.names)} names) written to {rooms_path_for(OUTPUT_JSON_FILE)}")
+        except Exception as e:
+            print(f"Error saving room index: {e}")
+    return rooms
+
+def draw_path(image, nodes, path, scale=1.0):
+    """Copy of a reference image with a node-id path drawn as a thick red line."""
+    path_img = image.copy()
+    for i in range(len(path) - 1):
+        a_id, b_id = path[i], path[i + 1]
+        a_pos = scaled_pt(nodes[a_id], scale)
+        b_pos = scaled_pt(nodes[b_id], scale)
+        cv2.line(path_img, a_pos, b_pos, (0, 0, 255), 3) # Draw thick red line
+    return path_img
+
+def annotate(trace, building=None):
+    global temp_img, canvas, snapshot_writer, nodes_data, edges_data, journal, session_graph
+    global viewport, view_dirty, map_shape
 
     # Load your map image
     if not os.path.exists(MAP_IMAGE_PATH):
         print(f"Error: Could not find map image at {MAP_IMAGE_PATH}")
         return
-    img = cv2.imread(MAP_IMAGE_PATH)
-    if img is None:
-        print(f"Error: Could not load image at {MAP_IMAGE_PATH}.")
-        return
-    temp_img = img.copy()
-    
+    use_pyramid = USE_PYRAMID if USE_PYRAMID is not None else os.path.getsize(MAP_IMAGE_PATH) > PYRAMID_MIN_FILE_BYTES
+    with trace.stage('image_load', pyramid=use_pyramid):
+        if use_pyramid:
+            # Huge scans are never decoded whole here: Step 1 renders only the visible tiles,
+            # and the reference images are drawn on a downscaled pyramid level
+            pyramid = MapPyramid.open(MAP_IMAGE_PATH)
+            w, h = pyramid.width, pyramid.height
+            img, ref_scale = pyramid.overview(REFERENCE_MAX_DIM)
+            print(f"Using tiled pyramid in {pyramid.directory} ({len(pyramid.levels)} levels).")
+        else:
+            img = cv2.imread(MAP_IMAGE_PATH)
+            if img is None:
+                print(f"Error: Could not load image at {MAP_IMAGE_PATH}.")
+                return
+            h, w = img.shape[:2]
+            ref_scale = 1.0
+        temp_img = img.copy()
+        trace.count('image_pixels', img.shape[0] * img.shape[1])
+
     # Calculate scaled dimensions
-    h, w = img.shape[:2]
     if h > MAX_DISPLAY_HEIGHT:
         scale_factor = MAX_DISPLAY_HEIGHT / h
         disp_w = int(w * scale_factor)
@@ -87,49 +300,57 @@ def main():
         disp_h = h
     print(f"Original map size: {w}x{h}. Displaying at: {disp_w}x{disp_h} (Scale: {scale_factor:.2f})")
 
+    map_shape = (h, w)
+
     # Create resizable window
     cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
     cv2.resizeWindow(window_name, disp_w, disp_h)
     
-    # Load existing JSON data
-    if os.path.exists(OUTPUT_JSON_FILE):
-        print(f"Loading existing graph data from {OUTPUT_JSON_FILE}...")
-        try:
-            with open(OUTPUT_JSON_FILE, 'r') as f:
-                data = json.load(f)
-                if "nodes" in data:
-                    nodes_data["nodes"] = data["nodes"]
-                    print(f"Loaded {len(nodes_data['nodes'])} existing nodes.")
-                if "edges" in data:
-                    edges_data["edges"] = data["edges"]
-                    print(f"Loaded {len(edges_data['edges'])} existing edges.")
-        except Exception as e:
-            print(f"Could not parse existing JSON: {e}. Starting fresh.")
-            nodes_data = {"nodes": []}
-            edges_data = {"edges": []}
+    with trace.stage('graph_load'):
+        load_graph()
+        trace.count('nodes_loaded', len(nodes_data["nodes"]))
     
     # --- FIX: Re-draw nodes onto temp_img from loaded data ---
     # This ensures temp_img has all 185 nodes drawn on it,
     # even if the temp file was deleted.
-    for node in nodes_data["nodes"]:
-        color = (0, 0, 255) if node['type'] == 'room' else (255, 0, 0)
-        cv2.circle(temp_img, (node['x'], node['y']), 5, color, -1)
-        cv2.putText(temp_img, f"{node['id']}", (node['x'] + 5, node['y'] - 5),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-    # Save this as the new temp file
-    cv2.imwrite(TEMP_IMAGE_PATH, temp_img)
-    
+    with trace.stage('initial_redraw'):
+        draw_graph(temp_img, nodes_data["nodes"], scale=ref_scale)
+        # Save this as the new temp file
+        cv2.imwrite(TEMP_IMAGE_PATH, temp_img)
+        trace.count('drawn_nodes', len(nodes_data["nodes"]))
+        trace.count('redraw_pixels', temp_img.shape[0] * temp_img.shape[1])
     
-    display_img = cv2.resize(temp_img, (disp_w, disp_h))
     print("\n--- Step 1: Mark Nodes (Optional) ---")
     print("Your nodes are loaded. Press 'ESC' to move to edge linking.")
-    cv2.imshow(window_name, display_img)
-    callback_param = [scale_factor, disp_w, disp_h]
-    cv2.setMouseCallback(window_name, click_event, callback_param)
-    while True:
-        key = cv2.waitKey(1) & 0xFF
-        if key == 27: break
-    cv2.destroyAllWindows()
+    if use_pyramid:
+        print("Mouse wheel or +/- to zoom, right-drag or W/A/S/D to pan.")
+        viewport = PyramidViewport(pyramid, disp_w, disp_h)
+        cv2.setMouseCallback(window_name, viewport_event)
+        view_dirty = True
+        while True:
+            if view_dirty:
+                view_dirty = False
+                frame = viewport.render()
+                viewport.draw_nodes(frame, nodes_data["nodes"])
+                cv2.imshow(window_name, frame)
+            key = cv2.waitKey(1) & 0xFF
+            if key == 27: break
+            if viewport.handle_key(key):
+                view_dirty = True
+        cv2.destroyAllWindows()
+    else:
+        # The display-resolution buffer is built once and patched per click from here on
+        canvas = AnnotationCanvas(temp_img, disp_w, disp_h)
+        snapshot_writer = SnapshotWriter(canvas, TEMP_IMAGE_PATH)
+        cv2.imshow(window_name, canvas.display)
+        callback_param = [scale_factor, disp_w, disp_h]
+        cv2.setMouseCallback(window_name, click_event, callback_param)
+        while True:
+            key = cv2.waitKey(1) & 0xFF
+            if key == 27: break
+        cv2.destroyAllWindows()
+        snapshot_writer.close() # Flush the last snapshot before moving on
+        trace.count('redraw_pixels', canvas.redraw_pixels) # Patched by the Step 1 clicks
 
     if not nodes_data["nodes"]:
         print("No nodes marked. Exiting.")
@@ -145,39 +366,15 @@ def main():
     for edge in edges_data["edges"]:
         added_edges.add(tuple(sorted((edge["source"], edge["target"]))))
 
-    new_auto_edges = 0
-    verification_img = img.copy() # Use a fresh copy to draw on
-    
-    for node_a in nodes:
-        if node_a['type'] != 'path':
-            continue # Only link path-to-path
-
-        closest_neighbor = None
-        min_dist = float('inf')
-
-        for node_b in nodes:
-            if node_a['id'] == node_b['id'] or node_b['type'] != 'path':
-                continue
-            
-            if tuple(sorted((node_a['id'], node_b['id']))) in added_edges:
-                continue
+    with trace.stage('auto_link'):
+        link_stats = {}
+        verification_img = img.copy() # Use a fresh copy to draw on
 
-            dist = math.dist((node_a['x'], node_a['y']), (node_b['x'], node_b['y']))
-            
-            if dist < min_dist:
-                min_dist = dist
-                closest_neighbor = node_b
-        
-        if closest_neighbor and min_dist <= MAX_AUTO_LINK_DISTANCE:
-            a_id = node_a['id']
-            b_id = closest_neighbor['id']
-            
-            new_edge = {"source": a_id, "target": b_id, "weight": min_dist}
-            edges_data["edges"].append(new_edge)
-            added_edges.add(tuple(sorted((a_id, b_id))))
-            
-            cv2.line(verification_img, (node_a['x'], node_a['y']), (closest_neighbor['x'], closest_neighbor['y']), (0, 255, 0), 2)
-            new_auto_edges += 1
+        auto_edges = auto_link(nodes, added_edges, verification_img, (h, w), ref_scale, link_stats)
+        new_auto_edges = len(auto_edges)
+        for key, value in link_stats.items():
+            trace.count(key, value)
+        trace.count('auto_edges', new_auto_edges)
 
     print(f"Automatically added {new_auto_edges} new hallway edges.")
 
@@ -185,28 +382,24 @@ def main():
     print(f"\n--- Step 3: Manual Linking (for Rooms & Missed Paths) ---")
     print("All 'path' nodes have been auto-linked.")
     print("Your job is to manually connect 'room' nodes (like G01) to the path.")
+    print("Stairs and elevators are not auto-linked either; connect them to the path too.")
     
-    # --- FIX: RE-DRAW NODES AND EDGES on verification_img ---
-    # Draw existing edges
-    for edge in edges_data["edges"]:
-        if edge["source"] < len(nodes) and edge["target"] < len(nodes):
-            a_pos = (nodes[edge["source"]]['x'], nodes[edge["source"]]['y'])
-            b_pos = (nodes[edge["target"]]['x'], nodes[edge["target"]]['y'])
-            cv2.line(verification_img, a_pos, b_pos, (0, 255, 0), 2) # Green for edges
-    # Draw nodes on top
-    for node in nodes:
-        color = (0, 0, 255) if node['type'] == 'room' else (255, 0, 0)
-        cv2.circle(verification_img, (node['x'], node['y']), 5, color, -1)
-        cv2.putText(verification_img, f"{node['id']}", (node['x'] + 5, node['y'] - 5),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-
-    # --- FIX: Save this as the new reference map ---
-    cv2.imwrite(TEMP_IMAGE_PATH, verification_img)
+    with trace.stage('manual_link_redraw'):
+        # --- FIX: RE-DRAW NODES AND EDGES on verification_img ---
+        draw_graph(verification_img, nodes, edges_data["edges"], ref_scale)
+
+        # --- FIX: Save this as the new reference map ---
+        cv2.imwrite(TEMP_IMAGE_PATH, verification_img)
+        trace.count('drawn_edges', len(edges_data["edges"]))
+        trace.count('drawn_nodes', len(nodes))
+        trace.count('redraw_pixels', verification_img.shape[0] * verification_img.shape[1])
     print(f"Reference map with all nodes and auto-edges saved to {TEMP_IMAGE_PATH}")
     
     print("\nNodes marked (ID: x, y, type, name):")
-    for node in nodes:
+    for node in nodes[:MAX_LISTED_NODES]:
         print(f"  {node['id']}: ({node['x']}, {node['y']}, {node['type']}, {node.get('name', 'N/A')})")
+    if len(nodes) > MAX_LISTED_NODES:
+        print(f"  ... and {len(nodes) - MAX_LISTED_NODES} more; every id is drawn on {TEMP_IMAGE_PATH}")
     print("\nEnter edges as pairs of node IDs (e.g., 0 1). Type 'done' when finished.")
 
 
@@ -233,49 +426,128 @@ def main():
             new_edge = {"source": a_id, "target": b_id, "weight": distance}
             edges_data["edges"].append(new_edge)
             added_edges.add(tuple(sorted((a_id, b_id))))
+            journal.add_edges([new_edge], session_graph)
             
-            cv2.line(verification_img, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            cv2.line(verification_img, scaled_pt(node_a, ref_scale), scaled_pt(node_b, ref_scale), (0, 255, 0), 2)
             print(f"  Added edge {a_id} <-> {b_id} with weight {distance:.2f}")
 
         except Exception as e:
             print(f"Invalid input. Try again. Error: {e}")
 
-    # Combine data and save
-    final_graph = {"nodes": nodes_data["nodes"], "edges": edges_data["edges"]}
-    try:
-        with open(OUTPUT_JSON_FILE, 'w') as f:
-            json.dump(final_graph, f, indent=4)
-        print(f"\nSuccessfully exported graph data to {OUTPUT_JSON_FILE}")
-    except Exception as e:
-        print(f"Error saving JSON file: {e}")
+    # Combine data and save: compact the journal into the JSON snapshot
+    final_graph = session_graph
+    with trace.stage('save'):
+        rooms = save_outputs(final_graph, trace)
+        trace.count('saved_nodes', len(final_graph["nodes"]))
+        trace.count('saved_edges', len(final_graph["edges"]))
+
+    # Refresh this floor's connector table so cross-floor routing sees the changes
+    if building is not None:
+        try:
+            building.overlay()
+            print(f"Floor overlay updated in {building.overlay_path}")
+        except Exception as e:
+            print(f"Error updating floor overlay: {e}")
+
+    # Flag structural problems before testing routes (fix with: python graph_validate.py --fix)
+    print("\n--- Graph check ---")
+    with trace.stage('validate'):
+        report = validate_graph(final_graph)
+    print_report(report, final_graph)
+    if not is_clean(report):
+        mask_args = f" --mask {WALL_MASK_PATH} --reference {MAP_IMAGE_PATH}" if WALL_MASK_PATH else ""
+        print(f"Run 'python graph_validate.py {OUTPUT_JSON_FILE} --fix{mask_args}' to repair what can be fixed automatically.")
 
     # --- Step 4: Verification ---
     print("\n--- Step 4: Verify Path (Optional) ---")
+    print("Type 'all' to check every room-to-room pair at once, or 'sheet' to also render them all to contact sheets.")
+    if building is not None:
+        print("Use FLOOR:ID (e.g., G:0) for start and end to route across floors.")
+    print("A start of 'x,y' (map pixels) routes from that point, entering the nearest corridor mid-edge.")
+    print("Rooms can be given by name (e.g., G01); type '?' and the start of a name to search.")
+
+    def resolve(text):
+        """Node id typed as a number or as a room name."""
+        if text.lstrip('-').isdigit():
+            return int(text)
+        matches = rooms.lookup(text)
+        if len(matches) == 1:
+            return matches[0]
+        hints = ', '.join(f"{name} ({node_id})" for node_id, name in rooms.complete(text)) or "nothing similar"
+        raise ValueError(f"'{text}' is {'ambiguous' if matches else 'not a room name'}; did you mean: {hints}")
+    # Edges are final from here on: the graph and the edge index are built once, not per query
+    engine = RouteEngine(nodes, edges_data["edges"], method=ROUTING_METHOD)
+    edge_index = EdgeIndex(nodes, edges_data["edges"])
     while True:
         try:
-            start_s = input("Enter start node ID to test path (or 'skip'): ").strip().lower()
+            # Floor ids keep their case (G:0); everything else is matched in lower case
+            start_raw = input("Enter start node ID or room name to test path (or 'skip'): ").strip()
+            start_s = start_raw.lower()
             if start_s == 'skip':
                 break
-            end_s = input("Enter end node ID to test path: ").strip().lower()
+            if start_s.startswith('?'):
+                for node_id, name in rooms.complete(start_s[1:]):
+                    print(f"  {node_id}: {name}")
+                continue
+            if start_s == 'all':
+                with trace.stage('verify_all'):
+                    results = engine.verify_pairs(engine.room_pairs())
+                    trace.count('verified_pairs', len(results))
+                missing = [pair for pair, path in results.items() if path is None]
+                print(f"Checked {len(results)} room pairs: {len(results) - len(missing)} reachable, {len(missing)} unreachable.")
+                for a_id, b_id in missing:
+                    print(f"  No path: {a_id} ({nodes[a_id].get('name')}) -> {b_id} ({nodes[b_id].get('name')})")
+                continue
+            if start_s == 'sheet':
+                # Headless: every room pair drawn on one shared display-resolution base
+                with trace.stage('route_sheet'):
+                    frames, results = render_routes(verification_img, final_graph, engine.room_pairs(),
+                                                    scale=ref_scale, engine=engine)
+                    written = write_outputs(frames, results, ROUTE_OVERLAY_DIR)
+                    trace.count('verified_pairs', len(results))
+                missing = sum(1 for r in results if r["path"] is None)
+                print(f"Rendered {len(results)} routes ({missing} unreachable) to {len(written)} sheet(s) in {ROUTE_OVERLAY_DIR}/")
+                continue
+            end_raw = input("Enter end node ID or room name to test path: ").strip()
+            end_s = end_raw.lower()
             
-            start_id = int(start_s)
-            end_id = int(end_s)
+            if building is not None and ':' in start_s + end_s:
+                (start_floor, start_id), (end_floor, end_id) = [
+                    (text.rpartition(':')[0] or FLOOR_ID, int(text.rpartition(':')[2])) for text in (start_raw, end_raw)]
+                result = building.route(start_floor, start_id, end_floor, end_id)
+                if result is None:
+                    print("Error: No path found between those nodes.")
+                    continue
+                print(f"\nRoute length {result['distance']:.2f} (floors loaded: {result['floors_loaded']})")
+                for leg in result["legs"]:
+                    print(f"  Floor {leg['floor']}: {leg['path']}")
+                continue
 
-            G = nx.Graph()
-            for edge in edges_data["edges"]:
-                G.add_edge(edge["source"], edge["target"], weight=edge["weight"])
+            if ',' in start_s:
+                x, y = (float(v) for v in start_s.split(','))
+                with trace.stage('verify_point', start=start_s, end=end_s):
+                    result = route_from_point(edge_index, engine, x, y, resolve(end_s))
+                if result is None:
+                    print("Error: No path found from that point.")
+                    continue
+                px, py = result["point"]
+                print(f"\nSnapped ({x:.0f}, {y:.0f}) to edge {result['edge']} at ({px:.1f}, {py:.1f}); "
+                      f"path {result['path']}, length {result['distance']:.2f} px")
+                continue
 
-            path = nx.shortest_path(G, source=start_id, target=end_id, weight="weight")
-            print("\nShortest path (node IDs):", path)
+            start_id = resolve(start_s)
+            end_id = resolve(end_s)
 
-            path_img = verification_img.copy() # Make a copy to draw the red path
-            for i in range(len(path) - 1):
-                a_id, b_id = path[i], path[i + 1]
-                a_pos = (nodes[a_id]['x'], nodes[a_id]['y'])
-                b_pos = (nodes[b_id]['x'], nodes[b_id]['y'])
-                cv2.line(path_img, a_pos, b_pos, (0, 0, 255), 3) # Draw thick red line
+            # Timed up to the display; the wait for a key press is left out
+            with trace.stage('verify_path', start=start_id, end=end_id):
+                path = engine.shortest_path(start_id, end_id)
+                print("\nShortest path (node IDs):", path)
+                print(f"Length {engine.path_length(path):.2f} px, {engine.last_expanded} nodes expanded ({ROUTING_METHOD}).")
+                trace.count('nodes_expanded', engine.last_expanded)
 
-            display_verify_img = cv2.resize(path_img, (disp_w, disp_h))
+                path_img = draw_path(verification_img, nodes, path, ref_scale)
+                display_verify_img = cv2.resize(path_img, (disp_w, disp_h))
+                trace.count('redraw_pixels', path_img.shape[0] * path_img.shape[1])
             cv2.imshow("Shortest Path Verification", display_verify_img)
             print("Press any key to test another path, or 'ESC' to exit.")
             
@@ -291,6 +563,21 @@ def main():
     # We'll keep the temp file now for reference
     print(f"\nAnnotation complete. Your reference map is at {TEMP_IMAGE_PATH}")
 
+def main(building=None):
+    trace = PipelineTrace('annotator', memory=TRACE_MEMORY)
+    try:
+        annotate(trace, building)
+    finally:
+        # Also after an early return or an error, so every run leaves its timings behind
+        print("\n--- Stage timings ---")
+        trace.print_summary()
+        if TRACE_DIR:
+            try:
+                json_path, chrome_path = trace.write(TRACE_DIR)
+                print(f"Trace written to {json_path} (Chrome trace: {chrome_path})")
+            except Exception as e:
+                print(f"Error writing trace: {e}")
+
 if __name__ == "__main__":
     print("--- Map Annotation Script ---")
     
@@ -299,9 +586,30 @@ if __name__ == "__main__":
     script_dir = os.path.dirname(os.path.abspath(__file__))
     os.chdir(script_dir) 
     # --- END FIX ---
+
+    parser = argparse.ArgumentParser(description="Annotate one floor of a building map.")
+    parser.add_argument('--building', default=None, help=f"Building manifest (e.g., {BUILDING_FILE})")
+    parser.add_argument('--floor', default=None, help="Floor id in the manifest to annotate")
+    parser.add_argument('--trace-memory', action='store_true', help="Record tracemalloc peaks per stage")
+    parser.add_argument('--dedup', type=float, nargs='?', const=MERGE_RADIUS, default=DEDUP_RADIUS, metavar='RADIUS',
+                        help=f"Offer to merge near-duplicate nodes on load (default radius {MERGE_RADIUS}px)")
+    args = parser.parse_args()
+    TRACE_MEMORY = TRACE_MEMORY or args.trace_memory
+    DEDUP_RADIUS = args.dedup
+
+    building = None
+    if args.building or args.floor:
+        building = Building(args.building or BUILDING_FILE)
+        FLOOR_ID = args.floor or next(iter(building.floors))
+        floor = building.floor(FLOOR_ID)
+        MAP_IMAGE_PATH = floor.image_path or MAP_IMAGE_PATH
+        OUTPUT_JSON_FILE = floor.graph_path
+        WALL_MASK_PATH = floor.mask_path # Another floor's walls would clip links and snaps wrongly
+        print(f"Building: {building.name or building.manifest_path}, floor {FLOOR_ID}")
     
     print(f"Project Root: {os.path.abspath(os.getcwd())}")
     print(f"Reading map from: {os.path.abspath(MAP_IMAGE_PATH)}")
     print(f"Will save/load graph to: {os.path.abspath(OUTPUT_JSON_FILE)}")
+    print(f"Walkable mask: {os.path.abspath(WALL_MASK_PATH) if WALL_MASK_PATH else 'none (no wall checks or snapping)'}")
     print("Please ensure you have run: pip install opencv-python networkx")
-    main()
\ No newline at end of file
+    main(building)
\ No newline at end of file
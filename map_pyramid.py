@@ -0,0 +1,277 @@
+"""
+Tiled, memory-mapped image pyramid for very large floor-plan scans.
+
+The map is decoded once and stored next to the image as a pyramid of
+levels, each half the size of the previous one, down to a single tile:
+
+    <image>.pyramid/meta.json       source size/mtime, tile size, level sizes
+    <image>.pyramid/level_<k>.npy   uint8[tiles_y, tiles_x, TILE, TILE, 3]
+
+Each tile is contiguous on disk, so memory-mapping a level costs nothing
+and drawing a viewport only touches the tiles it shows. PyramidViewport
+picks the level whose resolution matches the current zoom, so a
+20k-pixel plan opens and pans as fast as a small one.
+
+Usage:
+    python map_pyramid.py assets/maps/gdn_ground_floor.png            # build the cache
+    python map_pyramid.py assets/maps/gdn_ground_floor.png --view     # build and browse
+"""
+
+import json
+import math
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from annotation_canvas import LABEL_FONT, LABEL_SCALE, NODE_RADIUS, node_color
+
+TILE_SIZE = 512
+PYRAMID_SUFFIX = '.pyramid'
+PYRAMID_MIN_FILE_BYTES = 32 * 1024 * 1024  # map_annotator switches to the pyramid above this
+MAX_ZOOM = 8.0                             # Display pixels per map pixel when fully zoomed in
+BACKGROUND = (64, 64, 64)
+
+
+def pyramid_dir_for(image_path):
+    return image_path + PYRAMID_SUFFIX
+
+
+def _source_stamp(image_path):
+    stat = os.stat(image_path)
+    return {"source": os.path.basename(image_path), "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def _write_level(path, img, tile_size):
+    """Store an image as uint8[tiles_y, tiles_x, T, T, 3], padding the last row/column."""
+    h, w = img.shape[:2]
+    tiles_y, tiles_x = math.ceil(h / tile_size), math.ceil(w / tile_size)
+    tiles = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8,
+                                      shape=(tiles_y, tiles_x, tile_size, tile_size, 3))
+    band = np.zeros((tile_size, tiles_x * tile_size, 3), dtype=np.uint8)
+    for row in range(tiles_y):
+        rows = img[row * tile_size:(row + 1) * tile_size]
+        band[:] = 0
+        band[:len(rows), :w] = rows
+        tiles[row] = band.reshape(tile_size, tiles_x, tile_size, 3).transpose(1, 0, 2, 3)
+    tiles.flush()
+    del tiles
+
+
+def build_pyramid(image_path, tile_size=TILE_SIZE):
+    """Decode the image once and write every pyramid level. Returns the cache directory."""
+    img = cv2.imread(image_path, cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError(f"Could not load image at {image_path}")
+    directory = pyramid_dir_for(image_path)
+    os.makedirs(directory, exist_ok=True)
+
+    levels = []
+    while True:
+        h, w = img.shape[:2]
+        name = f"level_{len(levels)}.npy"
+        _write_level(os.path.join(directory, name), img, tile_size)
+        levels.append({"file": name, "width": w, "height": h})
+        if max(h, w) <= tile_size:
+            break
+        img = cv2.resize(img, (max(1, (w + 1) // 2), max(1, (h + 1) // 2)), interpolation=cv2.INTER_AREA)
+
+    meta = dict(_source_stamp(image_path), tile_size=tile_size, levels=levels)
+    with open(os.path.join(directory, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=4)
+    return directory
+
+
+class MapPyramid:
+    """Read-only access to a pyramid cache."""
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+        self.directory = directory
+        self.tile_size = meta['tile_size']
+        self.levels = meta['levels']
+        self.tiles = [np.load(os.path.join(directory, level['file']), mmap_mode='r') for level in self.levels]
+        self.width = self.levels[0]['width']
+        self.height = self.levels[0]['height']
+        self.tiles_read = 0
+
+    @classmethod
+    def open(cls, image_path, tile_size=TILE_SIZE):
+        """Open the pyramid for an image, (re)building it if missing or stale."""
+        directory = pyramid_dir_for(image_path)
+        meta_path = os.path.join(directory, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            stamp = _source_stamp(image_path)
+            if all(meta.get(key) == value for key, value in stamp.items()) and meta.get('tile_size') == tile_size:
+                return cls(directory)
+        build_pyramid(image_path, tile_size)
+        return cls(directory)
+
+    def scale(self, level):
+        """Level pixels per full-resolution pixel."""
+        return self.levels[level]['width'] / self.width
+
+    def read_region(self, level, x0, y0, x1, y1):
+        """Pixels [x0, x1) x [y0, y1) of a level, copied from the tiles that cover them."""
+        info = self.levels[level]
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(info['width'], x1), min(info['height'], y1)
+        out = np.zeros((max(0, y1 - y0), max(0, x1 - x0), 3), dtype=np.uint8)
+        if x0 >= x1 or y0 >= y1:
+            return out
+        t = self.tile_size
+        tiles = self.tiles[level]
+        for ty in range(y0 // t, (y1 - 1) // t + 1):
+            for tx in range(x0 // t, (x1 - 1) // t + 1):
+                ax, ay = max(x0, tx * t), max(y0, ty * t)
+                bx, by = min(x1, (tx + 1) * t), min(y1, (ty + 1) * t)
+                out[ay - y0:by - y0, ax - x0:bx - x0] = tiles[ty, tx, ay - ty * t:by - ty * t, ax - tx * t:bx - tx * t]
+                self.tiles_read += 1
+        return out
+
+    def overview(self, max_dim):
+        """The largest level that fits in max_dim, as (image, scale)."""
+        level = next((k for k, info in enumerate(self.levels)
+                      if max(info['width'], info['height']) <= max_dim), len(self.levels) - 1)
+        info = self.levels[level]
+        return self.read_region(level, 0, 0, info['width'], info['height']), self.scale(level)
+
+
+class PyramidViewport:
+    """Pan/zoom window onto a MapPyramid, in full-resolution map coordinates."""
+
+    def __init__(self, pyramid, view_w, view_h):
+        self.pyramid = pyramid
+        self.view_w = view_w
+        self.view_h = view_h
+        self.fit_zoom = min(view_w / pyramid.width, view_h / pyramid.height)
+        self.zoom = self.fit_zoom
+        self.cx = pyramid.width / 2
+        self.cy = pyramid.height / 2
+
+    @property
+    def origin(self):
+        """Map coordinate shown at the top-left view pixel."""
+        return self.cx - self.view_w / (2 * self.zoom), self.cy - self.view_h / (2 * self.zoom)
+
+    def to_map(self, vx, vy):
+        x0, y0 = self.origin
+        return int(x0 + (vx + 0.5) / self.zoom), int(y0 + (vy + 0.5) / self.zoom)
+
+    def to_view(self, x, y):
+        x0, y0 = self.origin
+        return int(round((x + 0.5 - x0) * self.zoom - 0.5)), int(round((y + 0.5 - y0) * self.zoom - 0.5))
+
+    def zoom_at(self, factor, vx, vy):
+        """Zoom by factor, keeping the map point under view pixel (vx, vy) in place."""
+        x0, y0 = self.origin
+        mx, my = x0 + vx / self.zoom, y0 + vy / self.zoom
+        self.zoom = min(MAX_ZOOM, max(self.fit_zoom / 2, self.zoom * factor))
+        self.cx = mx - vx / self.zoom + self.view_w / (2 * self.zoom)
+        self.cy = my - vy / self.zoom + self.view_h / (2 * self.zoom)
+
+    def pan(self, dx, dy):
+        """Move the view by (dx, dy) view pixels."""
+        self.cx = min(self.pyramid.width, max(0, self.cx + dx / self.zoom))
+        self.cy = min(self.pyramid.height, max(0, self.cy + dy / self.zoom))
+
+    def handle_key(self, key, step=100):
+        """+/- zoom and WASD pan around the view centre. Returns True if the view changed."""
+        if key in (ord('+'), ord('=')):
+            self.zoom_at(1.25, self.view_w // 2, self.view_h // 2)
+        elif key == ord('-'):
+            self.zoom_at(0.8, self.view_w // 2, self.view_h // 2)
+        elif key in (ord('w'), ord('a'), ord('s'), ord('d')):
+            self.pan({'a': -step, 'd': step}.get(chr(key), 0), {'w': -step, 's': step}.get(chr(key), 0))
+        else:
+            return False
+        return True
+
+    def level(self):
+        """Coarsest level that still has at least one level pixel per view pixel."""
+        if self.zoom >= 1:
+            return 0
+        return min(len(self.pyramid.levels) - 1, int(math.floor(math.log2(1 / self.zoom))))
+
+    def render(self):
+        """Compose the current view from the visible tiles only."""
+        level = self.level()
+        s = self.pyramid.scale(level)
+        x0, y0 = self.origin
+        lx0, ly0 = int(math.floor(x0 * s)) - 1, int(math.floor(y0 * s)) - 1
+        lx1 = int(math.ceil((x0 + self.view_w / self.zoom) * s)) + 2
+        ly1 = int(math.ceil((y0 + self.view_h / self.zoom) * s)) + 2
+        cx0, cy0 = max(0, lx0), max(0, ly0)
+        patch = self.pyramid.read_region(level, cx0, cy0, lx1, ly1)
+        view = np.full((self.view_h, self.view_w, 3), BACKGROUND, dtype=np.uint8)
+        if patch.size == 0:
+            return view
+
+        # Level pixel centre (px + 0.5) / s maps to view pixel ((px + 0.5) / s - x0) * zoom - 0.5
+        a = self.zoom / s
+        matrix = np.array([
+            [a, 0, (cx0 + 0.5) * a - x0 * self.zoom - 0.5],
+            [0, a, (cy0 + 0.5) * a - y0 * self.zoom - 0.5],
+        ], dtype=np.float64)
+        # Nearest neighbour once zoomed past 1:1, so individual map pixels stay crisp for clicking
+        flags = cv2.INTER_NEAREST if a > 1.5 else cv2.INTER_LINEAR
+        cv2.warpAffine(patch, matrix, (self.view_w, self.view_h), dst=view, flags=flags,
+                       borderMode=cv2.BORDER_TRANSPARENT)
+        return view
+
+    def draw_nodes(self, view, nodes):
+        """Draw the nodes that fall inside the view (map coordinates are transformed)."""
+        if not nodes:
+            return
+        xs = np.array([node['x'] for node in nodes], dtype=np.float64)
+        ys = np.array([node['y'] for node in nodes], dtype=np.float64)
+        x0, y0 = self.origin
+        vx = (xs + 0.5 - x0) * self.zoom - 0.5
+        vy = (ys + 0.5 - y0) * self.zoom - 0.5
+        margin = 40
+        visible = np.flatnonzero((vx > -margin) & (vx < self.view_w + margin) &
+                                 (vy > -margin) & (vy < self.view_h + margin))
+        for k in visible.tolist():
+            node = nodes[k]
+            pos = (int(round(vx[k])), int(round(vy[k])))
+            cv2.circle(view, pos, NODE_RADIUS, node_color(node['type']), -1)
+            cv2.putText(view, f"{node['id']}", (pos[0] + 5, pos[1] - 5), LABEL_FONT, LABEL_SCALE, (255, 255, 255), 1)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python map_pyramid.py <image> [--view]")
+        return
+    image_path = sys.argv[1]
+    start = time.perf_counter()
+    pyramid = MapPyramid.open(image_path)
+    print(f"{pyramid.width}x{pyramid.height}, {len(pyramid.levels)} levels of {pyramid.tile_size}px tiles "
+          f"in {pyramid.directory} ({time.perf_counter() - start:.2f}s)")
+    if '--view' not in sys.argv[2:]:
+        return
+
+    viewport = PyramidViewport(pyramid, 1200, 800)
+    window = "Map Pyramid - wheel/+/- zoom, WASD pan, ESC quit"
+    cv2.namedWindow(window, cv2.WINDOW_AUTOSIZE)
+
+    def on_mouse(event, x, y, flags, param):
+        if event == cv2.EVENT_MOUSEWHEEL:
+            viewport.zoom_at(1.25 if flags > 0 else 0.8, x, y)
+
+    cv2.setMouseCallback(window, on_mouse)
+    while True:
+        cv2.imshow(window, viewport.render())
+        key = cv2.waitKey(30) & 0xFF
+        if key == 27:
+            break
+        viewport.handle_key(key)
+    cv2.destroyAllWindows()
+
+
+if __name__ == "__main__":
+    main()
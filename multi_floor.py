@@ -0,0 +1,305 @@
+"""
+Multi-floor routing with a hierarchical floor overlay.
+
+A building is described by a manifest JSON listing its floors, each with
+its own map image and graph JSON (paths relative to the manifest):
+
+    {
+        "name": "GDN",
+        "floors": [
+            {"id": "G", "level": 0, "image": "gdn_ground_floor.png", "graph": "gdn_ground_floor_graph.json",
+             "mask": "../binary_paint_cleaned_gdn.png"},
+            {"id": "1", "level": 1, "image": "gdn_first_floor.png", "graph": "gdn_first_floor_graph.json"}
+        ],
+        "connector_costs": {"stairs": 150.0, "elevator": 80.0}
+    }
+
+The optional "mask" is the floor's walkable mask, used by the annotator
+for line-of-sight checks and corridor snapping; floors without one are
+annotated without either.
+
+Floors are stitched through connector nodes of type 'stairs' or
+'elevator'. Connectors with the same type and name on different floors
+belong to the same shaft and link consecutive floors that have it, at
+connector_costs[type] per level climbed. Unnamed connectors cannot be
+matched across floors and are skipped with a warning.
+
+The overlay caches, per floor, its connectors and the shortest distances
+between them. A query searches the overlay (start -> connectors -> ... ->
+end) and only loads the graphs of the start floor, the end floor, and the
+floors the chosen route actually walks through. Floors are loaded lazily
+and the overlay entry of a floor is rebuilt only when its graph file
+changes.
+
+Usage:
+    python multi_floor.py overlay assets/maps/gdn_building.json
+    python multi_floor.py route assets/maps/gdn_building.json G:0 G:7
+"""
+
+import heapq
+import json
+import math
+import os
+import sys
+import warnings
+
+import networkx as nx
+
+from route_engine import RouteEngine
+
+CONNECTOR_TYPES = ('stairs', 'elevator')
+DEFAULT_CONNECTOR_COSTS = {'stairs': 150.0, 'elevator': 80.0}
+
+
+class Floor:
+    """One floor of a building. Its graph is only read when first needed."""
+
+    def __init__(self, building, spec):
+        self.building = building
+        self.id = str(spec['id'])
+        self.level = spec.get('level', 0)
+        base = building.base_dir
+        self.graph_path = os.path.join(base, spec['graph'])
+        self.image_path = os.path.join(base, spec['image']) if spec.get('image') else None
+        self.mask_path = os.path.join(base, spec['mask']) if spec.get('mask') else None
+        self._graph = None
+        self._engine = None
+
+    @property
+    def loaded(self):
+        return self._graph is not None
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            with open(self.graph_path, 'r') as f:
+                self._graph = json.load(f)
+        return self._graph
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._engine = RouteEngine(self.graph["nodes"], self.graph["edges"])
+        return self._engine
+
+    def signature(self):
+        """Cheap change detector for the floor's graph file."""
+        stat = os.stat(self.graph_path)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def connectors(self):
+        return [node for node in self.graph["nodes"] if node['type'] in CONNECTOR_TYPES]
+
+    def distances_from(self, node_id):
+        """Shortest distance from node_id to every reachable node on this floor."""
+        if node_id not in self.engine.graph:
+            return {}
+        return nx.single_source_dijkstra_path_length(self.engine.graph, node_id, weight="weight")
+
+
+class Building:
+    """Floors of a building plus the cached connector overlay."""
+
+    def __init__(self, manifest_path):
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        self.manifest_path = manifest_path
+        self.base_dir = os.path.dirname(os.path.abspath(manifest_path))
+        self.name = manifest.get('name', '')
+        self.connector_costs = dict(DEFAULT_CONNECTOR_COSTS, **manifest.get('connector_costs', {}))
+        floors = sorted((Floor(self, spec) for spec in manifest['floors']), key=lambda fl: fl.level)
+        self.floors = {floor.id: floor for floor in floors}
+        self.overlay_path = os.path.join(self.base_dir, manifest.get(
+            'overlay', os.path.splitext(os.path.basename(manifest_path))[0] + '_overlay.json'))
+        self._overlay = None
+        self._vertical = None
+
+    def floor(self, floor_id):
+        floor = self.floors.get(str(floor_id))
+        if floor is None:
+            raise KeyError(f"Unknown floor '{floor_id}'. Floors: {list(self.floors)}")
+        return floor
+
+    def loaded_floors(self):
+        return [floor.id for floor in self.floors.values() if floor.loaded]
+
+    # --- Overlay ---
+
+    def _floor_entry(self, floor):
+        connectors = floor.connectors()
+        ids = [node['id'] for node in connectors]
+        distances = {}
+        for node_id in ids:
+            reach = floor.distances_from(node_id)
+            distances[str(node_id)] = {str(other): reach[other] for other in ids
+                                       if other != node_id and other in reach}
+        return {
+            "signature": floor.signature(),
+            "connectors": [{"id": node['id'], "type": node['type'], "name": node.get('name')}
+                           for node in connectors],
+            "distances": distances,
+        }
+
+    def overlay(self):
+        """Per-floor connector tables, refreshed only for floors whose graph changed."""
+        if self._overlay is not None:
+            return self._overlay
+
+        overlay = {"floors": {}}
+        if os.path.exists(self.overlay_path):
+            with open(self.overlay_path, 'r') as f:
+                overlay = json.load(f)
+
+        changed = False
+        for floor in self.floors.values():
+            entry = overlay["floors"].get(floor.id)
+            if entry is None or entry.get("signature") != floor.signature():
+                overlay["floors"][floor.id] = self._floor_entry(floor)
+                changed = True
+        for stale in set(overlay["floors"]) - set(self.floors):
+            del overlay["floors"][stale]
+            changed = True
+
+        if changed:
+            with open(self.overlay_path, 'w') as f:
+                json.dump(overlay, f, indent=4)
+        self._overlay = overlay
+        self._vertical = None
+        return overlay
+
+    def vertical_links(self):
+        """{(floor, node): [((floor, node), cost), ...]} between consecutive floors of a shaft."""
+        if self._vertical is not None:
+            return self._vertical
+        shafts = {}
+        for floor in self.floors.values():  # Already in level order
+            for connector in self.overlay()["floors"][floor.id]["connectors"]:
+                if not connector['name']:
+                    warnings.warn(f"Floor {floor.id}: unnamed {connector['type']} node {connector['id']} "
+                                  f"is not linked to other floors.")
+                    continue
+                key = (connector['type'], connector['name'])
+                shafts.setdefault(key, []).append((floor, connector['id']))
+
+        links = {}
+        for (kind, _), stops in shafts.items():
+            cost_per_level = self.connector_costs.get(kind, DEFAULT_CONNECTOR_COSTS['stairs'])
+            for (fa, a), (fb, b) in zip(stops, stops[1:]):
+                cost = cost_per_level * max(1, abs(fb.level - fa.level))
+                links.setdefault((fa.id, a), []).append(((fb.id, b), cost))
+                links.setdefault((fb.id, b), []).append(((fa.id, a), cost))
+        self._vertical = links
+        return links
+
+    # --- Queries ---
+
+    def route(self, start_floor, start_id, end_floor, end_id):
+        """Shortest route between nodes on any two floors.
+
+        Returns {"distance", "legs": [{"floor", "path"}], "floors_loaded"},
+        or None if there is no route.
+        """
+        start_floor, end_floor = str(start_floor), str(end_floor)
+        overlay = self.overlay()
+        vertical = self.vertical_links()
+        START, END = ('start',), ('end',)
+
+        # Entry/exit costs to the connectors of the start and end floors
+        from_start = self.floor(start_floor).distances_from(start_id)
+        to_end = self.floor(end_floor).distances_from(end_id)
+        exits = {c['id']: to_end[c['id']] for c in overlay["floors"][end_floor]["connectors"]
+                 if c['id'] in to_end}
+
+        def neighbours(key):
+            if key == START:
+                if start_floor == end_floor and end_id in from_start:
+                    yield END, from_start[end_id]
+                for c in overlay["floors"][start_floor]["connectors"]:
+                    if c['id'] in from_start:
+                        yield (start_floor, c['id']), from_start[c['id']]
+                return
+            floor_id, node_id = key
+            for other, cost in vertical.get(key, []):
+                yield other, cost
+            for other, dist in overlay["floors"][floor_id]["distances"].get(str(node_id), {}).items():
+                yield (floor_id, int(other)), dist
+            if floor_id == end_floor and node_id in exits:
+                yield END, exits[node_id]
+
+        dist = {START: 0.0}
+        parents = {START: None}
+        heap = [(0.0, 0, START)]
+        counter = 1
+        done = set()
+        while heap:
+            d, _, key = heapq.heappop(heap)
+            if key in done:
+                continue
+            done.add(key)
+            if key == END:
+                break
+            for other, cost in neighbours(key):
+                nd = d + cost
+                if nd < dist.get(other, math.inf):
+                    dist[other] = nd
+                    parents[other] = key
+                    heapq.heappush(heap, (nd, counter, other))
+                    counter += 1
+
+        if END not in done:
+            return None
+
+        # Expand the overlay path into per-floor legs, loading only those floors
+        chain = []
+        key = END
+        while key is not None:
+            chain.append(key)
+            key = parents[key]
+        chain.reverse()
+        stops = [(start_floor, start_id)] + chain[1:-1] + [(end_floor, end_id)]
+
+        legs = []
+        for (fa, a), (fb, b) in zip(stops, stops[1:]):
+            if fa != fb:
+                continue  # Vertical move through a stair or elevator shaft
+            path = self.floor(fa).engine.shortest_path(a, b) if a != b else [a]
+            if legs and legs[-1]["floor"] == fa:
+                legs[-1]["path"] += path[1:]
+            else:
+                legs.append({"floor": fa, "path": path})
+        return {"distance": dist[END], "legs": legs, "floors_loaded": self.loaded_floors()}
+
+
+def _parse_stop(text):
+    floor_id, _, node_id = text.rpartition(':')
+    return floor_id, int(node_id)
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ('overlay', 'route'):
+        print("Usage:\n  python multi_floor.py overlay <building.json>"
+              "\n  python multi_floor.py route <building.json> <floor:node> <floor:node>")
+        return
+
+    building = Building(sys.argv[2])
+    if sys.argv[1] == 'overlay':
+        overlay = building.overlay()
+        for floor_id, entry in overlay["floors"].items():
+            print(f"Floor {floor_id}: {len(entry['connectors'])} connectors")
+        print(f"Overlay saved to {building.overlay_path}")
+        return
+
+    building.overlay()
+    (start_floor, start_id), (end_floor, end_id) = _parse_stop(sys.argv[3]), _parse_stop(sys.argv[4])
+    result = building.route(start_floor, start_id, end_floor, end_id)
+    if result is None:
+        print("No route found.")
+        return
+    print(f"Distance: {result['distance']:.2f}")
+    for leg in result["legs"]:
+        print(f"  Floor {leg['floor']}: {leg['path']}")
+    print(f"Floors loaded: {result['floors_loaded']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Stage timing and tracing for the annotator pipeline.
+
+A PipelineTrace records nested stages and named counters. Each stage gets its
+wall time and, when memory tracing is on, the tracemalloc peak reached while
+it ran. Counters are inclusive like durations: a count made inside a stage
+is added to that stage, to every stage around it and to the run totals.
+
+write() puts two files in TRACE_DIR for every run:
+
+    <name>_<timestamp>.json         stages, counters and per-stage totals, for comparing runs
+    <name>_<timestamp>.trace.json   Chrome trace events; open in chrome://tracing,
+                                    https://ui.perfetto.dev or speedscope for a flamegraph
+
+Usage:
+    python pipeline_trace.py traces/annotator_20261018_101500.json
+    python pipeline_trace.py traces/old.json traces/new.json
+"""
+
+from contextlib import contextmanager
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+TRACE_DIR = 'traces'
+TRACE_VERSION = 1
+REGRESSION_THRESHOLD = 0.10  # Stage time growth flagged when comparing two traces
+
+
+class PipelineTrace:
+    """Nested stage timers, counters and optional tracemalloc peaks for one run."""
+
+    def __init__(self, name, memory=False):
+        self.name = name
+        self.memory = memory
+        self.started = time.time()
+        self.origin = time.perf_counter()
+        self.stages = []    # Finished stages, in the order they ended
+        self.counters = {}  # Run totals
+        self.samples = []   # (ms since start, counter, running total) for the Chrome counter tracks
+        self._open = []
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _now_ms(self):
+        return (time.perf_counter() - self.origin) * 1000
+
+    @contextmanager
+    def stage(self, name, **args):
+        """Time the body of a with-block as one stage; keyword args are stored with it."""
+        record = {"name": name, "depth": len(self._open), "args": args, "counters": {}}
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # Fold the peak so far into the enclosing stage before resetting it for this one
+            if self._open:
+                self._open[-1]["peak"] = max(self._open[-1]["peak"], peak)
+            tracemalloc.reset_peak()
+            record["base"] = record["peak"] = current
+            self.samples.append((self._now_ms(), 'traced_kb', current / 1024))
+        self._open.append(record)
+        record["start_ms"] = self._now_ms()
+        try:
+            yield record
+        finally:
+            record["duration_ms"] = self._now_ms() - record["start_ms"]
+            self._open.pop()
+            if self.memory:
+                current, peak = tracemalloc.get_traced_memory()
+                record["peak"] = max(record["peak"], peak)
+                if self._open:
+                    self._open[-1]["peak"] = max(self._open[-1]["peak"], record["peak"])
+                record["mem_peak_kb"] = record.pop("peak") / 1024
+                record["mem_delta_kb"] = (current - record.pop("base")) / 1024
+                self.samples.append((self._now_ms(), 'traced_kb', current / 1024))
+            self.stages.append(record)
+
+    def count(self, name, n=1):
+        """Add n to a counter of every open stage and of the run."""
+        for record in self._open:
+            record["counters"][name] = record["counters"].get(name, 0) + n
+        self.counters[name] = self.counters.get(name, 0) + n
+        self.samples.append((self._now_ms(), name, self.counters[name]))
+
+    def totals(self):
+        """Per stage name: calls, total/max ms and summed counters."""
+        totals = {}
+        for record in sorted(self.stages, key=lambda r: r["start_ms"]):
+            entry = totals.setdefault(record["name"], {"depth": record["depth"], "calls": 0, "total_ms": 0.0,
+                                                       "max_ms": 0.0, "counters": {}})
+            entry["calls"] += 1
+            entry["total_ms"] += record["duration_ms"]
+            entry["max_ms"] = max(entry["max_ms"], record["duration_ms"])
+            if "mem_peak_kb" in record:
+                entry["mem_peak_kb"] = max(entry.get("mem_peak_kb", 0.0), record["mem_peak_kb"])
+            for key, value in record["counters"].items():
+                entry["counters"][key] = entry["counters"].get(key, 0) + value
+        return totals
+
+    def to_dict(self):
+        return {"version": TRACE_VERSION, "name": self.name,
+                "started": time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+                "wall_ms": self._now_ms(), "memory": self.memory,
+                "stages": sorted(self.stages, key=lambda r: r["start_ms"]),
+                "counters": self.counters, "totals": self.totals()}
+
+    def chrome_events(self):
+        """Complete ('X') events for the stages and counter ('C') events, timestamps in µs."""
+        events = [{"name": "process_name", "ph": "M", "pid": 1, "tid": 1, "args": {"name": self.name}}]
+        for record in sorted(self.stages, key=lambda r: r["start_ms"]):
+            args = dict(record["args"], **record["counters"])
+            for key in ("mem_peak_kb", "mem_delta_kb"):
+                if key in record:
+                    args[key] = round(record[key], 1)
+            events.append({"name": record["name"], "cat": "stage", "ph": "X", "pid": 1, "tid": 1,
+                           "ts": record["start_ms"] * 1000, "dur": record["duration_ms"] * 1000, "args": args})
+        for ms, name, value in self.samples:
+            events.append({"name": name, "ph": "C", "pid": 1, "tid": 1, "ts": ms * 1000, "args": {name: value}})
+        return events
+
+    def write(self, directory=TRACE_DIR):
+        """Write the JSON trace and the Chrome trace; returns both paths."""
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, f"{self.name}_{time.strftime('%Y%m%d_%H%M%S', time.localtime(self.started))}")
+        with open(stem + '.json', 'w') as f:
+            json.dump(self.to_dict(), f, indent=4)
+        with open(stem + '.trace.json', 'w') as f:
+            json.dump({"traceEvents": self.chrome_events(), "displayTimeUnit": "ms"}, f)
+        return stem + '.json', stem + '.trace.json'
+
+    def print_summary(self):
+        print_totals(self.totals())
+
+
+def print_totals(totals):
+    print(f"  {'stage':<22}{'calls':>6}{'total ms':>11}{'max ms':>10}  counters")
+    for name, entry in totals.items():
+        counters = ', '.join(f"{key}={value:,}" for key, value in entry["counters"].items())
+        if "mem_peak_kb" in entry:
+            counters = f"peak {entry['mem_peak_kb']:,.0f} KiB" + (f", {counters}" if counters else "")
+        label = '  ' * entry.get("depth", 0) + name
+        print(f"  {label:<22}{entry['calls']:>6}{entry['total_ms']:>11.1f}{entry['max_ms']:>10.1f}  {counters}")
+
+
+def compare_totals(old, new, threshold=REGRESSION_THRESHOLD):
+    """Print per-stage time and counter changes between two traces; returns the regressed stage names."""
+    regressed = []
+    print(f"  {'stage':<22}{'old ms':>10}{'new ms':>10}{'change':>9}")
+    for name in list(old) + [n for n in new if n not in old]:
+        a, b = old.get(name), new.get(name)
+        if a is None or b is None:
+            print(f"  {name:<22}{'-' if a is None else format(a['total_ms'], '.1f'):>10}"
+                  f"{'-' if b is None else format(b['total_ms'], '.1f'):>10}")
+            continue
+        change = (b["total_ms"] - a["total_ms"]) / a["total_ms"] if a["total_ms"] else 0.0
+        flag = '  <- slower' if change > threshold else ''
+        if flag:
+            regressed.append(name)
+        print(f"  {name:<22}{a['total_ms']:>10.1f}{b['total_ms']:>10.1f}{change:>+9.0%}{flag}")
+        for key in sorted(set(a["counters"]) | set(b["counters"])):
+            if a["counters"].get(key) != b["counters"].get(key):
+                print(f"      {key}: {a['counters'].get(key, 0):,} -> {b['counters'].get(key, 0):,}")
+    return regressed
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python pipeline_trace.py <trace.json> [newer_trace.json]")
+        return
+    traces = []
+    for path in sys.argv[1:3]:
+        with open(path, 'r') as f:
+            traces.append(json.load(f))
+    for path, trace in zip(sys.argv[1:3], traces):
+        print(f"{path}: {trace['name']} started {trace['started']}, {trace['wall_ms'] / 1000:.1f}s wall")
+    if len(traces) == 1:
+        print_totals(traces[0]["totals"])
+        return
+    regressed = compare_totals(traces[0]["totals"], traces[1]["totals"])
+    if regressed:
+        print(f"{len(regressed)} stage(s) more than {REGRESSION_THRESHOLD:.0%} slower: {', '.join(regressed)}")
+
+
+if __name__ == "__main__":
+    main()
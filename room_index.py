@@ -0,0 +1,254 @@
+"""
+Room-name index: exact lookup and autocomplete without scanning the node list.
+
+Room names are reduced to keys and stored in two compact prefix tries:
+
+    name   the normalized name (case-folded, accents and punctuation removed,
+           so 'G-01', 'g 01' and 'G01' agree), plus every word suffix of
+           multi-word names, so 'Cylinder Room' is also found under 'room'
+    fuzzy  the normalized name with easily confused characters folded
+           (O/0, I/L/1), leading zeros dropped and repeated letters collapsed,
+           so 'GO1', 'g1' and 'Entrrance' still find their room
+
+Only nodes of the INDEXED_TYPES are indexed, so stairs and elevators,
+which are named too, are not offered as destinations.
+
+Each trie is path-compressed and flattened into integer arrays, built over
+the keys in sorted order. Every subtree is then one contiguous slice of the
+entry list, so a prefix query walks at most len(query) characters and
+autocomplete just reads the slice. The index is written next to the graph as
+<graph>_rooms.json and loads without rebuilding.
+
+Usage:
+    python room_index.py assets/maps/gdn_ground_floor_graph.json
+    python room_index.py assets/maps/gdn_ground_floor_graph.json g1
+"""
+
+import bisect
+from collections import deque
+import itertools
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+
+ROOMS_SUFFIX = '_rooms.json'
+INDEX_VERSION = 1
+DEFAULT_LIMIT = 10
+INDEXED_TYPES = ('room',)  # Node types offered by lookup and autocomplete
+_CONFUSABLE = str.maketrans({'o': '0', 'i': '1', 'l': '1'})
+_FIELDS = 7  # label_start, label_len, first_child, child_count, lo, exact_end, hi
+
+
+def rooms_path_for(json_path):
+    """Room index path next to a graph JSON file."""
+    return os.path.splitext(json_path)[0] + ROOMS_SUFFIX
+
+
+def normalize(text):
+    """Case-folded alphanumerics only, with accents stripped."""
+    decomposed = unicodedata.normalize('NFKD', str(text).casefold())
+    return ''.join(ch for ch in decomposed if ch.isalnum() and not unicodedata.combining(ch))
+
+
+def fuzzy_key(text):
+    """normalize() with confusable characters folded, leading zeros dropped and repeats collapsed."""
+    key = normalize(text).translate(_CONFUSABLE)
+    key = re.sub(r'(?<!\d)0+(?=\d)', '', key)
+    return re.sub(r'(\D)\1+', r'\1', key)
+
+
+def name_keys(text):
+    """The normalized name, then the normalized suffix starting at each later word."""
+    words = [w for w in re.split(r'[\W_]+', str(text)) if w]
+    keys = [normalize(text)]
+    keys += [normalize(''.join(words[k:])) for k in range(1, len(words))]
+    return [key for k, key in enumerate(keys) if key and key not in keys[:k]]
+
+
+class PrefixTrie:
+    """Path-compressed trie over (key, node_id) entries, stored as flat arrays."""
+
+    def __init__(self, labels, nodes, entries):
+        self.labels = labels    # All edge labels concatenated
+        self.nodes = nodes      # _FIELDS ints per trie node; node 0 is the root
+        self.entries = entries  # Node ids in sorted key order
+
+    @classmethod
+    def build(cls, pairs):
+        pairs = sorted(set(pairs))
+        keys = [key for key, _ in pairs]
+        labels, nodes = [], [0, 0, 0, 0, 0, 0, len(keys)]
+        label_size = 0
+        queue = deque([(0, 0, len(keys), 0)])  # (trie node, lo, hi, depth)
+        while queue:
+            node, lo, hi, depth = queue.popleft()
+            exact_end = lo
+            while exact_end < hi and len(keys[exact_end]) == depth:
+                exact_end += 1
+            # Group the longer keys by their next character; children are allocated contiguously
+            groups, start = [], exact_end
+            while start < hi:
+                end = bisect.bisect_right(keys, keys[start][:depth + 1] + '\U0010ffff', start, hi)
+                groups.append((start, end))
+                start = end
+            first_child = len(nodes) // _FIELDS
+            base = node * _FIELDS
+            nodes[base + 2:base + 7] = [first_child, len(groups), lo, exact_end, hi]
+            for glo, ghi in groups:
+                first, last = keys[glo], keys[ghi - 1]
+                common = depth + 1
+                while common < len(first) and common < len(last) and first[common] == last[common]:
+                    common += 1
+                label = first[depth:common]
+                labels.append(label)
+                nodes += [label_size, len(label), 0, 0, glo, glo, ghi]
+                label_size += len(label)
+                queue.append((len(nodes) // _FIELDS - 1, glo, ghi, common))
+        return cls(''.join(labels), nodes, [node_id for _, node_id in pairs])
+
+    def _field(self, node, k):
+        return self.nodes[node * _FIELDS + k]
+
+    def _find(self, key):
+        """(trie node, exact) for the subtree holding every key that starts with `key`, or (None, False)."""
+        node, i = 0, 0
+        while i < len(key):
+            first, count = self._field(node, 2), self._field(node, 3)
+            # Children are sorted by their first label character
+            lo, hi = first, first + count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self.labels[self._field(mid, 0)] < key[i]:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if lo == first + count or self.labels[self._field(lo, 0)] != key[i]:
+                return None, False
+            start, length = self._field(lo, 0), self._field(lo, 1)
+            label = self.labels[start:start + length]
+            rest = key[i:i + length]
+            if not label.startswith(rest):
+                return None, False
+            node, i = lo, i + len(rest)
+            if len(rest) < length:
+                return node, False  # The query ends inside this label
+        return node, True
+
+    def exact(self, key):
+        node, whole = self._find(key)
+        if node is None or not whole:
+            return []
+        return self.entries[self._field(node, 4):self._field(node, 5)]
+
+    def prefix(self, key):
+        """Generator over the node ids of every entry whose key starts with `key`, in key order.
+
+        Ids can repeat when one name has several keys. The caller stops
+        reading once it has enough, so a short query costs nothing extra.
+        """
+        node, _ = self._find(key)
+        if node is None:
+            return
+        for k in range(self._field(node, 4), self._field(node, 6)):
+            yield self.entries[k]
+
+    def to_dict(self):
+        return {"labels": self.labels, "nodes": self.nodes, "entries": self.entries}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["labels"], data["nodes"], data["entries"])
+
+
+class RoomIndex:
+    """Name and fuzzy tries over the named nodes of the given types in one graph."""
+
+    def __init__(self, names, name_trie, fuzzy_trie):
+        self.names = names  # node id -> display name
+        self.name_trie = name_trie
+        self.fuzzy_trie = fuzzy_trie
+
+    @classmethod
+    def from_nodes(cls, nodes, types=INDEXED_TYPES):
+        named = [(node['id'], node['name']) for node in nodes if node.get('name') and node.get('type') in types]
+        return cls(dict(named),
+                   PrefixTrie.build((key, node_id) for node_id, name in named for key in name_keys(name)),
+                   PrefixTrie.build((fuzzy_key(name), node_id) for node_id, name in named if fuzzy_key(name)))
+
+    def lookup(self, query):
+        """Node ids whose name matches `query` exactly (normalized, then fuzzy)."""
+        found = self.name_trie.exact(normalize(query))
+        return sorted(set(found or self.fuzzy_trie.exact(fuzzy_key(query))))
+
+    def complete(self, query, limit=DEFAULT_LIMIT):
+        """Up to `limit` (node id, name) suggestions for a partly typed name, exact matches first."""
+        suggestions, seen = [], set()
+        for node_id in itertools.chain(self.lookup(query), self.name_trie.prefix(normalize(query)),
+                                       self.fuzzy_trie.prefix(fuzzy_key(query))):
+            if node_id not in seen:
+                seen.add(node_id)
+                suggestions.append((node_id, self.names[node_id]))
+                if len(suggestions) == limit:
+                    return suggestions
+        return suggestions
+
+    def save(self, path):
+        data = {"version": INDEX_VERSION, "names": {str(k): v for k, v in self.names.items()},
+                "name": self.name_trie.to_dict(), "fuzzy": self.fuzzy_trie.to_dict()}
+        with open(path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(f"{path} has version {data.get('version')}, expected {INDEX_VERSION}.")
+        return cls({int(k): v for k, v in data["names"].items()},
+                   PrefixTrie.from_dict(data["name"]), PrefixTrie.from_dict(data["fuzzy"]))
+
+
+def write_room_index(graph, path):
+    index = RoomIndex.from_nodes(graph["nodes"])
+    index.save(path)
+    return index
+
+
+def load_room_index(json_path, nodes):
+    """The index saved next to json_path if it is at least as new as the graph, else one built from nodes."""
+    path = rooms_path_for(json_path)
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(json_path):
+        try:
+            return RoomIndex.load(path)
+        except (ValueError, KeyError):
+            pass  # Old version or unreadable: rebuild
+    return RoomIndex.from_nodes(nodes)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python room_index.py <graph.json> [query]")
+        return
+    json_path = sys.argv[1]
+    path = rooms_path_for(json_path)
+    if len(sys.argv) > 2 and os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(json_path):
+        index = RoomIndex.load(path)
+    else:
+        with open(json_path, 'r') as f:
+            graph = json.load(f)
+        start = time.perf_counter()
+        index = write_room_index(graph, path)
+        print(f"Indexed {len(index.names)} names ({len(index.name_trie.entries)} name keys, "
+              f"{len(index.name_trie.nodes) // _FIELDS} + {len(index.fuzzy_trie.nodes) // _FIELDS} trie nodes) "
+              f"in {(time.perf_counter() - start) * 1000:.1f} ms -> {path}")
+    if len(sys.argv) > 2:
+        query = ' '.join(sys.argv[2:])
+        print(f"Exact: {[(i, index.names[i]) for i in index.lookup(query)]}")
+        print(f"Suggestions: {index.complete(query)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Persistent routing engine for annotated indoor graphs.
+
+The graph is built once from the node/edge lists and reused for every
+query. Recent (start, end) results are kept in an LRU cache, and the graph
+is only rebuilt when the edge list actually changes.
+
+Edge weights are Euclidean pixel distances between node coordinates, so
+the straight-line distance is an admissible heuristic. Besides plain
+Dijkstra the engine offers A* and bidirectional A*, and reports how many
+nodes each search expanded.
+"""
+
+from collections import OrderedDict, namedtuple
+import hashlib
+import heapq
+import math
+import networkx as nx
+
+DEFAULT_CACHE_SIZE = 1024
+SEARCH_METHODS = ('dijkstra', 'astar', 'bidirectional')
+DEFAULT_METHOD = 'astar'  # Bidirectional A* expands as many nodes on the corridor ladders and is slower
+
+SearchResult = namedtuple('SearchResult', ['path', 'distance', 'expanded'])
+
+
+def _unwind(parents, node):
+    path = [node]
+    while parents[node] is not None:
+        node = parents[node]
+        path.append(node)
+    return path
+
+
+def astar_search(adjacency, coords, start, end, use_heuristic=True):
+    """A* over {u: [(v, w), ...]} with straight-line distance to `end`.
+
+    With use_heuristic=False this is plain Dijkstra. Returns a SearchResult
+    (path is None if end is unreachable).
+    """
+    ex, ey = coords[end]
+
+    def h(v):
+        if not use_heuristic:
+            return 0.0
+        x, y = coords[v]
+        return math.hypot(x - ex, y - ey)
+
+    dist = {start: 0.0}
+    parents = {start: None}
+    closed = set()
+    heap = [(h(start), start)]
+    expanded = 0
+    while heap:
+        _, u = heapq.heappop(heap)
+        if u in closed:
+            continue
+        closed.add(u)
+        expanded += 1
+        if u == end:
+            return SearchResult(_unwind(parents, end)[::-1], dist[end], expanded)
+        du = dist[u]
+        for v, w in adjacency[u]:
+            nd = du + w
+            if nd < dist.get(v, math.inf):
+                dist[v] = nd
+                parents[v] = u
+                heapq.heappush(heap, (nd + h(v), v))
+    return SearchResult(None, math.inf, expanded)
+
+
+def bidirectional_astar_search(adjacency, coords, start, end):
+    """Bidirectional A* with the average of the two straight-line potentials.
+
+    Forward keys are d_f(v) + p(v) and backward keys d_b(v) - p(v), where
+    p(v) = (h_end(v) - h_start(v)) / 2. Both reduced edge costs stay
+    non-negative, and since key_f(v) + key_b(v) = d_f(v) + d_b(v) the search
+    can stop once the two queue minima add up to the best path found.
+    """
+    sx, sy = coords[start]
+    ex, ey = coords[end]
+
+    def p(v):
+        x, y = coords[v]
+        return (math.hypot(x - ex, y - ey) - math.hypot(x - sx, y - sy)) / 2
+
+    if start == end:
+        return SearchResult([start], 0.0, 1)
+
+    dist = ({start: 0.0}, {end: 0.0})
+    parents = ({start: None}, {end: None})
+    closed = (set(), set())
+    sign = (1.0, -1.0)
+    heaps = ([(p(start), start)], [(-p(end), end)])
+    best, meeting = math.inf, None
+    expanded = 0
+
+    while heaps[0] and heaps[1]:
+        if heaps[0][0][0] + heaps[1][0][0] >= best:
+            break
+        side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+        _, u = heapq.heappop(heaps[side])
+        if u in closed[side]:
+            continue
+        closed[side].add(u)
+        expanded += 1
+
+        here, there = dist[side], dist[1 - side]
+        du = here[u]
+        for v, w in adjacency[u]:
+            nd = du + w
+            if nd < here.get(v, math.inf):
+                here[v] = nd
+                parents[side][v] = u
+                heapq.heappush(heaps[side], (nd + sign[side] * p(v), v))
+            if v in there and nd + there[v] < best:
+                best, meeting = nd + there[v], v
+
+    if meeting is None:
+        return SearchResult(None, math.inf, expanded)
+    path = _unwind(parents[0], meeting)[::-1] + _unwind(parents[1], meeting)[1:]
+    return SearchResult(path, best, expanded)
+
+
+def edges_fingerprint(edges):
+    """Stable digest of an edge list, used to detect real changes."""
+    digest = hashlib.blake2b(digest_size=16)
+    for edge in edges:
+        digest.update(f"{edge['source']},{edge['target']},{edge['weight']!r};".encode())
+    return digest.hexdigest()
+
+
+class RouteEngine:
+    """Shortest-path queries over a prebuilt, cached graph."""
+
+    def __init__(self, nodes, edges, cache_size=DEFAULT_CACHE_SIZE, method=DEFAULT_METHOD):
+        if method not in SEARCH_METHODS:
+            raise ValueError(f"Unknown search method '{method}'. Use one of {SEARCH_METHODS}.")
+        self.cache_size = cache_size
+        self.method = method
+        self.nodes_by_id = {}
+        self.coords = {}
+        self.graph = nx.Graph()
+        self.adjacency = {}
+        self.last_expanded = 0
+        self._cache = OrderedDict()
+        self._fingerprint = None
+        self.builds = 0
+        self.hits = 0
+        self.misses = 0
+        self.update_nodes(nodes)
+        self.update_edges(edges)
+
+    def update_nodes(self, nodes):
+        """Refresh the id -> node lookup table."""
+        self.nodes_by_id = {node['id']: node for node in nodes}
+        self.coords = {node['id']: (node['x'], node['y']) for node in nodes}
+
+    def update_edges(self, edges):
+        """Rebuild the graph if the edge list changed. Returns True on rebuild."""
+        fingerprint = edges_fingerprint(edges)
+        if fingerprint == self._fingerprint:
+            return False
+
+        graph = nx.Graph()
+        graph.add_weighted_edges_from(
+            (edge["source"], edge["target"], edge["weight"]) for edge in edges
+        )
+        self.graph = graph
+        self.adjacency = {
+            u: [(v, data["weight"]) for v, data in neighbours.items()]
+            for u, neighbours in graph.adjacency()
+        }
+        self._fingerprint = fingerprint
+        self._cache.clear()
+        self.builds += 1
+        return True
+
+    def node(self, node_id):
+        """O(1) lookup of a node dict by id (None if unknown)."""
+        return self.nodes_by_id.get(node_id)
+
+    def _cache_get(self, key):
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        reverse = (key[1], key[0])
+        if reverse in self._cache:
+            self._cache.move_to_end(reverse)
+            path = self._cache[reverse]
+            return None if path is None else path[::-1]
+        raise KeyError(key)
+
+    def _cache_put(self, key, path):
+        self._cache[key] = path
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def search(self, start_id, end_id, method=None):
+        """Run one uncached search. Returns a SearchResult with the expansion count.
+
+        Raises nx.NodeNotFound if either node has no edges.
+        """
+        method = method or self.method
+        for node_id in (start_id, end_id):
+            if node_id not in self.adjacency:
+                raise nx.NodeNotFound(f"Node {node_id} is not in the graph.")
+        if method == 'bidirectional':
+            result = bidirectional_astar_search(self.adjacency, self.coords, start_id, end_id)
+        else:
+            result = astar_search(self.adjacency, self.coords, start_id, end_id,
+                                  use_heuristic=(method == 'astar'))
+        self.last_expanded = result.expanded
+        return result
+
+    def shortest_path(self, start_id, end_id):
+        """Return the node-id path from start to end.
+
+        Raises nx.NetworkXNoPath / nx.NodeNotFound like nx.shortest_path.
+        """
+        key = (start_id, end_id)
+        try:
+            path = self._cache_get(key)
+            self.hits += 1
+            self.last_expanded = 0
+        except KeyError:
+            self.misses += 1
+            path = self.search(start_id, end_id).path
+            self._cache_put(key, path)
+
+        if path is None:
+            raise nx.NetworkXNoPath(f"No path between {start_id} and {end_id}.")
+        return list(path)
+
+    def path_length(self, path):
+        """Total edge weight along a node-id path."""
+        return sum(self.graph[a][b]["weight"] for a, b in zip(path, path[1:]))
+
+    def verify_pairs(self, pairs):
+        """Route many (start, end) pairs, one Dijkstra tree per distinct start.
+
+        Returns {(start, end): path or None}. Every result is also cached.
+        """
+        results = {}
+        by_start = OrderedDict()
+        for start_id, end_id in pairs:
+            by_start.setdefault(start_id, []).append(end_id)
+
+        for start_id, targets in by_start.items():
+            if start_id in self.graph:
+                tree = nx.single_source_dijkstra_path(self.graph, start_id, weight="weight")
+            else:
+                tree = {}
+            for end_id in targets:
+                path = tree.get(end_id)
+                self._cache_put((start_id, end_id), path)
+                results[(start_id, end_id)] = path
+        return results
+
+    def room_pairs(self):
+        """All unordered pairs of 'room' node ids."""
+        rooms = [node_id for node_id, node in self.nodes_by_id.items() if node['type'] == 'room']
+        return [(a, b) for i, a in enumerate(rooms) for b in rooms[i + 1:]]
@@ -0,0 +1,205 @@
+"""
+Headless batch rendering of route overlays for whole-floor QA.
+
+Routes a list of (start, end) pairs, or every room-to-room pair, in one
+batch (one Dijkstra tree per distinct start) and draws each route on a
+shared display-resolution copy of the map. The map is decoded, resized and
+given its edge layer once. Each route is then one cv2.polylines call on a
+small copy of that base. Results are written as tiled contact sheets, or
+as one frame per route.
+
+Usage:
+    python route_overlay.py --all
+    python route_overlay.py --pairs 0:7 G02:G19 --frames
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+
+import cv2
+import numpy as np
+
+from route_engine import RouteEngine
+
+# --- CONFIGURATION ---
+GRAPH_FILE = os.path.join('assets', 'maps', 'gdn_ground_floor_graph.json')
+MAP_IMAGE_PATH = os.path.join('assets', 'maps', 'gdn_ground_floor.png')
+OUTPUT_DIR = 'route_overlays'
+CELL_WIDTH = 320        # Width of one route frame in pixels
+SHEET_COLUMNS = 6
+SHEET_ROWS = 6          # Frames per sheet = columns * rows
+EDGE_COLOR = (160, 160, 160)
+ROUTE_COLOR = (0, 0, 255)
+FAIL_COLOR = (0, 0, 200)
+
+
+def make_base(img, edges, positions, xs, ys, cell_width=CELL_WIDTH, scale=1.0):
+    """Display-resolution base with every edge drawn. Returns (base, s).
+
+    scale maps node coordinates to img pixels (1.0 for the full-resolution map);
+    s maps node coordinates to base pixels.
+    """
+    h, w = img.shape[:2]
+    cell_height = max(1, round(h * cell_width / w))
+    base = cv2.resize(img, (cell_width, cell_height), interpolation=cv2.INTER_AREA)
+    s = cell_width / w * scale
+    ends = [(positions[e["source"]], positions[e["target"]]) for e in edges
+            if e["source"] in positions and e["target"] in positions]
+    if ends:
+        a, b = np.array(ends).T
+        segments = np.stack([np.column_stack([xs[a], ys[a]]), np.column_stack([xs[b], ys[b]])], axis=1)
+        cv2.polylines(base, list(np.round(segments * s).astype(np.int32)), False, EDGE_COLOR, 1, cv2.LINE_AA)
+    return base, s
+
+
+def render_route(base, points, label, ok):
+    """One frame: the route as a single polyline plus start/end markers and a caption."""
+    frame = base.copy()
+    if ok:
+        cv2.polylines(frame, [points], False, ROUTE_COLOR, 2, cv2.LINE_AA)
+        cv2.circle(frame, tuple(points[0]), 4, (0, 160, 0), -1)
+        cv2.circle(frame, tuple(points[-1]), 4, (160, 0, 0), -1)
+    else:
+        cv2.rectangle(frame, (0, 0), (frame.shape[1] - 1, frame.shape[0] - 1), FAIL_COLOR, 4)
+    cv2.rectangle(frame, (0, 0), (frame.shape[1], 18), (255, 255, 255), -1)
+    cv2.putText(frame, label, (4, 13), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 0, 0) if ok else FAIL_COLOR, 1, cv2.LINE_AA)
+    return frame
+
+
+def render_routes(img, graph, pairs, cell_width=CELL_WIDTH, scale=1.0, engine=None):
+    """Route every pair and render its frame. Returns (frames, results).
+
+    results is a list of {"start", "end", "path", "length"} (path None if unreachable).
+    """
+    nodes = graph["nodes"]
+    positions = {node['id']: k for k, node in enumerate(nodes)}
+    xs = np.array([node['x'] for node in nodes], dtype=np.float64)
+    ys = np.array([node['y'] for node in nodes], dtype=np.float64)
+    base, s = make_base(img, graph["edges"], positions, xs, ys, cell_width, scale)
+
+    engine = engine or RouteEngine(nodes, graph["edges"])
+    paths = engine.verify_pairs(pairs)
+
+    def name(node_id):
+        node = engine.node(node_id)
+        return (node.get('name') if node else None) or str(node_id)
+
+    frames, results = [], []
+    for start_id, end_id in pairs:
+        path = paths[(start_id, end_id)]
+        label = f"{name(start_id)} -> {name(end_id)}"
+        if path is None:
+            frames.append(render_route(base, None, f"{label}: NO PATH", False))
+            results.append({"start": start_id, "end": end_id, "path": None, "length": None})
+            continue
+        idx = np.fromiter((positions[p] for p in path), dtype=np.int64, count=len(path))
+        points = np.round(np.column_stack([xs[idx], ys[idx]]) * s).astype(np.int32)
+        length = engine.path_length(path)
+        frames.append(render_route(base, points, f"{label}: {length:.0f}px", True))
+        results.append({"start": start_id, "end": end_id, "path": path, "length": length})
+    return frames, results
+
+
+def contact_sheets(frames, columns=SHEET_COLUMNS, rows=SHEET_ROWS, gap=4):
+    """Tile frames into sheets of at most columns x rows frames."""
+    if not frames:
+        return []
+    fh, fw = frames[0].shape[:2]
+    per_sheet = columns * rows
+    sheets = []
+    for first in range(0, len(frames), per_sheet):
+        chunk = frames[first:first + per_sheet]
+        used_rows = math.ceil(len(chunk) / columns)
+        used_cols = min(columns, len(chunk))
+        sheet = np.full((used_rows * (fh + gap) + gap, used_cols * (fw + gap) + gap, 3), 255, dtype=np.uint8)
+        for k, frame in enumerate(chunk):
+            r, c = divmod(k, columns)
+            y, x = gap + r * (fh + gap), gap + c * (fw + gap)
+            sheet[y:y + fh, x:x + fw] = frame
+        sheets.append(sheet)
+    return sheets
+
+
+def write_outputs(frames, results, output_dir, as_frames=False):
+    """Write contact sheets (or single frames) plus a JSON summary. Returns the written paths."""
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    if as_frames:
+        for frame, result in zip(frames, results):
+            path = os.path.join(output_dir, f"route_{result['start']:04d}_{result['end']:04d}.png")
+            cv2.imwrite(path, frame)
+            written.append(path)
+    else:
+        for k, sheet in enumerate(contact_sheets(frames)):
+            path = os.path.join(output_dir, f"route_sheet_{k:03d}.png")
+            cv2.imwrite(path, sheet)
+            written.append(path)
+    with open(os.path.join(output_dir, 'routes.json'), 'w') as f:
+        json.dump(results, f, indent=4)
+    return written
+
+
+def parse_pairs(specs, nodes):
+    """'START:END' specs with node ids or room names (case-insensitive)."""
+    by_name = {str(node['name']).lower(): node['id'] for node in nodes if node.get('name')}
+
+    def lookup(token):
+        token = token.strip()
+        if token.lstrip('-').isdigit():
+            return int(token)
+        if token.lower() not in by_name:
+            raise SystemExit(f"Unknown room '{token}'.")
+        return by_name[token.lower()]
+
+    pairs = []
+    for spec in specs:
+        start, _, end = spec.partition(':')
+        pairs.append((lookup(start), lookup(end)))
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render route overlays for many pairs in one unattended run.")
+    parser.add_argument('--graph', default=GRAPH_FILE)
+    parser.add_argument('--map', default=MAP_IMAGE_PATH)
+    parser.add_argument('--pairs', nargs='+', default=[], help="START:END pairs (node ids or room names)")
+    parser.add_argument('--all', action='store_true', help="Every room-to-room pair")
+    parser.add_argument('--frames', action='store_true', help="Write one image per route instead of contact sheets")
+    parser.add_argument('--output', default=OUTPUT_DIR)
+    parser.add_argument('--cell-width', type=int, default=CELL_WIDTH)
+    args = parser.parse_args()
+
+    with open(args.graph, 'r') as f:
+        graph = json.load(f)
+    img = cv2.imread(args.map)
+    if img is None:
+        print(f"Error: Could not load image at {args.map}.")
+        return
+
+    engine = RouteEngine(graph["nodes"], graph["edges"])
+    pairs = parse_pairs(args.pairs, graph["nodes"])
+    if args.all:
+        pairs += engine.room_pairs()
+    if not pairs:
+        print("Nothing to render. Pass --pairs START:END ... or --all.")
+        return
+
+    start = time.perf_counter()
+    frames, results = render_routes(img, graph, pairs, args.cell_width, engine=engine)
+    written = write_outputs(frames, results, args.output, args.frames)
+    elapsed = time.perf_counter() - start
+
+    missing = [r for r in results if r["path"] is None]
+    print(f"Rendered {len(results)} routes in {elapsed:.2f}s -> {len(written)} image(s) in {args.output}/")
+    print(f"{len(results) - len(missing)} reachable, {len(missing)} unreachable.")
+    for r in missing:
+        print(f"  No path: {r['start']} -> {r['end']}")
+
+
+if __name__ == "__main__":
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    os.chdir(script_dir)
+    main()
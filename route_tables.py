@@ -0,0 +1,218 @@
+"""
+Precomputed room-to-room distance and next-hop tables.
+
+An offline build runs one Dijkstra per 'room' node in parallel worker
+processes and writes two memory-mapped .npy tables next to the graph:
+
+    <prefix>_room_dist.npy   float32[R, R]  shortest distance between rooms
+    <prefix>_next_hop.npy    int32[R, N]    row r: for every node, the next
+                                            node on its shortest path to room r
+                                            (-1 if unreachable)
+
+plus <prefix>_route_tables.json with the room and node id mapping. Any
+route to a room is then rebuilt by walking the next-hop row, with no
+search at query time.
+
+The next-hop table covers every node, so routes can start anywhere, and
+takes 4 * R * N bytes: about 4 MB for 200 rooms over 5,000 nodes, but
+800 MB for 2,000 rooms over 100,000 nodes. Both tables are memory-mapped,
+so a query only pages in the rows it walks; on graphs that large, check
+the disk budget (the build prints the table sizes) or route with
+route_engine.py / contraction_hierarchy.py instead.
+
+Usage:
+    python route_tables.py assets/maps/gdn_ground_floor_graph.json --workers 4
+    python route_tables.py assets/maps/gdn_ground_floor_graph.json --query 0 7
+"""
+
+import argparse
+import heapq
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from graph_binary import BinaryGraph, write_binary_graph
+
+TABLE_CHUNK_SIZE = 8  # Rooms handed to a worker per task
+
+# Per-worker state, filled by _init_worker
+_worker = {}
+
+
+def table_paths(prefix):
+    return {
+        'dist': prefix + '_room_dist.npy',
+        'next_hop': prefix + '_next_hop.npy',
+        'meta': prefix + '_route_tables.json',
+        'graph': prefix + '_route_tables.pfgraph',
+    }
+
+
+def _init_worker(graph_path, paths):
+    graph = BinaryGraph(graph_path)
+    _worker['indptr'] = graph.indptr.tolist()
+    _worker['indices'] = graph.indices.tolist()
+    _worker['weights'] = graph.weights.tolist()
+    _worker['dist'] = np.load(paths['dist'], mmap_mode='r+')
+    _worker['next_hop'] = np.load(paths['next_hop'], mmap_mode='r+')
+    with open(paths['meta'], 'r') as f:
+        _worker['room_positions'] = json.load(f)['room_positions']
+
+
+def _dijkstra_tree(source, indptr, indices, weights):
+    """Distances and parent pointers of the shortest-path tree rooted at source."""
+    n = len(indptr) - 1
+    dist = [float('inf')] * n
+    parent = [-1] * n
+    dist[source] = 0.0
+    parent[source] = source
+    heap = [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        for k in range(indptr[u], indptr[u + 1]):
+            v = indices[k]
+            nd = d + weights[k]
+            if nd < dist[v]:
+                dist[v] = nd
+                parent[v] = u
+                heapq.heappush(heap, (nd, v))
+    return dist, parent
+
+
+def _build_rows(rows):
+    """Worker task: fill the distance and next-hop rows for a chunk of rooms."""
+    room_positions = _worker['room_positions']
+    for row in rows:
+        # The graph is undirected, so a node's parent in the tree rooted at the
+        # room is its next hop towards that room.
+        dist, parent = _dijkstra_tree(room_positions[row], _worker['indptr'],
+                                      _worker['indices'], _worker['weights'])
+        _worker['next_hop'][row] = parent
+        _worker['dist'][row] = [dist[p] for p in room_positions]
+    _worker['next_hop'].flush()
+    _worker['dist'].flush()
+    return len(rows)
+
+
+def build_route_tables(graph, prefix, workers=None):
+    """Build the tables for a {'nodes', 'edges'} graph dict. Returns the paths."""
+    paths = table_paths(prefix)
+    nodes = graph["nodes"]
+    room_positions = [k for k, node in enumerate(nodes) if node['type'] == 'room']
+    n, r = len(nodes), len(room_positions)
+
+    try:
+        write_binary_graph(graph, paths['graph'])
+        with open(paths['meta'], 'w') as f:
+            json.dump({
+                "node_ids": [node['id'] for node in nodes],
+                "room_positions": room_positions,
+                "room_ids": [nodes[p]['id'] for p in room_positions],
+                "room_names": [nodes[p].get('name') for p in room_positions],
+            }, f)
+
+        dist = np.lib.format.open_memmap(paths['dist'], mode='w+', dtype=np.float32, shape=(r, r))
+        next_hop = np.lib.format.open_memmap(paths['next_hop'], mode='w+', dtype=np.int32, shape=(r, n))
+        del dist, next_hop  # Workers reopen the files themselves
+
+        chunks = [list(range(k, min(k + TABLE_CHUNK_SIZE, r))) for k in range(0, r, TABLE_CHUNK_SIZE)]
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(paths['graph'], paths)) as pool:
+            for _ in pool.imap_unordered(_build_rows, chunks):
+                pass
+    finally:
+        # Only the workers need the binary graph; don't leave it behind if one of them fails
+        if os.path.exists(paths['graph']):
+            os.remove(paths['graph'])
+    return paths
+
+
+class RouteTables:
+    """Read-only, memory-mapped view of prebuilt route tables."""
+
+    def __init__(self, prefix):
+        paths = table_paths(prefix)
+        with open(paths['meta'], 'r') as f:
+            meta = json.load(f)
+        self.node_ids = meta['node_ids']
+        self.room_ids = meta['room_ids']
+        self.room_names = meta['room_names']
+        self.dist = np.load(paths['dist'], mmap_mode='r')
+        self.next_hop = np.load(paths['next_hop'], mmap_mode='r')
+        self._position = {node_id: k for k, node_id in enumerate(self.node_ids)}
+        self._room_row = {room_id: k for k, room_id in enumerate(self.room_ids)}
+
+    def resolve(self, text):
+        """Node id for a node id or room name typed on the command line. Raises KeyError if unknown."""
+        if text.lstrip('-').isdigit():
+            if int(text) not in self._position:
+                raise KeyError(f"Unknown node id {text}.")
+            return int(text)
+        matches = [room_id for room_id, name in zip(self.room_ids, self.room_names)
+                   if name and name.lower() == text.lower()]
+        if len(matches) != 1:
+            raise KeyError(f"'{text}' is {'ambiguous' if matches else 'not a room name'}.")
+        return matches[0]
+
+    def distance(self, start_room_id, end_room_id):
+        """Shortest distance between two rooms (inf if unreachable)."""
+        return float(self.dist[self._room_row[start_room_id], self._room_row[end_room_id]])
+
+    def route(self, start_id, end_room_id):
+        """Node-id path from any node to a room, or None if unreachable."""
+        row = self.next_hop[self._room_row[end_room_id]]
+        target = self._position[end_room_id]
+        u = self._position[start_id]
+        if row[u] < 0:
+            return None
+        path = [u]
+        while u != target:
+            u = int(row[u])
+            path.append(u)
+        return [self.node_ids[p] for p in path]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute room-to-room route tables.")
+    parser.add_argument('graph', help="Graph JSON file")
+    parser.add_argument('--prefix', default=None, help="Output prefix (default: next to the graph)")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--query', nargs=2, metavar=('START', 'END'),
+                        help="Look up a route (node ids or room names) in existing tables instead of building")
+    args = parser.parse_args()
+    prefix = args.prefix or os.path.splitext(args.graph)[0]
+
+    if args.query:
+        tables = RouteTables(prefix)
+        try:
+            start_id, end_id = (tables.resolve(text) for text in args.query)
+        except KeyError as e:
+            parser.error(e.args[0])
+        if end_id not in tables.room_ids:
+            print(f"Node {end_id} is not a room. Tables only cover routes to rooms.")
+            return
+        start = time.perf_counter()
+        path = tables.route(start_id, end_id)
+        elapsed = time.perf_counter() - start
+        print(f"Route {start_id} -> {end_id}: {path} (looked up in {elapsed * 1e6:.1f} us)")
+        if start_id in tables.room_ids:
+            print(f"Distance {tables.distance(start_id, end_id):.2f}")
+        return
+
+    with open(args.graph, 'r') as f:
+        graph = json.load(f)
+    start = time.perf_counter()
+    paths = build_route_tables(graph, prefix, args.workers)
+    elapsed = time.perf_counter() - start
+    rooms = sum(1 for node in graph["nodes"] if node['type'] == 'room')
+    print(f"Built tables for {rooms} rooms over {len(graph['nodes'])} nodes in {elapsed:.2f}s")
+    for key in ('dist', 'next_hop', 'meta'):
+        print(f"  {paths[key]} ({os.path.getsize(paths[key]) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
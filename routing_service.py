@@ -0,0 +1,342 @@
+"""
+Local HTTP routing service: one warm process shared by kiosks and test harnesses.
+
+The graph JSON is loaded once, and the room index saved next to it (see
+room_index.py) is reused unless it is older than the graph. Searches run in
+a process pool whose workers each hold their own RouteEngine (and its route
+cache) and EdgeIndex, so the event loop only parses requests and writes
+responses. Connections are kept alive between requests. HTTP/1.1 is spoken
+directly on asyncio streams, because the service needs nothing beyond small
+JSON bodies.
+
+Endpoints (node ids or room names are accepted wherever an id is expected):
+    GET  /route?start=0&end=G19        one route
+    GET  /route?x=420&y=310&end=7      route from a map position, entering the nearest corridor
+    POST /routes  {"pairs": [[0, 7], ["G02", "G19"]]}   many routes in one request
+    GET  /rooms?q=g1&limit=10          room-name autocomplete
+    GET  /stats                        request/route counters, latency percentiles, throughput
+
+Usage:
+    python routing_service.py
+    python routing_service.py assets/maps/gdn_ground_floor_graph.json --port 8765 --workers 4
+"""
+
+import argparse
+import asyncio
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import networkx as nx
+
+from edge_index import EdgeIndex, route_from_point
+from room_index import load_room_index
+from route_engine import DEFAULT_METHOD, SEARCH_METHODS, RouteEngine
+
+# --- CONFIGURATION ---
+GRAPH_FILE = os.path.join('assets', 'maps', 'gdn_ground_floor_graph.json')
+HOST = '127.0.0.1'
+PORT = 8765
+WORKERS = os.cpu_count() or 1
+KEEP_ALIVE_TIMEOUT = 30.0   # Seconds an idle connection is kept open
+MAX_BODY_BYTES = 4 << 20    # Largest accepted request body
+LATENCY_WINDOW = 10000      # Recent requests used for the latency percentiles
+THROUGHPUT_WINDOW = 60.0    # Seconds of history used for the recent routes/s figure
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 431: 'Request Header Fields Too Large', 500: 'Internal Server Error'}
+
+
+# --- Worker side: one engine per process, built once by the pool initializer ---
+
+_engine = None
+_index = None
+
+
+def _init_worker(graph_path, method):
+    global _engine, _index
+    with open(graph_path, 'r') as f:
+        graph = json.load(f)
+    _engine = RouteEngine(graph["nodes"], graph["edges"], method=method)
+    _index = EdgeIndex(graph["nodes"], graph["edges"])
+
+
+def _route(start_id, end_id):
+    try:
+        path = _engine.shortest_path(start_id, end_id)
+    except (nx.NetworkXNoPath, nx.NodeNotFound):
+        return {"start": start_id, "end": end_id, "path": None, "distance": None}
+    return {"start": start_id, "end": end_id, "path": path, "distance": _engine.path_length(path)}
+
+
+def _route_batch(pairs):
+    """Route pairs grouped by start, so each start's Dijkstra tree is built once."""
+    paths = _engine.verify_pairs(pairs)
+    results = []
+    for start_id, end_id in pairs:
+        path = paths[(start_id, end_id)]
+        results.append({"start": start_id, "end": end_id, "path": path,
+                        "distance": None if path is None else _engine.path_length(path)})
+    return results
+
+
+def _route_point(x, y, end_id):
+    try:
+        result = route_from_point(_index, _engine, x, y, end_id)
+    except nx.NodeNotFound:
+        result = None
+    if result is None:
+        return {"x": x, "y": y, "end": end_id, "path": None, "distance": None}
+    return {"x": x, "y": y, "end": end_id, "point": list(result["point"]), "edge": result["edge"],
+            "path": result["path"], "distance": result["distance"]}
+
+
+# --- Server side ---
+
+class ServiceStats:
+    """Counters, recent latencies and route throughput."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.requests = 0
+        self.routes = 0
+        self.errors = 0
+        self.connections = 0
+        self.open_connections = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.recent = deque()  # (finish time, routes) over the last THROUGHPUT_WINDOW seconds
+
+    def record(self, elapsed, routes, ok):
+        now = time.time()
+        self.requests += 1
+        self.routes += routes
+        self.errors += not ok
+        self.latencies.append(elapsed)
+        self.recent.append((now, routes))
+        while self.recent and self.recent[0][0] < now - THROUGHPUT_WINDOW:
+            self.recent.popleft()
+
+    def snapshot(self, workers):
+        uptime = time.time() - self.started
+        ordered = sorted(self.latencies)
+
+        def percentile(q):
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000 if ordered else None
+
+        window = min(THROUGHPUT_WINDOW, uptime) or 1.0
+        return {
+            "uptime_s": uptime,
+            "workers": workers,
+            "requests": self.requests,
+            "routes": self.routes,
+            "errors": self.errors,
+            "connections": self.connections,
+            "open_connections": self.open_connections,
+            "latency_ms": {"p50": percentile(0.50), "p95": percentile(0.95), "p99": percentile(0.99),
+                           "max": ordered[-1] * 1000 if ordered else None},
+            "routes_per_s": self.routes / uptime if uptime else 0.0,
+            "recent_routes_per_s": sum(n for _, n in self.recent) / window,
+        }
+
+
+class BadRequest(Exception):
+    pass
+
+
+class RoutingService:
+    """Parses requests, resolves room names and hands searches to the pool."""
+
+    def __init__(self, graph_path, workers=WORKERS, method=DEFAULT_METHOD):
+        with open(graph_path, 'r') as f:
+            graph = json.load(f)
+        self.node_ids = {node['id'] for node in graph["nodes"]}
+        self.rooms = load_room_index(graph_path, graph["nodes"])
+        self.workers = workers
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                        initargs=(graph_path, method))
+        self.stats = ServiceStats()
+
+    def resolve(self, value):
+        """Node id from an int, a numeric string or a room name (see room_index.py)."""
+        if isinstance(value, int) and value in self.node_ids:
+            return value
+        text = str(value).strip()
+        if text.lstrip('-').isdigit() and int(text) in self.node_ids:
+            return int(text)
+        matches = self.rooms.lookup(text)
+        if len(matches) == 1:
+            return matches[0]
+        raise BadRequest(f"{'Ambiguous' if matches else 'Unknown'} node or room '{value}'.")
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, func, *args)
+
+    async def route(self, query):
+        if 'end' not in query:
+            raise BadRequest("Missing 'end'.")
+        end_id = self.resolve(query['end'][0])
+        if 'x' in query and 'y' in query:
+            try:
+                x, y = float(query['x'][0]), float(query['y'][0])
+            except ValueError:
+                raise BadRequest("'x' and 'y' must be numbers.")
+            return await self._run(_route_point, x, y, end_id)
+        if 'start' not in query:
+            raise BadRequest("Missing 'start' (or 'x' and 'y').")
+        return await self._run(_route, self.resolve(query['start'][0]), end_id)
+
+    async def routes(self, body):
+        try:
+            pairs = json.loads(body or b'{}')["pairs"]
+            pairs = [(self.resolve(a), self.resolve(b)) for a, b in pairs]
+        except (ValueError, KeyError, TypeError):
+            raise BadRequest('Body must be {"pairs": [[start, end], ...]}.')
+        # One chunk per worker; a start's pairs stay together so its tree is shared
+        by_start = {}
+        for pair in pairs:
+            by_start.setdefault(pair[0], []).append(pair)
+        chunks = [[] for _ in range(min(self.workers, len(by_start)) or 1)]
+        for group in sorted(by_start.values(), key=len, reverse=True):
+            min(chunks, key=len).extend(group)
+        parts = await asyncio.gather(*(self._run(_route_batch, chunk) for chunk in chunks if chunk))
+        found = {(r["start"], r["end"]): r for part in parts for r in part}
+        return [found[pair] for pair in pairs]
+
+    async def dispatch(self, method, target, body):
+        """Returns (status, payload, routes served)."""
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        if url.path == '/route':
+            if method != 'GET':
+                return 405, {"error": "Use GET /route."}, 0
+            return 200, await self.route(query), 1
+        if url.path == '/routes':
+            if method != 'POST':
+                return 405, {"error": "Use POST /routes."}, 0
+            results = await self.routes(body)
+            return 200, {"routes": results}, len(results)
+        if url.path == '/rooms':
+            try:
+                limit = int(query.get('limit', ['10'])[0])
+            except ValueError:
+                raise BadRequest("'limit' must be an integer.")
+            matches = self.rooms.complete(query.get('q', [''])[0], limit)
+            return 200, {"rooms": [{"id": node_id, "name": name} for node_id, name in matches]}, 0
+        if url.path == '/stats':
+            return 200, self.stats.snapshot(self.workers), 0
+        return 404, {"error": f"No endpoint {url.path}."}, 0
+
+    async def respond(self, writer, status, payload, keep_alive):
+        data = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data)
+        await writer.drain()
+
+    async def handle_connection(self, reader, writer):
+        self.stats.connections += 1
+        self.stats.open_connections += 1
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                except (ValueError, asyncio.LimitOverrunError):
+                    # Longer than the stream limit: the rest of the request cannot be framed
+                    await self.respond(writer, 400, {"error": "Request line too long."}, False)
+                    self.stats.record(0.0, 0, False)
+                    break
+                if not request_line.strip():
+                    break
+                start = time.perf_counter()
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+                headers, too_long = {}, False
+                while True:
+                    try:
+                        line = await reader.readline()
+                    except (ValueError, asyncio.LimitOverrunError):
+                        too_long = True
+                        break
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    length = -1
+                if too_long:
+                    # A header line longer than the stream limit: the request cannot be framed
+                    status, payload, routes = 431, {"error": "Request header line too long."}, 0
+                    keep_alive = False
+                elif length < 0:
+                    # The body cannot be framed, so the connection cannot be reused
+                    status, payload, routes = 400, {"error": "Content-Length must be a non-negative integer."}, 0
+                    keep_alive = False
+                elif length > MAX_BODY_BYTES:
+                    status, payload, routes = 413, {"error": "Request body too large."}, 0
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    try:
+                        status, payload, routes = await self.dispatch(method, target, body)
+                    except BadRequest as e:
+                        status, payload, routes = 400, {"error": str(e)}, 0
+                    except Exception as e:
+                        status, payload, routes = 500, {"error": str(e)}, 0
+                    connection = headers.get('connection', '').lower()
+                    keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close'
+
+                await self.respond(writer, status, payload, keep_alive)
+                self.stats.record(time.perf_counter() - start, routes, status == 200)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.stats.open_connections -= 1
+            writer.close()
+
+    async def serve(self, host=HOST, port=PORT):
+        # Warm every worker before accepting connections, so the first requests don't pay for loading
+        await asyncio.gather(*(self._run(_route_batch, []) for _ in range(self.workers)))
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Routing service on http://{host}:{port} ({self.workers} workers). Ctrl+C to stop.")
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve routes over HTTP from one warm routing process.")
+    parser.add_argument('graph', nargs='?', default=GRAPH_FILE)
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--method', choices=SEARCH_METHODS, default=DEFAULT_METHOD)
+    args = parser.parse_args()
+
+    service = RoutingService(args.graph, args.workers, args.method)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nStopped.")
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    os.chdir(script_dir)
+    main()
@@ -0,0 +1,158 @@
+"""
+Spatial index over node pixel coordinates.
+
+A uniform grid built from NumPy arrays. Radius queries are answered in one
+batched pass instead of comparing every node against every other node, which
+keeps auto-linking near-linear on building-sized graphs.
+"""
+
+import math
+import numpy as np
+
+from line_of_sight import segments_clear
+
+
+class GridIndex:
+    """Uniform-grid bucket index over (x, y) points."""
+
+    def __init__(self, xs, ys, cell_size):
+        self.xs = np.asarray(xs, dtype=np.float64)
+        self.ys = np.asarray(ys, dtype=np.float64)
+        self.cell_size = float(cell_size)
+        if not self.cell_size > 0:
+            raise ValueError(f"cell_size must be positive, got {cell_size}")
+
+        fx = np.floor(self.xs / self.cell_size)
+        fy = np.floor(self.ys / self.cell_size)
+        # Cell keys are int64: the grid spanned by the points must fit in one
+        if len(fx) and (max(np.abs(fx).max(), np.abs(fy).max()) >= 2.0 ** 62
+                        or (np.ptp(fx) + 3) * (np.ptp(fy) + 3) >= 2.0 ** 62):
+            raise ValueError(f"cell_size {cell_size} is too small for the coordinate range of the points")
+        cx = fx.astype(np.int64)
+        cy = fy.astype(np.int64)
+        self._cx = cx
+        self._cy = cy
+        # Row-major cell key, offset so neighbour cells never wrap around
+        self._x0 = cx.min() - 1 if len(cx) else 0
+        self._y0 = cy.min() - 1 if len(cy) else 0
+        self._width = (cx.max() - self._x0 + 2) if len(cx) else 1
+        keys = (cy - self._y0) * self._width + (cx - self._x0)
+
+        self.order = np.argsort(keys, kind='stable')
+        self.sorted_keys = keys[self.order]
+        self.comparisons = 0 # Point pairs whose distance query_pairs has computed
+
+    def __len__(self):
+        return len(self.xs)
+
+    def _cell_ranges(self, cx, cy):
+        keys = (cy - self._y0) * self._width + (cx - self._x0)
+        starts = np.searchsorted(self.sorted_keys, keys, side='left')
+        ends = np.searchsorted(self.sorted_keys, keys, side='right')
+        return starts, ends
+
+    def query_pairs(self, radius):
+        """Return (i, j, d2) arrays for every ordered pair i != j within radius.
+
+        d2 is the squared distance. The cell size must be >= radius, so only
+        the 3x3 block of cells around each point has to be scanned.
+        """
+        if radius > self.cell_size:
+            raise ValueError("radius must not exceed the grid cell size")
+
+        n = len(self.xs)
+        empty = np.empty(0, dtype=np.int64)
+        if n < 2:
+            return empty, empty, empty
+
+        r2 = radius * radius
+        all_i, all_j, all_d2 = [], [], []
+        points = np.arange(n, dtype=np.int64)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                starts, ends = self._cell_ranges(self._cx + dx, self._cy + dy)
+                counts = ends - starts
+                total = int(counts.sum())
+                if total == 0:
+                    continue
+                self.comparisons += total
+                # Expand each point's [start, end) slice into flat pair arrays
+                i = np.repeat(points, counts)
+                offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+                j = self.order[np.repeat(starts, counts) + offsets]
+
+                d2 = (self.xs[i] - self.xs[j]) ** 2 + (self.ys[i] - self.ys[j]) ** 2
+                keep = (i != j) & (d2 <= r2)
+                all_i.append(i[keep])
+                all_j.append(j[keep])
+                all_d2.append(d2[keep])
+
+        if not all_i:
+            return empty, empty, empty
+        return np.concatenate(all_i), np.concatenate(all_j), np.concatenate(all_d2)
+
+
+def auto_link_path_nodes(nodes, added_edges, max_distance, walkable=None, stats=None, mask_scale=1.0):
+    """Link every 'path' node to its closest unlinked 'path' neighbour.
+
+    Produces exactly the edges of the original nested loop in
+    map_annotator.main: nodes are visited in list order, ties go to the
+    neighbour that appears first in the list, and pairs already in
+    added_edges are skipped. added_edges is updated in place.
+
+    If a walkable mask is given, candidate segments that leave it are
+    rejected first (one batched check), so each node links to its closest
+    neighbour in line of sight. mask_scale is the mask's size relative to
+    the map, for masks loaded at a reduced scale.
+    If a stats dict is given, the pair comparisons, candidate pairs and
+    line-of-sight checks are added to it.
+    Returns the list of new edge dicts.
+    """
+    path_nodes = [node for node in nodes if node['type'] == 'path']
+    if len(path_nodes) < 2:
+        return []
+
+    ids = np.array([node['id'] for node in path_nodes], dtype=np.int64)
+    xs = np.array([node['x'] for node in path_nodes])
+    ys = np.array([node['y'] for node in path_nodes])
+
+    index = GridIndex(xs, ys, max_distance)
+    i, j, d2 = index.query_pairs(max_distance)
+    if stats is not None:
+        stats["pair_comparisons"] = stats.get("pair_comparisons", 0) + index.comparisons
+        stats["candidate_pairs"] = stats.get("candidate_pairs", 0) + len(i)
+
+    if walkable is not None and len(i):
+        # Check each unordered pair once, then map the verdict back to both directions
+        n = len(path_nodes)
+        keys, inverse = np.unique(np.minimum(i, j) * n + np.maximum(i, j), return_inverse=True)
+        a, b = keys // n, keys % n
+        clear = segments_clear(walkable, xs[a], ys[a], xs[b], ys[b], scale=mask_scale)
+        if stats is not None:
+            stats["los_checks"] = stats.get("los_checks", 0) + len(keys)
+        keep = clear[inverse.ravel()]
+        i, j, d2 = i[keep], j[keep], d2[keep]
+
+    # Candidates grouped per node, nearest first, list order breaking ties
+    order = np.lexsort((j, d2, i))
+    i, j = i[order], j[order]
+    bounds = np.searchsorted(i, np.arange(len(path_nodes) + 1))
+
+    new_edges = []
+    for a_idx, node_a in enumerate(path_nodes):
+        a_id = node_a['id']
+        for b_idx in j[bounds[a_idx]:bounds[a_idx + 1]].tolist():
+            b_id = int(ids[b_idx])
+            if a_id == b_id:
+                continue
+            pair = tuple(sorted((a_id, b_id)))
+            if pair in added_edges:
+                continue
+
+            node_b = path_nodes[b_idx]
+            dist = math.dist((node_a['x'], node_a['y']), (node_b['x'], node_b['y']))
+            new_edges.append({"source": a_id, "target": b_id, "weight": dist})
+            added_edges.add(pair)
+            break
+
+    return new_edges
@@ -0,0 +1,51 @@
+"""Shared fixtures for the Python tools at the repository root."""
+
+import math
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def grid_graph(rows=8, cols=10, spacing=30, seed=0, drop=0.15, rooms=6):
+    """A jittered corridor grid with some edges missing and rooms hanging off it.
+
+    Coordinates are integers, so squared distances (and ties) are exact.
+    """
+    rng = random.Random(seed)
+    nodes, edges = [], []
+    for r in range(rows):
+        for c in range(cols):
+            nodes.append({"id": len(nodes), "x": c * spacing + rng.randint(-5, 5),
+                          "y": r * spacing + rng.randint(-5, 5), "type": "path", "name": None})
+
+    def link(a, b):
+        edges.append({"source": a, "target": b,
+                      "weight": math.dist((nodes[a]['x'], nodes[a]['y']), (nodes[b]['x'], nodes[b]['y']))})
+
+    for r in range(rows):
+        for c in range(cols):
+            k = r * cols + c
+            if c + 1 < cols and rng.random() >= drop:
+                link(k, k + 1)
+            if r + 1 < rows and rng.random() >= drop:
+                link(k, k + cols)
+    for i in range(rooms):
+        anchor = rng.randrange(rows * cols)
+        nodes.append({"id": len(nodes), "x": nodes[anchor]['x'] + 8, "y": nodes[anchor]['y'] + 8,
+                      "type": "room", "name": f"G{i + 1:02d}"})
+        link(len(nodes) - 1, anchor)
+    return {"nodes": nodes, "edges": edges}
+
+
+@pytest.fixture
+def graph():
+    return grid_graph()
+
+
+@pytest.fixture
+def make_graph():
+    return grid_graph
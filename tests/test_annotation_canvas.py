@@ -0,0 +1,53 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from annotation_canvas import AnnotationCanvas, SnapshotWriter
+
+
+def test_patched_display_matches_a_full_resize_to_within_rounding():
+    rng = np.random.default_rng(0)
+    img = cv2.GaussianBlur(rng.integers(0, 256, (900, 1300, 3), dtype=np.uint8), (9, 9), 3)
+    canvas = AnnotationCanvas(img, 560, 388)
+    for k, (x, y) in enumerate(rng.integers(10, 880, (40, 2)).tolist()):
+        canvas.draw_node(x, y, k, (0, 0, 255))
+    diff = np.abs(cv2.resize(canvas.full, (560, 388)).astype(int) - canvas.display)
+    assert diff.max() <= 8
+    assert diff.mean() < 0.05
+    assert canvas.redraw_pixels < 560 * 388
+
+
+def test_snapshot_writer_flushes_on_close(tmp_path):
+    canvas = AnnotationCanvas(np.zeros((50, 60, 3), dtype=np.uint8), 30, 25)
+    path = str(tmp_path / "snapshot.png")
+    writer = SnapshotWriter(canvas, path, delay=10.0)
+    for k in range(5):
+        canvas.draw_node(10 + 5 * k, 20, k, (255, 0, 0))
+        writer.request()
+    writer.close()  # Does not wait out the delay
+    assert writer.writes == 1
+    assert np.array_equal(cv2.imread(path), canvas.full)
+
+
+def test_request_during_a_write_is_flushed_on_close(tmp_path, monkeypatch):
+    canvas = AnnotationCanvas(np.zeros((50, 60, 3), dtype=np.uint8), 30, 25)
+    path = str(tmp_path / "snapshot.png")
+    writing = threading.Event()
+    imwrite = cv2.imwrite
+
+    def slow_imwrite(*args):
+        writing.set()
+        time.sleep(0.2)
+        return imwrite(*args)
+
+    monkeypatch.setattr(cv2, 'imwrite', slow_imwrite)
+    writer = SnapshotWriter(canvas, path, delay=0.0)
+    writer.request()
+    assert writing.wait(5)
+    canvas.draw_node(30, 20, 1, (255, 0, 0))
+    writer.request()
+    writer.close()
+    assert writer.writes == 2
+    assert np.array_equal(cv2.imread(path), canvas.full)
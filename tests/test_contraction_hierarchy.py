@@ -0,0 +1,35 @@
+import math
+import random
+
+import networkx as nx
+import pytest
+
+from contraction_hierarchy import ContractionHierarchy, build_hierarchy, save_hierarchy
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_queries_agree_with_dijkstra(make_graph, seed):
+    graph = make_graph(rows=12, cols=12, seed=seed, drop=0.25)
+    reference = nx.Graph()
+    reference.add_nodes_from(node['id'] for node in graph["nodes"])
+    reference.add_weighted_edges_from((e["source"], e["target"], e["weight"]) for e in graph["edges"])
+    ch = ContractionHierarchy(build_hierarchy(graph))
+
+    rng = random.Random(seed)
+    for _ in range(150):
+        a, b = rng.randrange(len(graph["nodes"])), rng.randrange(len(graph["nodes"]))
+        distance, path = ch.query(a, b)
+        if not nx.has_path(reference, a, b):
+            assert (distance, path) == (math.inf, None)
+            continue
+        assert distance == pytest.approx(nx.dijkstra_path_length(reference, a, b))
+        # The unpacked path uses original edges only and has the same length
+        assert path[0] == a and path[-1] == b
+        assert sum(reference[u][v]["weight"] for u, v in zip(path, path[1:])) == pytest.approx(distance)
+
+
+def test_saved_hierarchy_loads(graph, tmp_path):
+    path = str(tmp_path / "graph.ch.npz")
+    arrays = build_hierarchy(graph)
+    save_hierarchy(arrays, path)
+    assert ContractionHierarchy(path).query(0, 42) == ContractionHierarchy(arrays).query(0, 42)
@@ -0,0 +1,38 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from corridor_extractor import extract_corridor_graph
+from corridor_snap import CorridorSnapper
+
+
+def t_shaped_mask():
+    mask = np.zeros((120, 200), dtype=bool)
+    mask[50:70, 10:190] = True   # East-west corridor
+    mask[60:115, 90:110] = True  # Branch going south
+    return mask
+
+
+def test_t_corridor_becomes_one_junction_with_three_arms():
+    graph = extract_corridor_graph(t_shaped_mask())
+    degree = Counter(e[end] for e in graph["edges"] for end in ("source", "target"))
+    assert sorted(degree.values()).count(3) == 1
+    assert list(degree.values()).count(1) == 3
+    assert set(degree) == {node['id'] for node in graph["nodes"]}
+    mask = t_shaped_mask()
+    assert all(mask[node['y'], node['x']] for node in graph["nodes"])
+
+
+def test_snapper_moves_clicks_onto_the_centreline():
+    snapper = CorridorSnapper(t_shaped_mask(), max_distance=20)
+    x, y = snapper.snap(40, 53)
+    assert x == pytest.approx(40, abs=1) and y == pytest.approx(59.5, abs=1.5)
+    assert snapper.snap(40, 5) == (40, 5)  # Too far from any corridor
+
+
+def test_snapper_at_reduced_scale_works_in_map_coordinates():
+    full = t_shaped_mask()
+    half = full[::2, ::2]
+    x, y = CorridorSnapper(half, max_distance=20, scale=0.5).snap(150, 66)
+    assert x == pytest.approx(150, abs=2) and y == pytest.approx(59.5, abs=2.5)
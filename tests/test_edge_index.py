@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from edge_index import EdgeIndex, route_from_point
+from route_engine import RouteEngine
+
+
+def brute_force_distances(graph, xs, ys):
+    by_id = {node['id']: node for node in graph["nodes"]}
+    a = np.array([(by_id[e["source"]]['x'], by_id[e["source"]]['y']) for e in graph["edges"]], dtype=float)
+    b = np.array([(by_id[e["target"]]['x'], by_id[e["target"]]['y']) for e in graph["edges"]], dtype=float)
+    d = b - a
+    px, py = xs[:, None] - a[:, 0], ys[:, None] - a[:, 1]
+    t = np.clip((px * d[:, 0] + py * d[:, 1]) / np.maximum((d ** 2).sum(axis=1), 1e-12), 0, 1)
+    return np.hypot(px - t * d[:, 0], py - t * d[:, 1]).min(axis=1)
+
+
+def test_project_finds_the_nearest_edge(graph):
+    rng = np.random.default_rng(0)
+    # Points inside the graph's extent and well outside it
+    xs, ys = rng.uniform(-200, 500, 2000), rng.uniform(-200, 400, 2000)
+    projection = EdgeIndex(graph["nodes"], graph["edges"]).project(xs, ys)
+    np.testing.assert_allclose(projection.distance, brute_force_distances(graph, xs, ys), atol=1e-9)
+    np.testing.assert_allclose(np.hypot(projection.x - xs, projection.y - ys), projection.distance, atol=1e-9)
+
+
+def test_within_returns_every_edge_in_radius_sorted(graph):
+    index = EdgeIndex(graph["nodes"], graph["edges"])
+    point, projection = index.within([100.0, 150.0], [100.0, 60.0], 25.0)
+    for k in (0, 1):
+        distances = projection.distance[point == k]
+        assert np.all(distances <= 25.0) and np.all(np.diff(distances) >= 0)
+    assert projection.distance[0] == pytest.approx(index.project([100.0], [100.0]).distance[0])
+
+
+def test_route_from_point_splits_the_snapped_edge(graph):
+    engine = RouteEngine(graph["nodes"], graph["edges"])
+    index = EdgeIndex(graph["nodes"], graph["edges"])
+    hit = index.nearest(95.0, 47.0)
+    result = route_from_point(index, engine, 95.0, 47.0, 0)
+    weight = graph["edges"][hit["edge"]]["weight"]
+    via_source = hit["t"] * weight + engine.search(hit["source"], 0).distance
+    via_target = (1 - hit["t"]) * weight + engine.search(hit["target"], 0).distance
+    assert result["distance"] == pytest.approx(min(via_source, via_target))
+    assert result["path"][-1] == 0
+
+
+def test_empty_graph_has_no_nearest_edge():
+    assert EdgeIndex([{"id": 0, "x": 0, "y": 0, "type": "path"}], []).nearest(1.0, 1.0) is None
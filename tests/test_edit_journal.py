@@ -0,0 +1,101 @@
+import json
+
+from edit_journal import EditJournal
+from graph_dedup import merge_close_nodes
+
+
+def path_node(node_id, x, y):
+    return {"id": node_id, "x": x, "y": y, "type": "path", "name": None}
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def start(tmp_path, nodes):
+    json_path = str(tmp_path / "graph.json")
+    with open(json_path, 'w') as f:
+        json.dump({"nodes": nodes, "edges": []}, f)
+    graph = load(json_path)
+    journal = EditJournal(json_path, fsync=False)
+    journal.replay(graph)
+    return json_path, graph, journal
+
+
+def test_unsaved_edits_are_recovered(tmp_path):
+    json_path, graph, journal = start(tmp_path, [path_node(0, 0, 0)])
+    node = path_node(1, 30, 0)
+    graph["nodes"].append(node)
+    journal.add_node(node)
+    edge = {"source": 0, "target": 1, "weight": 30.0}
+    graph["edges"].append(edge)
+    journal.add_edges([edge])
+    journal.close()  # Crash: no compaction
+
+    recovered = load(json_path)
+    assert EditJournal(json_path).replay(recovered) == 2
+    assert recovered["nodes"] == graph["nodes"] and recovered["edges"] == graph["edges"]
+
+
+def test_torn_last_line_is_ignored_and_cut_off(tmp_path):
+    json_path, graph, journal = start(tmp_path, [path_node(0, 0, 0)])
+    journal.add_node(path_node(1, 30, 0))
+    journal.close()
+    with open(journal.path, 'a') as f:
+        f.write('{"op": "add_node", "node": {"id": 2')
+
+    recovered = load(json_path)
+    journal = EditJournal(json_path)
+    assert journal.replay(recovered) == 1
+    with open(journal.path) as f:
+        assert f.read().endswith('}\n')
+
+
+def test_compaction_writes_the_snapshot_and_empties_the_journal(tmp_path):
+    json_path, graph, journal = start(tmp_path, [path_node(0, 0, 0)])
+    journal.compact_every = 3
+    for k in range(1, 4):
+        node = path_node(k, 30 * k, 0)
+        graph["nodes"].append(node)
+        journal.add_node(node, graph)
+    assert journal.pending == 0
+    assert len(load(json_path)["nodes"]) == 4 and load(json_path)["generation"] == 1
+    assert EditJournal(json_path).replay(load(json_path)) == 0
+
+
+def test_journal_left_by_a_crash_during_compaction_is_not_replayed(tmp_path):
+    json_path, graph, journal = start(tmp_path, [path_node(0, 0, 0), path_node(1, 50, 0), path_node(2, 2, 0)])
+    merged, _ = merge_close_nodes(graph, 4.0)
+    graph["nodes"][:], graph["edges"][:] = merged["nodes"], merged["edges"]
+    journal.merge_nodes(4.0)
+    node = path_node(2, 1, 1)  # Close to node 0 again, under the new ids
+    graph["nodes"].append(node)
+    journal.add_node(node)
+
+    # Crash after the snapshot is written but before the journal is truncated
+    journal.close()
+    with open(journal.path) as f:
+        stale = f.read()
+    journal.compact(graph)
+    with open(journal.path, 'w') as f:
+        f.write(stale)
+
+    recovered = load(json_path)
+    assert EditJournal(json_path).replay(recovered) == 0
+    assert recovered["nodes"] == graph["nodes"]
+
+
+def test_merge_record_replays_onto_the_snapshot_it_was_made_on(tmp_path):
+    json_path, graph, journal = start(tmp_path, [path_node(0, 0, 0), path_node(1, 50, 0), path_node(2, 2, 0)])
+    merged, _ = merge_close_nodes(graph, 4.0)
+    graph["nodes"][:], graph["edges"][:] = merged["nodes"], merged["edges"]
+    journal.merge_nodes(4.0)
+    node = path_node(2, 90, 0)
+    graph["nodes"].append(node)
+    journal.add_node(node)
+    journal.close()
+
+    recovered = load(json_path)
+    assert EditJournal(json_path).replay(recovered) == 2
+    assert recovered["nodes"] == graph["nodes"]
@@ -0,0 +1,57 @@
+import os
+
+import matplotlib.pyplot as plt
+import pytest
+
+import generate_patent_diagrams as diagrams
+
+
+def test_figures_are_selected_by_number_or_file_name():
+    assert diagrams.select_figures([]) == list(diagrams.FIGURES)
+    assert diagrams.select_figures(['3', 'user_flow', 'figure3']) == [3, 7]
+    with pytest.raises(SystemExit):
+        diagrams.select_figures(['figure42'])
+
+
+def test_render_figure_writes_the_png(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert diagrams.render_figure(1)[0] == 1
+    assert os.path.getsize(diagrams.FIGURES[1][0]) > 0
+
+
+def test_unchanged_figure_is_reused_or_restored_from_the_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    key = diagrams.figure_cache_key(1)
+    assert diagrams.reuse_cached(1, key) is None
+    diagrams.render_figure(1)
+    diagrams.store_cached(1, key)
+    assert diagrams.reuse_cached(1, key) == 'cached'
+
+    output = diagrams.FIGURES[1][0]
+    with open(output, 'wb') as f:
+        f.write(b'edited')
+    assert diagrams.reuse_cached(1, key) == 'restored'
+    with open(output, 'rb') as f, open(diagrams.cached_path(1, key), 'rb') as cached:
+        assert f.read() == cached.read()
+
+
+def test_cache_key_depends_on_the_figure_and_the_styling(monkeypatch):
+    key = diagrams.figure_cache_key(1)
+    assert diagrams.figure_cache_key(1) == key
+    assert diagrams.figure_cache_key(2) != key
+    monkeypatch.setitem(plt.rcParams, 'lines.linewidth', plt.rcParams['lines.linewidth'] + 1)
+    assert diagrams.figure_cache_key(1) != key
+
+
+def test_only_the_newest_renders_are_kept(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    output = diagrams.FIGURES[1][0]
+    for k in range(diagrams.CACHE_KEEP_PER_FIGURE + 2):
+        with open(output, 'wb') as f:
+            f.write(bytes([k]))
+        path = diagrams.cached_path(1, f"key{k}")
+        diagrams.store_cached(1, f"key{k}")
+        os.utime(path, (k, k))
+    kept = sorted(os.listdir(diagrams.CACHE_DIR))
+    assert kept == [os.path.basename(diagrams.cached_path(1, f"key{k}"))
+                    for k in range(2, diagrams.CACHE_KEEP_PER_FIGURE + 2)]
@@ -0,0 +1,35 @@
+import numpy as np
+
+from graph_binary import BinaryGraph, binary_path_for, write_binary_graph
+
+
+def test_round_trip(graph, tmp_path):
+    graph["nodes"][3]["name"] = "Café"  # Non-ASCII names survive the string table
+    path = str(tmp_path / "graph.pfgraph")
+    write_binary_graph(graph, path)
+    binary = BinaryGraph(path)
+    assert binary.num_nodes == len(graph["nodes"]) and binary.num_edges == len(graph["edges"])
+
+    restored = binary.to_graph_dict()
+    assert restored["nodes"] == graph["nodes"]
+    expected = {tuple(sorted((e["source"], e["target"]))): e["weight"] for e in graph["edges"]}
+    got = {tuple(sorted((e["source"], e["target"]))): e["weight"] for e in restored["edges"]}
+    assert got.keys() == expected.keys()
+    np.testing.assert_allclose([got[k] for k in expected], list(expected.values()), rtol=1e-6)
+
+
+def test_neighbours_by_original_id(tmp_path):
+    graph = {"nodes": [{"id": 10, "x": 0, "y": 0, "type": "path", "name": None},
+                       {"id": 20, "x": 5, "y": 0, "type": "room", "name": "G01"}],
+             "edges": [{"source": 10, "target": 20, "weight": 5.0}]}
+    path = str(tmp_path / "graph.pfgraph")
+    write_binary_graph(graph, path)
+    binary = BinaryGraph(path)
+    i = binary.index_of(20)
+    indices, weights = binary.neighbors(i)
+    assert binary.node_type(i) == "room" and binary.name(i) == "G01"
+    assert indices.tolist() == [binary.index_of(10)] and weights.tolist() == [5.0]
+
+
+def test_binary_path_for():
+    assert binary_path_for("assets/maps/floor_graph.json") == "assets/maps/floor_graph.pfgraph"
@@ -0,0 +1,47 @@
+import pytest
+
+from graph_dedup import merge_close_nodes
+
+
+def path_node(node_id, x, y, **extra):
+    return dict({"id": node_id, "x": x, "y": y, "type": "path", "name": None}, **extra)
+
+
+def test_close_nodes_merge_onto_the_earliest_and_ids_are_compacted():
+    graph = {"nodes": [path_node(0, 0, 0), path_node(1, 50, 0), path_node(2, 1, 1), path_node(3, 100, 0)],
+             "edges": [{"source": 2, "target": 1, "weight": 49.0}, {"source": 1, "target": 3, "weight": 50.0}]}
+    merged, stats = merge_close_nodes(graph, 4.0)
+    assert [(n['id'], n['x']) for n in merged["nodes"]] == [(0, 0), (1, 50), (2, 100)]
+    assert stats["id_map"] == {0: 0, 1: 1, 2: 0, 3: 2}
+    # The moved endpoint gets a fresh Euclidean weight
+    assert merged["edges"][0] == {"source": 0, "target": 1, "weight": 50.0}
+
+
+def test_collapsed_parallel_edges_keep_the_last_copy():
+    graph = {"nodes": [path_node(0, 0, 0), path_node(1, 2, 0), path_node(2, 60, 0)],
+             "edges": [{"source": 0, "target": 2, "weight": 60.0, "tag": "first"},
+                       {"source": 2, "target": 1, "weight": 58.0, "tag": "moved"},
+                       {"source": 2, "target": 0, "weight": 61.0, "tag": "last"}]}
+    merged, stats = merge_close_nodes(graph, 4.0)
+    assert [e["tag"] for e in merged["edges"]] == ["last"]
+    assert merged["edges"][0]["weight"] == 61.0
+    assert stats["dropped_edges"] == 2
+
+
+def test_only_identical_type_and_name_merge():
+    graph = {"nodes": [path_node(0, 0, 0), {"id": 1, "x": 1, "y": 0, "type": "room", "name": "G01"},
+                       {"id": 2, "x": 0, "y": 1, "type": "room", "name": "G02"}], "edges": []}
+    merged, stats = merge_close_nodes(graph, 4.0)
+    assert stats["merged_nodes"] == 0 and len(merged["nodes"]) == 3
+
+
+def test_merge_is_idempotent(graph):
+    once, _ = merge_close_nodes(graph, 12.0)
+    twice, stats = merge_close_nodes(once, 12.0)
+    assert stats["merged_nodes"] == 0 and twice == once
+
+
+@pytest.mark.parametrize("radius", [0, -1.0])
+def test_non_positive_radius_is_rejected(radius):
+    with pytest.raises(ValueError):
+        merge_close_nodes({"nodes": [path_node(0, 0, 0), path_node(1, 1e6, 1e6)], "edges": []}, radius)
@@ -0,0 +1,38 @@
+import networkx as nx
+import pytest
+
+from graph_simplify import expand_path, path_polyline, simplify_graph
+from route_engine import RouteEngine
+
+
+def test_junction_distances_are_preserved(make_graph):
+    graph = make_graph(rows=6, cols=8, drop=0.35, seed=3)
+    simplified = simplify_graph(graph)
+    assert len(simplified["edges"]) < len(graph["edges"])
+
+    full = RouteEngine(graph["nodes"], graph["edges"])
+    slim = RouteEngine(simplified["nodes"], simplified["edges"])
+    rooms = [node['id'] for node in graph["nodes"] if node['type'] == 'room']
+    for a in rooms:
+        for b in rooms:
+            try:
+                expected = full.path_length(full.shortest_path(a, b))
+            except nx.NetworkXNoPath:
+                with pytest.raises(nx.NetworkXNoPath):
+                    slim.shortest_path(a, b)
+                continue
+            path = slim.shortest_path(a, b)
+            assert slim.path_length(path) == pytest.approx(expected)
+            # Expanded back to full-graph ids, the route walks real edges of the same length
+            assert full.path_length(expand_path(path, simplified)) == pytest.approx(expected)
+
+
+def test_polyline_follows_the_waypoints():
+    nodes = [{"id": k, "x": 10 * k, "y": 0, "type": "path", "name": None} for k in range(4)]
+    nodes[0].update(type="room", name="A")
+    nodes[3].update(type="room", name="B")
+    edges = [{"source": k, "target": k + 1, "weight": 10.0} for k in range(3)]
+    simplified = simplify_graph({"nodes": nodes, "edges": edges})
+    assert [(e["source"], e["target"], e["via"]) for e in simplified["edges"]] == [(0, 3, [1, 2])]
+    assert simplified["edges"][0]["weight"] == pytest.approx(30.0)
+    assert path_polyline([3, 0], simplified) == [(30, 0), (20, 0), (10, 0), (0, 0)]
@@ -0,0 +1,76 @@
+import networkx as nx
+import numpy as np
+
+from graph_validate import is_clean, repair_graph, validate_graph
+
+
+def node(node_id, x, y, node_type='path', name=None):
+    return {"id": node_id, "x": x, "y": y, "type": node_type, "name": name}
+
+
+def test_components_agree_with_networkx(graph):
+    report = validate_graph(graph)
+    reference = nx.Graph()
+    reference.add_nodes_from(n['id'] for n in graph["nodes"])
+    reference.add_edges_from((e["source"], e["target"]) for e in graph["edges"])
+    assert report["components"] == nx.number_connected_components(reference)
+    assert report["dangling_edges"] == report["self_loops"] == report["duplicate_edges"] == []
+
+
+def test_reports_and_drops_bad_edges():
+    graph = {"nodes": [node(0, 0, 0), node(1, 10, 0), node(2, 20, 0)],
+             "edges": [{"source": 0, "target": 1, "weight": 10.0},
+                       {"source": 1, "target": 9, "weight": 1.0},    # Dangling
+                       {"source": 2, "target": 2, "weight": 0.0},    # Self-loop
+                       {"source": 1, "target": 2, "weight": 10.0},
+                       {"source": 1, "target": 0, "weight": 12.0}]}  # Duplicate of edge 0
+    report = validate_graph(graph)
+    assert (report["dangling_edges"], report["self_loops"], report["duplicate_edges"]) == ([1], [2], [0])
+    repair_graph(graph, report)
+    # The last copy of the duplicate survives, as nx.Graph would load it
+    assert [(e["source"], e["target"], e["weight"]) for e in graph["edges"]] == [(1, 2, 10.0), (1, 0, 12.0)]
+    assert is_clean(validate_graph(graph))
+
+
+def test_unreachable_rooms_and_components():
+    graph = {"nodes": [node(0, 0, 0, 'room', 'Entrance'), node(1, 10, 0), node(2, 50, 0), node(3, 60, 0, 'room', 'G01')],
+             "edges": [{"source": 0, "target": 1, "weight": 10.0}, {"source": 2, "target": 3, "weight": 10.0}]}
+    report = validate_graph(graph)
+    assert report["components"] == 2 and report["unreachable_rooms"] == [3]
+
+
+def test_reachability_agrees_with_networkx_on_a_long_corridor(make_graph):
+    graph = make_graph(rows=1, cols=3000, drop=0.001, rooms=40, seed=3)
+    reference = nx.Graph()
+    reference.add_nodes_from(n['id'] for n in graph["nodes"])
+    reference.add_edges_from((e["source"], e["target"]) for e in graph["edges"])
+    reached = nx.node_connected_component(reference, 0)
+    rooms = [n['id'] for n in graph["nodes"] if n['type'] == 'room']
+    assert validate_graph(graph)["unreachable_rooms"] == [r for r in rooms if r not in reached]
+
+
+def orphan_graph():
+    # Room 3 is nearest to path node 1, but a wall separates them
+    return {"nodes": [node(0, 0, 0, 'room', 'Entrance'), node(1, 10, 10), node(2, 10, 30), node(3, 16, 14, 'room', 'G01')],
+            "edges": [{"source": 0, "target": 1, "weight": 14.1}, {"source": 1, "target": 2, "weight": 20.0}]}
+
+
+def test_orphan_rooms_are_linked_only_in_line_of_sight():
+    walkable = np.ones((40, 40), dtype=bool)
+    walkable[12, 0:30] = False
+    graph = orphan_graph()
+    fixes = repair_graph(graph, validate_graph(graph), walkable)
+    assert fixes["linked_rooms"] == [(3, 2)]
+    assert graph["edges"][-1]["source"] == 3 and graph["edges"][-1]["target"] == 2
+
+
+def test_orphan_rooms_without_a_mask_or_a_clear_link_are_left():
+    graph = orphan_graph()
+    fixes = repair_graph(graph, validate_graph(graph))
+    assert fixes["linked_rooms"] == [] and fixes["unlinked_rooms"] == [3]
+
+    walled_in = np.ones((40, 40), dtype=bool)
+    walled_in[12, :] = walled_in[:, 13] = False
+    graph = orphan_graph()
+    fixes = repair_graph(graph, validate_graph(graph), walled_in)
+    assert fixes["unlinked_rooms"] == [3] and len(graph["edges"]) == 2
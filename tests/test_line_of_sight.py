@@ -0,0 +1,28 @@
+import numpy as np
+
+from line_of_sight import segments_clear
+
+
+def walled_mask():
+    walkable = np.ones((40, 40), dtype=bool)
+    walkable[5:35, 20] = False  # Wall with gaps at the top and bottom
+    return walkable
+
+
+def test_segments_clear():
+    clear = segments_clear(walled_mask(), [5, 5, 5, 5], [10, 2, 10, 10], [35, 35, 15, 50], [10, 2, 30, 10])
+    # Through the wall, around it, beside it, and off the mask
+    assert clear.tolist() == [False, True, True, False]
+
+
+def test_segments_clear_is_independent_of_batch_size():
+    rng = np.random.default_rng(0)
+    ax, ay, bx, by = (rng.uniform(0, 39, 200) for _ in range(4))
+    whole = segments_clear(walled_mask(), ax, ay, bx, by)
+    chunked = segments_clear(walled_mask(), ax, ay, bx, by, max_samples=64)
+    assert np.array_equal(whole, chunked)
+
+
+def test_segments_clear_scales_map_coordinates_into_the_mask():
+    half = walled_mask()  # A mask at half the map's resolution
+    assert segments_clear(half, [10, 10], [20, 4], [70, 70], [20, 4], scale=0.5).tolist() == [False, True]
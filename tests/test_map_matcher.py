@@ -0,0 +1,55 @@
+import pytest
+
+from map_matcher import MapMatcher
+
+
+def straight_corridor():
+    nodes = [{"id": k, "x": 40 * k, "y": 100, "type": "path", "name": None} for k in range(8)]
+    nodes.append({"id": 8, "x": 120, "y": 140, "type": "path", "name": None})  # Side branch off node 3
+    edges = [{"source": k, "target": k + 1, "weight": 40.0} for k in range(7)]
+    edges.append({"source": 3, "target": 8, "weight": 40.0})
+    return nodes, edges
+
+
+def test_walking_distances_follow_the_corridors():
+    nodes, edges = straight_corridor()
+    matcher = MapMatcher(nodes, edges)
+    a = next(c for c in matcher.candidates(50, 103) if c.edge == 1)   # 10 px past node 1
+    b = next(c for c in matcher.candidates(60, 98) if c.edge == 1)    # Same edge, 10 px further
+    c = next(c for c in matcher.candidates(118, 130) if c.edge == 7)  # 30 px up the side branch
+    assert matcher.walks([a, b], [b, c]) == [pytest.approx([10.0, 100.0]), pytest.approx([0.0, 90.0])]
+    assert matcher.walk(a, c) == (pytest.approx(100.0), 2, 3)
+    assert matcher.walk(a, b)[1:] == (None, None)
+
+
+def test_noisy_walk_along_a_corridor_stays_on_it():
+    nodes, edges = straight_corridor()
+    matcher = MapMatcher(nodes, edges, lag=3)
+    # Walk east along y = 100; the fixes near x = 120 drift towards the side branch
+    samples = [(x, 100 + (9 if 110 <= x <= 130 else (-1) ** x * 3), t) for t, x in enumerate(range(5, 280, 10))]
+    records = list(matcher.match(samples))
+    assert len(records) == len(samples)
+    assert all(r["edge"] < 7 for r in records)  # Never the side branch
+    assert [r["t"] for r in records] == [t for _, _, t in samples]
+    assert all(abs(r["point"][1] - 100) < 1e-9 for r in records)
+
+
+def test_routes_between_matches_are_connected():
+    nodes, edges = straight_corridor()
+    matcher = MapMatcher(nodes, edges, lag=2)
+    records = list(matcher.match([(10, 100, 0), (130, 102, 1), (270, 99, 2)]))
+    assert records[0]["route"] is None
+    for previous, record in zip(records, records[1:]):
+        route = record["route"]
+        assert route[0] in (previous["source"], previous["target"])
+        assert route[-1] in (record["source"], record["target"])
+        assert all(matcher.engine.graph.has_edge(a, b) for a, b in zip(route, route[1:]))
+    assert records[1]["route"] == [1, 2, 3]
+
+
+def test_fix_far_from_every_edge_breaks_the_trace():
+    nodes, edges = straight_corridor()
+    matcher = MapMatcher(nodes, edges)
+    records = list(matcher.match([(10, 100, 0), (20, 600, 1), (30, 100, 2)]))
+    assert [r["edge"] is None for r in records] == [False, True, False]
+    assert records[2]["route"] is None
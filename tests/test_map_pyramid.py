@@ -0,0 +1,31 @@
+import cv2
+import numpy as np
+
+from map_pyramid import MapPyramid, PyramidViewport
+
+
+def test_regions_match_the_source_image(tmp_path):
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 256, (700, 1100, 3), dtype=np.uint8)
+    path = str(tmp_path / "map.png")
+    cv2.imwrite(path, img)
+    pyramid = MapPyramid.open(path, tile_size=128)
+    assert (pyramid.width, pyramid.height) == (1100, 700)
+    assert np.array_equal(pyramid.read_region(0, 100, 50, 700, 333), img[50:333, 100:700])
+    assert np.array_equal(pyramid.read_region(0, -20, -20, 5000, 5000), img)  # Clipped to the level
+    assert pyramid.read_region(0, 1200, 0, 1300, 10).size == 0
+
+    # Reopening an unchanged image reuses the cache
+    assert MapPyramid.open(path, tile_size=128).levels == pyramid.levels
+
+
+def test_viewport_zoom_keeps_the_point_under_the_cursor(tmp_path):
+    path = str(tmp_path / "map.png")
+    cv2.imwrite(path, np.zeros((2000, 3000, 3), dtype=np.uint8))
+    view = PyramidViewport(MapPyramid.open(path, tile_size=256), 600, 400)
+    before = view.to_map(150, 100)
+    view.zoom_at(2.0, 150, 100)
+    after = view.to_map(150, 100)
+    assert abs(before[0] - after[0]) <= 1 and abs(before[1] - after[1]) <= 1
+    assert view.to_view(*view.to_map(300, 200)) == (300, 200)
+    assert view.render().shape == (400, 600, 3)
@@ -0,0 +1,79 @@
+import json
+
+import networkx as nx
+import pytest
+
+from multi_floor import Building
+
+
+def write_floor(tmp_path, name, graph):
+    with open(tmp_path / name, 'w') as f:
+        json.dump(graph, f)
+    return name
+
+
+def stitched(building_graphs, costs):
+    """One networkx graph over every floor, with the shaft links added by hand."""
+    g = nx.Graph()
+    for floor_id, graph in building_graphs.items():
+        g.add_weighted_edges_from(((floor_id, e["source"]), (floor_id, e["target"]), e["weight"])
+                                  for e in graph["edges"])
+    for (fa, a), (fb, b), cost in costs:
+        g.add_edge((fa, a), (fb, b), weight=cost)
+    return g
+
+
+@pytest.fixture
+def building(make_graph, tmp_path):
+    graphs = {}
+    for level, floor_id in enumerate(("G", "1", "2")):
+        graph = make_graph(rows=5, cols=6, seed=level, drop=0.0)
+        # Stair A at node 0 and the elevator at node 29 on every floor
+        graph["nodes"][0].update(type="stairs", name="Stair A")
+        graph["nodes"][29].update(type="elevator", name="Lift")
+        graphs[floor_id] = graph
+    manifest = {"name": "Test", "floors": [
+        {"id": floor_id, "level": level, "graph": write_floor(tmp_path, f"floor_{floor_id}.json", graph)}
+        for level, (floor_id, graph) in enumerate(graphs.items())],
+        "connector_costs": {"stairs": 150.0, "elevator": 80.0}}
+    with open(tmp_path / "building.json", 'w') as f:
+        json.dump(manifest, f)
+    return Building(str(tmp_path / "building.json")), graphs
+
+
+def test_route_across_floors_matches_the_stitched_graph(building):
+    building, graphs = building
+    links = []
+    for fa, fb in (("G", "1"), ("1", "2")):
+        links += [((fa, 0), (fb, 0), 150.0), ((fa, 29), (fb, 29), 80.0)]
+    reference = stitched(graphs, links)
+    for start, end in ((("G", 12), ("2", 17)), (("2", 5), ("G", 5)), (("1", 3), ("1", 26))):
+        result = building.route(start[0], start[1], end[0], end[1])
+        assert result["distance"] == pytest.approx(nx.dijkstra_path_length(reference, start, end))
+        assert result["legs"][0]["floor"] == start[0] and result["legs"][0]["path"][0] == start[1]
+        assert result["legs"][-1]["floor"] == end[0] and result["legs"][-1]["path"][-1] == end[1]
+
+
+def test_only_the_floors_on_the_route_are_loaded(building):
+    building, _ = building
+    building.overlay()
+    fresh = Building(building.manifest_path)
+    fresh.route("G", 12, "1", 17)
+    assert "2" not in fresh.loaded_floors()
+
+
+def test_unknown_floor(building):
+    building, _ = building
+    with pytest.raises(KeyError):
+        building.floor("g")
+
+
+def test_unnamed_connectors_are_skipped_with_a_warning(building, tmp_path):
+    building, graphs = building
+    for floor_id in ("G", "1"):
+        graphs[floor_id]["nodes"][5].update(type="stairs", name=None)
+        write_floor(tmp_path, f"floor_{floor_id}.json", graphs[floor_id])
+    with pytest.warns(UserWarning, match="unnamed stairs node 5"):
+        links = building.vertical_links()
+    assert ("G", 5) not in links and ("1", 5) not in links
+    assert [end for end, _ in links[("G", 0)]] == [("1", 0)]
@@ -0,0 +1,60 @@
+import json
+import tracemalloc
+
+from pipeline_trace import PipelineTrace
+
+
+def test_counters_are_inclusive():
+    trace = PipelineTrace('test')
+    with trace.stage('outer'):
+        trace.count('items', 2)
+        with trace.stage('inner'):
+            trace.count('items', 3)
+    totals = trace.totals()
+    assert totals['outer']['counters'] == {'items': 5}
+    assert totals['inner']['counters'] == {'items': 3}
+    assert trace.counters == {'items': 5}
+    assert (totals['outer']['depth'], totals['inner']['depth']) == (0, 1)
+    assert totals['outer']['total_ms'] >= totals['inner']['total_ms']
+
+
+def test_repeated_stages_are_summed():
+    trace = PipelineTrace('test')
+    for k in range(3):
+        with trace.stage('query', k=k):
+            trace.count('expanded', 10)
+    entry = trace.totals()['query']
+    assert entry['calls'] == 3 and entry['counters'] == {'expanded': 30}
+
+
+def test_stage_is_recorded_when_its_body_raises():
+    trace = PipelineTrace('test')
+    try:
+        with trace.stage('broken'):
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert [record['name'] for record in trace.stages] == ['broken']
+
+
+def test_memory_peaks():
+    trace = PipelineTrace('test', memory=True)
+    try:
+        with trace.stage('alloc'):
+            data = bytearray(4 << 20)
+        del data
+    finally:
+        tracemalloc.stop()
+    assert trace.totals()['alloc']['mem_peak_kb'] >= 4 << 10
+
+
+def test_write_produces_json_and_chrome_trace(tmp_path):
+    trace = PipelineTrace('test')
+    with trace.stage('load'):
+        trace.count('nodes', 7)
+    json_path, chrome_path = trace.write(str(tmp_path))
+    with open(json_path) as f:
+        assert json.load(f)['totals']['load']['counters'] == {'nodes': 7}
+    with open(chrome_path) as f:
+        events = json.load(f)['traceEvents']
+    assert [e['name'] for e in events if e['ph'] == 'X'] == ['load']
@@ -0,0 +1,71 @@
+import json
+import os
+
+import pytest
+
+from room_index import RoomIndex, load_room_index, rooms_path_for
+
+NODES = [
+    {"id": 0, "type": "room", "name": "Entrance"},
+    {"id": 1, "type": "room", "name": "G01"},
+    {"id": 2, "type": "room", "name": "G02"},
+    {"id": 3, "type": "room", "name": "G10"},
+    {"id": 4, "type": "room", "name": "Cylinder Room"},
+    {"id": 5, "type": "stairs", "name": "Stair A"},
+    {"id": 6, "type": "path", "name": None},
+    {"id": 7, "type": "room", "name": "Lab"},
+    {"id": 8, "type": "room", "name": "lab"},
+]
+
+
+@pytest.fixture
+def rooms():
+    return RoomIndex.from_nodes(NODES)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("G01", [1]), ("g-01", [1]), ("g 01", [1]),  # Normalized
+    ("GO1", [1]), ("g1", [1]), ("Entrrance", [0]),  # Fuzzy
+    ("lab", [7, 8]),  # Ambiguous
+    ("Stair A", []), ("G3", []),  # Connectors are not indexed
+])
+def test_lookup(rooms, query, expected):
+    assert rooms.lookup(query) == expected
+
+
+def test_complete_offers_exact_matches_first(rooms):
+    assert rooms.complete("g0") == [(1, "G01"), (2, "G02")]
+    assert rooms.complete("g1")[0] == (1, "G01")
+    assert (3, "G10") in rooms.complete("g1")
+
+
+def test_complete_matches_word_suffixes_and_respects_limit(rooms):
+    assert rooms.complete("room") == [(4, "Cylinder Room")]
+    assert len(rooms.complete("g", limit=2)) == 2
+
+
+def test_complete_agrees_with_a_scan(rooms):
+    names = {node['id']: node['name'] for node in NODES if node['type'] == 'room'}
+    for prefix in ("g", "g0", "e", "c", "l", "x"):
+        expected = {node_id for node_id, name in names.items() if name.lower().startswith(prefix)}
+        assert expected <= {node_id for node_id, _ in rooms.complete(prefix, limit=len(NODES))}
+
+
+def test_saved_index_loads_without_rebuilding(rooms, tmp_path):
+    path = str(tmp_path / "graph_rooms.json")
+    rooms.save(path)
+    loaded = RoomIndex.load(path)
+    assert loaded.names == rooms.names
+    for query in ("g0", "GO1", "room", "lab"):
+        assert loaded.lookup(query) == rooms.lookup(query)
+        assert loaded.complete(query) == rooms.complete(query)
+
+
+def test_saved_index_is_used_only_while_it_is_current(tmp_path):
+    json_path = str(tmp_path / "graph.json")
+    with open(json_path, 'w') as f:
+        json.dump({"nodes": NODES, "edges": []}, f)
+    RoomIndex.from_nodes(NODES[:2]).save(rooms_path_for(json_path))
+    assert load_room_index(json_path, NODES).lookup("G02") == []  # The saved one
+    os.utime(rooms_path_for(json_path), (0, 0))
+    assert load_room_index(json_path, NODES).lookup("G02") == [2]  # Older than the graph: rebuilt
@@ -0,0 +1,58 @@
+import random
+
+import networkx as nx
+import pytest
+
+from route_engine import SEARCH_METHODS, RouteEngine
+
+
+def reference_graph(graph):
+    g = nx.Graph()
+    g.add_weighted_edges_from((e["source"], e["target"], e["weight"]) for e in graph["edges"])
+    return g
+
+
+@pytest.mark.parametrize("method", SEARCH_METHODS)
+def test_search_agrees_with_dijkstra(graph, method):
+    reference = reference_graph(graph)
+    engine = RouteEngine(graph["nodes"], graph["edges"], method=method)
+    rng = random.Random(0)
+    nodes = list(reference)
+    for _ in range(200):
+        a, b = rng.choice(nodes), rng.choice(nodes)
+        result = engine.search(a, b)
+        if nx.has_path(reference, a, b):
+            assert result.distance == pytest.approx(nx.dijkstra_path_length(reference, a, b))
+            assert result.path[0] == a and result.path[-1] == b
+            assert engine.path_length(result.path) == pytest.approx(result.distance)
+        else:
+            assert result.path is None
+
+
+def test_shortest_path_is_cached_in_both_directions(graph):
+    engine = RouteEngine(graph["nodes"], graph["edges"])
+    path = engine.shortest_path(0, 42)
+    assert engine.shortest_path(42, 0) == path[::-1]
+    assert (engine.misses, engine.hits) == (1, 1)
+
+
+def test_graph_is_only_rebuilt_when_edges_change(graph):
+    engine = RouteEngine(graph["nodes"], graph["edges"])
+    assert not engine.update_edges(list(graph["edges"]))
+    assert engine.update_edges(graph["edges"][:-1])
+    assert engine.builds == 2
+
+
+def test_verify_pairs_matches_shortest_path(graph):
+    engine = RouteEngine(graph["nodes"], graph["edges"])
+    for (a, b), path in engine.verify_pairs(engine.room_pairs()).items():
+        expected = RouteEngine(graph["nodes"], graph["edges"]).search(a, b)
+        if path is None:
+            assert expected.path is None
+        else:
+            assert engine.path_length(path) == pytest.approx(expected.distance)
+
+
+def test_unknown_method_is_rejected(graph):
+    with pytest.raises(ValueError):
+        RouteEngine(graph["nodes"], graph["edges"], method='greedy')
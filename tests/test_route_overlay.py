@@ -0,0 +1,55 @@
+import json
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from route_engine import RouteEngine
+from route_overlay import contact_sheets, parse_pairs, render_routes, write_outputs
+
+
+def blank_map(graph):
+    width = max(node['x'] for node in graph["nodes"]) + 20
+    height = max(node['y'] for node in graph["nodes"]) + 20
+    return np.full((height, width, 3), 255, dtype=np.uint8)
+
+
+def test_routes_match_dijkstra_and_are_drawn(graph):
+    reference = nx.Graph()
+    reference.add_weighted_edges_from((e["source"], e["target"], e["weight"]) for e in graph["edges"])
+    pairs = RouteEngine(graph["nodes"], graph["edges"]).room_pairs() + [(0, 9999)]
+    frames, results = render_routes(blank_map(graph), graph, pairs, cell_width=160)
+    assert len(frames) == len(results) == len(pairs)
+    for (start_id, end_id), frame, result in zip(pairs, frames, results):
+        assert (result["start"], result["end"]) == (start_id, end_id)
+        assert frame.shape[1] == 160
+        if end_id not in reference or not nx.has_path(reference, start_id, end_id):
+            assert result["path"] is None and result["length"] is None
+            continue
+        assert result["length"] == pytest.approx(nx.dijkstra_path_length(reference, start_id, end_id))
+        red = (frame[..., 2] > 200) & (frame[..., 1] < 80) & (frame[..., 0] < 80)
+        assert red.any()
+
+
+def test_contact_sheets_hold_at_most_columns_times_rows_frames():
+    frames = [np.zeros((10, 20, 3), dtype=np.uint8)] * 40
+    sheets = contact_sheets(frames, columns=6, rows=6, gap=4)
+    assert [sheet.shape for sheet in sheets] == [(6 * 14 + 4, 6 * 24 + 4, 3), (14 + 4, 4 * 24 + 4, 3)]
+    assert contact_sheets([]) == []
+
+
+def test_pairs_by_id_or_room_name(graph):
+    assert parse_pairs(["0:7", "g02:G05"], graph["nodes"]) == [(0, 7), (81, 84)]
+    with pytest.raises(SystemExit):
+        parse_pairs(["0:Lobby"], graph["nodes"])
+
+
+def test_outputs_are_one_image_per_route_or_per_sheet(graph, tmp_path):
+    engine = RouteEngine(graph["nodes"], graph["edges"])
+    pairs = engine.room_pairs()[:3]
+    frames, results = render_routes(blank_map(graph), graph, pairs, cell_width=120, engine=engine)
+    assert len(write_outputs(frames, results, str(tmp_path / "sheets"))) == 1
+    written = write_outputs(frames, results, str(tmp_path / "frames"), as_frames=True)
+    assert len(written) == 3 and written[0].endswith(f"route_{pairs[0][0]:04d}_{pairs[0][1]:04d}.png")
+    with open(tmp_path / "frames" / "routes.json") as f:
+        assert [(r["start"], r["end"]) for r in json.load(f)] == pairs
@@ -0,0 +1,43 @@
+import os
+
+import networkx as nx
+import pytest
+
+from route_tables import RouteTables, build_route_tables, table_paths
+
+
+@pytest.fixture
+def tables(graph, tmp_path):
+    prefix = str(tmp_path / "graph")
+    build_route_tables(graph, prefix, workers=2)
+    return RouteTables(prefix)
+
+
+def test_routes_and_distances_match_dijkstra(graph, tables):
+    reference = nx.Graph()
+    reference.add_weighted_edges_from((e["source"], e["target"], e["weight"]) for e in graph["edges"])
+    rooms = [node['id'] for node in graph["nodes"] if node['type'] == 'room']
+    for end in rooms:
+        lengths = nx.single_source_dijkstra_path_length(reference, end)
+        for start in list(reference)[::7] + rooms:
+            path = tables.route(start, end)
+            if start not in lengths:
+                assert path is None
+                continue
+            assert path[0] == start and path[-1] == end
+            walked = sum(reference[a][b]["weight"] for a, b in zip(path, path[1:]))
+            assert walked == pytest.approx(lengths[start], rel=1e-6)
+            if start in rooms:
+                assert tables.distance(start, end) == pytest.approx(lengths[start], rel=1e-6)
+
+
+def test_temporary_binary_graph_is_removed(tables, tmp_path):
+    assert not os.path.exists(table_paths(str(tmp_path / "graph"))['graph'])
+
+
+def test_resolve(tables):
+    assert tables.resolve("G01") == tables.resolve("g01") == tables.room_ids[tables.room_names.index("G01")]
+    assert tables.resolve("3") == 3
+    for unknown in ("9999", "Nowhere"):
+        with pytest.raises(KeyError):
+            tables.resolve(unknown)
@@ -0,0 +1,80 @@
+import asyncio
+import json
+
+import pytest
+
+from route_engine import RouteEngine
+from routing_service import RoutingService
+
+
+@pytest.fixture
+def service(graph, tmp_path):
+    path = tmp_path / "graph.json"
+    with open(path, 'w') as f:
+        json.dump(graph, f)
+    service = RoutingService(str(path), workers=1)
+    yield service
+    service.close()
+
+
+def exchange(service, requests):
+    """Send raw HTTP requests over one keep-alive connection; returns [(status, payload)]."""
+    async def run():
+        server = await asyncio.start_server(service.handle_connection, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        responses = []
+        for request in requests:
+            writer.write(request)
+            status = int((await reader.readline()).split()[1])
+            headers = {}
+            while (line := await reader.readline()) != b'\r\n':
+                key, _, value = line.decode().partition(':')
+                headers[key.lower()] = value.strip()
+            responses.append((status, json.loads(await reader.readexactly(int(headers['content-length'])))))
+            if headers['connection'] == 'close':
+                break
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return responses
+    return asyncio.run(run())
+
+
+def get(target):
+    return f"GET {target} HTTP/1.1\r\nHost: test\r\n\r\n".encode()
+
+
+def post(target, body):
+    data = json.dumps(body).encode()
+    return f"POST {target} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data
+
+
+def test_routes_match_the_engine(graph, service):
+    engine = RouteEngine(graph["nodes"], graph["edges"])
+    (status, one), (_, many) = exchange(service, [get("/route?start=0&end=G02"),
+                                                  post("/routes", {"pairs": [[0, 42], ["G01", "G02"]]})])
+    g02 = next(node['id'] for node in graph["nodes"] if node['name'] == 'G02')
+    assert status == 200
+    assert one["distance"] == pytest.approx(engine.search(0, g02).distance)
+    assert [r["distance"] for r in many["routes"]] == pytest.approx(
+        [engine.search(0, 42).distance, engine.search(g02 - 1, g02).distance])
+
+
+def test_bad_requests(service):
+    responses = exchange(service, [get("/route?start=0&end=Nowhere"), get("/nothing"), post("/route", {}),
+                                   b"GET /rooms?q=g HTTP/1.1\r\nContent-Length: -5\r\n\r\n"])
+    assert [status for status, _ in responses] == [400, 404, 405, 400]
+
+
+def test_oversized_request_lines_and_headers_are_rejected(service):
+    long_line = b"GET /rooms?q=" + b"g" * 70000 + b" HTTP/1.1\r\nHost: test\r\n\r\n"
+    long_header = b"GET /rooms?q=g HTTP/1.1\r\nCookie: " + b"x" * 70000 + b"\r\n\r\n"
+    assert exchange(service, [long_line])[0][0] == 400
+    assert exchange(service, [long_header])[0][0] == 431
+    assert exchange(service, [get("/rooms?q=g")])[0][0] == 200
+
+
+def test_room_autocomplete(service):
+    (status, payload), = exchange(service, [get("/rooms?q=g0&limit=3")])
+    assert status == 200 and [room["name"] for room in payload["rooms"]] == ["G01", "G02", "G03"]
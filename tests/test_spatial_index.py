@@ -0,0 +1,92 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from spatial_index import GridIndex, auto_link_path_nodes
+
+
+def nested_loop_links(nodes, added_edges, max_distance):
+    """The original Step 2 loop from map_annotator.main."""
+    new_edges = []
+    for node_a in nodes:
+        if node_a['type'] != 'path':
+            continue
+        closest_neighbor = None
+        min_dist = float('inf')
+        for node_b in nodes:
+            if node_a['id'] == node_b['id'] or node_b['type'] != 'path':
+                continue
+            if tuple(sorted((node_a['id'], node_b['id']))) in added_edges:
+                continue
+            dist = math.dist((node_a['x'], node_a['y']), (node_b['x'], node_b['y']))
+            if dist < min_dist:
+                min_dist = dist
+                closest_neighbor = node_b
+        if closest_neighbor and min_dist <= max_distance:
+            a_id, b_id = node_a['id'], closest_neighbor['id']
+            new_edges.append({"source": a_id, "target": b_id, "weight": min_dist})
+            added_edges.add(tuple(sorted((a_id, b_id))))
+    return new_edges
+
+
+def random_nodes(count, size, seed):
+    rng = random.Random(seed)
+    return [{"id": k, "x": rng.randrange(size), "y": rng.randrange(size),
+             "type": rng.choice(['path', 'path', 'path', 'room']), "name": None} for k in range(count)]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_auto_link_matches_nested_loop(seed):
+    nodes = random_nodes(300, 400, seed)
+    existing = {(0, 1), (2, 3)}
+    expected = nested_loop_links(nodes, set(existing), 40.0)
+    assert auto_link_path_nodes(nodes, set(existing), 40.0) == expected
+
+
+def test_auto_link_breaks_ties_by_list_order():
+    nodes = [{"id": 0, "x": 10, "y": 10, "type": "path", "name": None},
+             {"id": 1, "x": 20, "y": 10, "type": "path", "name": None},
+             {"id": 2, "x": 0, "y": 10, "type": "path", "name": None}]
+    expected = nested_loop_links(nodes, set(), 40.0)
+    assert auto_link_path_nodes(nodes, set(), 40.0) == expected
+    assert expected[0]["target"] == 1
+
+
+def walled_nodes():
+    nodes = [{"id": 0, "x": 2, "y": 5, "type": "path", "name": None},
+             {"id": 1, "x": 12, "y": 5, "type": "path", "name": None},
+             {"id": 2, "x": 2, "y": 20, "type": "path", "name": None}]
+    walkable = np.ones((30, 30), dtype=bool)
+    walkable[:, 7] = False  # Wall between nodes 0 and 1
+    return nodes, walkable
+
+
+def test_auto_link_rejects_segments_through_walls():
+    nodes, walkable = walled_nodes()
+    edges = auto_link_path_nodes(nodes, set(), 40.0, walkable)
+    assert {tuple(sorted((e["source"], e["target"]))) for e in edges} == {(0, 2)}
+
+
+def test_auto_link_counts_line_of_sight_checks():
+    nodes, walkable = walled_nodes()
+    stats = {}
+    auto_link_path_nodes(nodes, set(), 40.0, walkable, stats)
+    assert stats["los_checks"] == 3
+
+
+def test_query_pairs_matches_brute_force():
+    rng = np.random.default_rng(1)
+    xs, ys = rng.uniform(0, 200, 150), rng.uniform(0, 200, 150)
+    i, j, d2 = GridIndex(xs, ys, 15.0).query_pairs(15.0)
+    full = (xs[:, None] - xs[None, :]) ** 2 + (ys[:, None] - ys[None, :]) ** 2
+    expected = {(a, b) for a, b in zip(*np.nonzero(full <= 225.0)) if a != b}
+    assert set(zip(i.tolist(), j.tolist())) == expected
+    np.testing.assert_allclose(d2, full[i, j])
+
+
+@pytest.mark.parametrize("cell_size", [0, -1.0, float('nan'), 1e-12])
+def test_grid_rejects_bad_cell_sizes(cell_size):
+    with pytest.raises(ValueError):
+        GridIndex([0.0, 1000.0], [0.0, 1000.0], cell_size)